@@ -1,4 +1,5 @@
-from flask import Flask
+from flask import Flask, request
+from flask_login import current_user, login_required
 from flask_cors import CORS
 from .config import Config
 from .extensions import db, login_manager, limiter, socketio
@@ -18,17 +19,49 @@ def set_sqlite_pragma(dbapi_conn, connection_record):
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
+    from .serialization import init_json
+    init_json(app)
+    # Registered first so its after_request hook runs last, on final headers
+    from .compression import init_compression
+    init_compression(app)
 
+    # Make psycopg2 yield to the gevent hub instead of blocking it
+    from .green import setup_green_driver
+    setup_green_driver(app)
+
+    from .db_pool import setup_pool
+    setup_pool(app)
     db.init_app(app)
+    from .replicas import init_replicas
+    init_replicas(app)
+    from .query_profiler import init_query_profiler
+    init_query_profiler(app)
+    from .slow_queries import init_slow_query_log
+    init_slow_query_log(app)
+    from .storage import init_storage
+    init_storage(app)
     login_manager.init_app(app)
     limiter.init_app(app)
     socketio.init_app(app)
     
-    # Import models and create tables if they don't exist
+    # Import models and check (or migrate) the schema per DB_SCHEMA_MODE
     with app.app_context():
         from .models import user, post, comment, reaction, notification, message
-        db.create_all()
-        print("[STARTUP] Database tables created/verified")
+        from .sqlite_tuning import setup_sqlite
+        setup_sqlite(app, db.engine)
+        from .schema import prepare_schema
+        prepare_schema(app, db)
+
+        from .db_pool import instrument_engine, warm_pool
+        instrument_engine(db.engine)
+        if app.config.get("DB_POOL_WARMUP"):
+            warm_pool(app, db.engine, app.config["DB_POOL_WARMUP"])
+
+        from .metrics import init_metrics
+        init_metrics(app, db.engine, socketio)
+        # After metrics, so shed requests still show up as 503s there
+        from .admission import init_admission
+        init_admission(app)
 
     # CORS configuration - reads from ALLOWED_ORIGINS env var
     import os
@@ -66,6 +99,7 @@ def create_app():
     from .routes.users import users_bp
     from .routes.notifications import notifications_bp
     from .routes.messages import messages_bp
+    from .routes.uploads import uploads_bp
 
     app.register_blueprint(auth_bp, url_prefix="/auth")
     app.register_blueprint(posts_bp, url_prefix="/posts")
@@ -75,27 +109,44 @@ def create_app():
     app.register_blueprint(users_bp, url_prefix="/users")
     app.register_blueprint(notifications_bp, url_prefix="/notifications")
     app.register_blueprint(messages_bp, url_prefix="/messages")
+    app.register_blueprint(uploads_bp, url_prefix="/uploads")
 
     # Register socket event handlers
     from .socket_events import register_socket_events
     register_socket_events(socketio)
 
+    @app.cli.command("media-gc")
+    def media_gc():
+        """Delete unreferenced upload blobs and stale temp files."""
+        from .media_store import collect_garbage
+        from .storage import get_storage
+        stats = collect_garbage(get_storage(), app.config["UPLOAD_FOLDER"], app.config["MEDIA_GC_GRACE_SECONDS"])
+        print(f"[MEDIA GC] removed {stats['blobs']} blobs, {stats['temp']} temp files, {stats['bytes']} bytes")
+
     @app.get("/healthz")
     def healthz():
         return {"status": "ok"}
 
-    # serve uploaded files (dev only)
-    from flask import send_from_directory
-    import os
+    @app.get("/healthz/pool")
+    def healthz_pool():
+        from .db_pool import pool_stats
+        return pool_stats(db.engine)
 
-    @app.get("/uploads/<path:filename>")
-    def uploaded_file(filename):
-        upload_folder = app.config["UPLOAD_FOLDER"]
-        full_path = os.path.join(upload_folder, filename)
-        app.logger.info(f"Serving file: {filename}")
-        app.logger.info(f"Upload folder: {upload_folder}")
-        app.logger.info(f"Full path: {full_path}")
-        app.logger.info(f"File exists: {os.path.exists(full_path)}")
-        return send_from_directory(upload_folder, filename)
+    @app.get("/healthz/slow-queries")
+    @login_required
+    def healthz_slow_queries():
+        """This worker's slowest statements, worst first (admins only)."""
+        if current_user.role != "admin":
+            return {"error": "Forbidden"}, 403
+        slow_log = app.extensions.get("slow_queries")
+        if slow_log is None:
+            return {"queries": [], "threshold_ms": 0}
+        sort = request.args.get("sort", "total_ms")
+        if sort not in ("total_ms", "max_ms", "count", "avg_ms"):
+            return {"error": "sort must be total_ms, max_ms, avg_ms or count"}, 400
+        if "limit" in request.args and request.args.get("limit", type=int) is None:
+            return {"error": "limit must be an integer"}, 400
+        limit = max(1, min(request.args.get("limit", 20, type=int), 100))
+        return {"queries": slow_log.top(limit, sort), "threshold_ms": app.config["SLOW_QUERY_MS"]}
 
     return app
@@ -0,0 +1,146 @@
+"""
+Admission control: per-class concurrency limits with load shedding.
+
+Every request is put in a class: "auth" (login/signup, which hash
+passwords), "upload" (media uploads), "write" (other non-GET requests) or
+"read". Each class has a gate that admits at most ADMISSION_LIMITS[class]
+requests at once in this worker. Everything else waits up to
+ADMISSION_QUEUE_MS[class]. A request still waiting after that, or arriving
+when as many requests are already queued as the class limit, gets an
+immediate 503 with Retry-After. This is cheaper than queuing until the
+client times out.
+
+The limit adapts to ADMISSION_SLO_MS[class]. When requests of a class take
+longer than their SLO, its limit shrinks by a quarter, at most once per
+SLO period, down to 1. While they are within it, the limit creeps back up
+by about one per `limit` requests. So a slow database first sheds the
+class that is hurting, and reads keep flowing while uploads back off.
+
+Health checks, /metrics, the unread counters and CORS preflights skip the
+gates (ADMISSION_EXEMPT). Limits are per worker, so they matter under
+gevent or threaded workers, where one worker serves many requests at once.
+"""
+
+import threading
+import time
+
+from flask import g, jsonify, request
+
+from .metrics import registry
+
+AUTH_ENDPOINTS = {"auth.login", "auth.signup"}
+UPLOAD_ENDPOINTS = {"media.upload_media", "media.upload_media_batch"}
+
+
+def parse_classes(value: str, cast=float) -> dict:
+    """'read=32,write=8' -> {"read": 32.0, "write": 8.0}."""
+    parsed = {}
+    for item in value.split(","):
+        name, _, number = item.partition("=")
+        if name.strip() and number.strip():
+            parsed[name.strip()] = cast(number)
+    return parsed
+
+
+class Gate:
+    """Adaptive concurrency limit for one request class."""
+
+    def __init__(self, name: str, max_limit: int, slo: float, queue_timeout: float):
+        self.name = name
+        self.max_limit = max_limit
+        self.limit = float(max_limit)
+        self.slo = slo
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self._cond = threading.Condition()
+        self._last_decrease = 0.0
+
+    def acquire(self):
+        """(admitted, seconds spent queued)."""
+        start = time.perf_counter()
+        with self._cond:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True, 0.0
+            if self.waiting >= self.max_limit:
+                return False, 0.0
+            self.waiting += 1
+            try:
+                deadline = start + self.queue_timeout
+                while self.in_flight >= int(self.limit):
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        return False, time.perf_counter() - start
+                    self._cond.wait(remaining)
+                self.in_flight += 1
+            finally:
+                self.waiting -= 1
+        return True, time.perf_counter() - start
+
+    def release(self, seconds: float):
+        """Free a slot and adapt the limit to how long the request took."""
+        with self._cond:
+            self.in_flight -= 1
+            if seconds > self.slo:
+                now = time.monotonic()
+                if now - self._last_decrease >= self.slo:
+                    self.limit = max(1.0, self.limit * 0.75)
+                    self._last_decrease = now
+            elif self.limit < self.max_limit:
+                self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+            limit = self.limit
+            self._cond.notify()
+        registry.set("admission_limit", (("class", self.name),), int(limit))
+
+
+def request_class() -> str:
+    if request.endpoint in AUTH_ENDPOINTS:
+        return "auth"
+    if request.endpoint in UPLOAD_ENDPOINTS:
+        return "upload"
+    if request.method in ("GET", "HEAD"):
+        return "read"
+    return "write"
+
+
+def init_admission(app):
+    """Install the admission gates; ADMISSION_ENABLED=false skips them."""
+    if not app.config.get("ADMISSION_ENABLED", True):
+        return None
+    limits = parse_classes(app.config.get("ADMISSION_LIMITS", ""), int)
+    slos = parse_classes(app.config.get("ADMISSION_SLO_MS", ""))
+    queues = parse_classes(app.config.get("ADMISSION_QUEUE_MS", ""))
+    gates = {
+        name: Gate(name, limits.get(name, 16), slos.get(name, 1000) / 1000, queues.get(name, 250) / 1000)
+        for name in ("read", "write", "upload", "auth")
+    }
+    exempt = {e.strip() for e in app.config.get("ADMISSION_EXEMPT", "").split(",") if e.strip()}
+    retry_after = str(app.config.get("ADMISSION_RETRY_AFTER", 2))
+    app.extensions["admission"] = gates
+
+    @app.before_request
+    def _admit():
+        if request.method == "OPTIONS" or request.endpoint is None or request.endpoint in exempt:
+            return None
+        gate = gates[request_class()]
+        admitted, waited = gate.acquire()
+        labels = (("class", gate.name),)
+        registry.observe("admission_queue_seconds", labels, waited)
+        if not admitted:
+            registry.inc("admission_rejected_total", labels)
+            response = jsonify({"error": "Server busy, please retry shortly"})
+            response.status_code = 503
+            response.headers["Retry-After"] = retry_after
+            return response
+        g._admission = (gate, time.perf_counter())
+        return None
+
+    @app.teardown_request
+    def _release(exc):
+        admitted = g.pop("_admission", None)
+        if admitted is not None:
+            gate, start = admitted
+            gate.release(time.perf_counter() - start)
+
+    return gates
@@ -0,0 +1,160 @@
+"""
+Response compression: gzip or brotli, negotiated from Accept-Encoding.
+
+`init_compression` adds an after_request hook, registered before the
+others so it runs last and sees the final headers. It compresses a
+response when:
+
+- its mimetype is in COMPRESSION_MIMETYPES (JSON, text, SVG, ...); media
+  such as JPEG, WebP and video is already compressed
+- the client accepts one of COMPRESSION_ALGORITHMS; with equal q-values the
+  first in that list wins ("br" needs the optional `brotli` package)
+- the body is at least COMPRESSION_MIN_SIZE bytes; below that, the header
+  and CPU cost more than the bytes saved
+- it has no Content-Encoding yet, is not partial content (206) and does
+  not say `Cache-Control: no-transform`. File responses (send_file,
+  X-Accel-Redirect) are left alone so Range requests and sendfile() work
+
+Buffered bodies are compressed in one go; the result is dropped if it is
+not smaller. Streamed responses (a generator passed to Response) are
+wrapped instead: each chunk is compressed and flushed as it is produced,
+so the client gets data as early as it would have uncompressed, at a
+slightly worse ratio. Their Content-Length is removed.
+
+COMPRESSION_GZIP_LEVEL (1-9) and COMPRESSION_BROTLI_QUALITY (0-11) trade
+CPU for bandwidth; `python benchmarks/compression.py` measures both on
+real payloads. Compressed responses get `Vary: Accept-Encoding` and their
+strong ETag is made weak, since the bytes differ from the uncompressed
+ones. Bytes in and out per encoding are counted in /metrics as
+`compression_*_bytes_total`.
+"""
+
+import zlib
+
+from flask import request
+
+from .metrics import registry
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only without it
+    brotli = None
+
+
+class GzipCompressor:
+    """zlib in gzip framing (wbits=31), with the interface of brotli.Compressor."""
+
+    def __init__(self, level):
+        self._z = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def process(self, data):
+        return self._z.compress(data)
+
+    def flush(self):
+        return self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._z.flush(zlib.Z_FINISH)
+
+
+def make_compressor(encoding, config):
+    if encoding == "br":
+        return brotli.Compressor(quality=config.get("COMPRESSION_BROTLI_QUALITY", 5))
+    return GzipCompressor(config.get("COMPRESSION_GZIP_LEVEL", 6))
+
+
+def compress(data, encoding, config):
+    compressor = make_compressor(encoding, config)
+    return compressor.process(data) + compressor.finish()
+
+
+def available_encodings(config):
+    """COMPRESSION_ALGORITHMS in preference order, minus unsupported ones."""
+    names = [n.strip().lower() for n in config.get("COMPRESSION_ALGORITHMS", "br,gzip").split(",")]
+    return [n for n in names if n == "gzip" or (n == "br" and brotli is not None)]
+
+
+def choose_encoding(accept_encodings, available):
+    """Best of `available` for a parsed Accept-Encoding, or None for identity."""
+    best, best_q = None, 0
+    for name in available:
+        q = accept_encodings.quality(name)
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def _stream(chunks, compressor, encoding):
+    """Compress and flush each chunk of a streamed body as it comes."""
+    size_in = size_out = 0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            if not chunk:
+                continue
+            size_in += len(chunk)
+            out = compressor.process(chunk) + compressor.flush()
+            size_out += len(out)
+            yield out
+        out = compressor.finish()
+        size_out += len(out)
+        yield out
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+        labels = (("encoding", encoding),)
+        registry.inc("compression_input_bytes_total", labels, size_in)
+        registry.inc("compression_output_bytes_total", labels, size_out)
+
+
+def init_compression(app):
+    """Compress eligible responses for clients that accept gzip or br."""
+    config = app.config
+    if not config.get("COMPRESSION_ENABLED", True):
+        return
+    available = available_encodings(config)
+    if not available:
+        return
+    mimetypes = {m.strip() for m in config.get("COMPRESSION_MIMETYPES", "").split(",") if m.strip()}
+    min_size = config.get("COMPRESSION_MIN_SIZE", 1024)
+
+    @app.after_request
+    def _compress_response(response):
+        if (response.status_code < 200 or response.status_code in (204, 206, 304)
+                or response.mimetype not in mimetypes
+                or response.direct_passthrough
+                or "Content-Encoding" in response.headers
+                or "X-Accel-Redirect" in response.headers
+                or response.cache_control.no_transform):
+            return response
+        # Whatever we decide, caches must key this response on the header
+        response.vary.add("Accept-Encoding")
+        encoding = choose_encoding(request.accept_encodings, available)
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            length = response.content_length
+            if length is not None and length < min_size:
+                return response
+            response.response = _stream(response.response, make_compressor(encoding, config), encoding)
+            response.headers.pop("Content-Length", None)
+        else:
+            data = response.get_data()
+            if len(data) < min_size:
+                return response
+            body = compress(data, encoding, config)
+            if len(body) >= len(data):
+                return response
+            labels = (("encoding", encoding),)
+            registry.inc("compression_input_bytes_total", labels, len(data))
+            registry.inc("compression_output_bytes_total", labels, len(body))
+            response.set_data(body)
+
+        response.headers["Content-Encoding"] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
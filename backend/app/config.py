@@ -6,18 +6,16 @@ class Config:
     # Robust Database URL handling
     _db_url = os.getenv("DATABASE_URL")
     
-    # DEBUG: Print the raw DATABASE_URL to logs (remove after fixing)
-    print(f"[CONFIG DEBUG] Raw DATABASE_URL: '{_db_url}'")
-    
     # If DATABASE_URL is set but empty, or not set, use sqlite fallback
     if not _db_url or not _db_url.strip():
         SQLALCHEMY_DATABASE_URI = "sqlite:///campusfeed.db"
-        print("[CONFIG DEBUG] Using SQLite fallback")
     else:
         # Fix legacy postgres:// usage
         SQLALCHEMY_DATABASE_URI = _db_url.replace("postgres://", "postgresql://")
-        print(f"[CONFIG DEBUG] Final SQLALCHEMY_DATABASE_URI: '{SQLALCHEMY_DATABASE_URI[:50]}...'")
 
+    # What workers do with the schema at boot (app/schema.py):
+    # auto, check, migrate, create or off
+    DB_SCHEMA_MODE = os.getenv("DB_SCHEMA_MODE", "auto")
 
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     ALLOWED_EMAIL_DOMAINS = os.getenv("ALLOWED_EMAIL_DOMAINS", "nitrkl.ac.in").split(",")
@@ -26,3 +24,135 @@ class Config:
     BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
     UPLOAD_FOLDER = os.getenv("UPLOAD_FOLDER", os.path.join(BASE_DIR, "uploads"))
     MAX_CONTENT_LENGTH = int(os.getenv("MAX_CONTENT_LENGTH", str(10 * 1024 * 1024)))  # 10MB
+    # Per-file limit, enforced while the upload streams in
+    MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(MAX_CONTENT_LENGTH)))
+    # /media/upload/batch: whole-request body limit and number of files
+    MAX_BATCH_UPLOAD_BYTES = int(os.getenv("MAX_BATCH_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+    MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", "20"))
+
+    # Image derivatives (app/images.py): process, inline or off
+    IMAGE_PIPELINE = os.getenv("IMAGE_PIPELINE", "process")
+    IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+    IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "80"))
+
+    # Media storage backend (app/storage.py): local or s3
+    MEDIA_STORAGE = os.getenv("MEDIA_STORAGE", "local")
+    S3_BUCKET = os.getenv("S3_BUCKET", "")
+    S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL", "")  # e.g. http://localhost:9000 for MinIO
+    S3_REGION = os.getenv("S3_REGION", "")
+    S3_ACCESS_KEY_ID = os.getenv("S3_ACCESS_KEY_ID", "")
+    S3_SECRET_ACCESS_KEY = os.getenv("S3_SECRET_ACCESS_KEY", "")
+    S3_PUBLIC_URL = os.getenv("S3_PUBLIC_URL", "")  # CDN/public base for object URLs
+    S3_MULTIPART_THRESHOLD = int(os.getenv("S3_MULTIPART_THRESHOLD", str(8 * 1024 * 1024)))
+    PRESIGN_EXPIRES_SECONDS = int(os.getenv("PRESIGN_EXPIRES_SECONDS", "900"))
+
+    # `flask media-gc` skips files newer than this
+    MEDIA_GC_GRACE_SECONDS = int(os.getenv("MEDIA_GC_GRACE_SECONDS", "3600"))
+
+    # /uploads serving (app/routes/uploads.py)
+    UPLOADS_MAX_AGE = int(os.getenv("UPLOADS_MAX_AGE", "86400"))  # non content-addressed files
+    UPLOADS_ACCEL_REDIRECT = os.getenv("UPLOADS_ACCEL_REDIRECT", "")  # nginx internal location, e.g. /_uploads/
+    UPLOADS_DEBUG_LOG = os.getenv("UPLOADS_DEBUG_LOG", "false").lower() == "true"
+    USE_X_SENDFILE = os.getenv("USE_X_SENDFILE", "false").lower() == "true"
+
+    # Seconds between background rebuilds of the in-process user search index,
+    # which pick up renames and deletions made by other workers
+    USER_SEARCH_REFRESH_SECONDS = int(os.getenv("USER_SEARCH_REFRESH_SECONDS", "30"))
+
+    # Cross-request cache of logged-in user snapshots (see app/identity.py)
+    USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+    USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", "10000"))
+
+    # Password hashing (see app/passwords.py). Changing the method rehashes
+    # each user's password on their next successful login.
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+    PASSWORD_HASH_THREADS = int(os.getenv("PASSWORD_HASH_THREADS", "4"))
+    PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "64"))
+    PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT", "5"))
+
+    # Connection pool (app/db_pool.py); ignored for SQLite. Recycle and
+    # pre-ping keep connections from outliving a sleeping Neon compute.
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds to wait for a free connection
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "300"))
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "10"))
+    DB_POOL_WARMUP = int(os.getenv("DB_POOL_WARMUP", os.getenv("DB_POOL_SIZE", "5")))  # connections opened at startup
+
+    # Read replicas (app/replicas.py): comma-separated URLs; GET reads go there
+    DATABASE_REPLICA_URLS = os.getenv("DATABASE_REPLICA_URLS", "")
+    REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))  # primary reads after a write
+    REPLICA_HEALTH_INTERVAL = float(os.getenv("REPLICA_HEALTH_INTERVAL", "5"))
+
+    # SQLite fallback (app/sqlite_tuning.py): "fast" = WAL, synchronous=NORMAL,
+    # busy timeout, mmap and a bigger cache; "safe" = SQLite defaults
+    SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "fast")
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "20000"))  # per connection
+    SQLITE_MAINTENANCE_SECONDS = int(os.getenv("SQLITE_MAINTENANCE_SECONDS", "300"))  # 0 disables
+
+    # Per-request query profiling (app/query_profiler.py). Headers default
+    # to on in debug mode; otherwise a sample of requests is logged as JSON.
+    QUERY_PROFILER_HEADERS = os.getenv("QUERY_PROFILER_HEADERS", "auto").lower()  # auto, true or false
+    QUERY_PROFILER_SAMPLE_RATE = float(os.getenv("QUERY_PROFILER_SAMPLE_RATE", "0.01"))
+    QUERY_PROFILER_N_PLUS_ONE = int(os.getenv("QUERY_PROFILER_N_PLUS_ONE", "5"))  # repeats of one statement shape
+
+    # Slow-query log (app/slow_queries.py); SLOW_QUERY_MS=0 disables
+    SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+    SLOW_QUERY_EXPLAIN_ANALYZE = os.getenv("SLOW_QUERY_EXPLAIN_ANALYZE", "true").lower() == "true"  # Postgres SELECTs only
+    SLOW_QUERY_EXPLAIN_INTERVAL = int(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL", "300"))  # seconds between plans per fingerprint
+    SLOW_QUERY_MAX_FINGERPRINTS = int(os.getenv("SLOW_QUERY_MAX_FINGERPRINTS", "500"))
+
+    # Prometheus metrics at /metrics (app/metrics.py). Workers share
+    # snapshots through METRICS_DIR (default: <tmp>/campusfeed-metrics).
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    METRICS_DIR = os.getenv("METRICS_DIR", "")
+    METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+    METRICS_RETENTION_SECONDS = int(os.getenv("METRICS_RETENTION_SECONDS", "86400"))  # exited workers' counters
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")  # require "Authorization: Bearer <token>" when set
+
+    # Rate limits (app/rate_limits.py). The default SQLite file is shared by
+    # all workers on this host; use redis://... across hosts.
+    RATELIMIT_STORAGE_URI = os.getenv(
+        "RATELIMIT_STORAGE_URI",
+        "sqlite:///" + os.path.join(os.getenv("TMPDIR", "/tmp"), "campusfeed-ratelimit.db"),
+    )
+    RATELIMIT_STRATEGY = os.getenv("RATELIMIT_STRATEGY", "moving-window")  # or fixed-window
+    RATELIMIT_ROUTE_LIMITS = os.getenv("RATELIMIT_ROUTE_LIMITS", "")  # e.g. posts.list_posts=600/minute;auth.login=20/minute
+    RATELIMIT_HEADERS_ENABLED = os.getenv("RATELIMIT_HEADERS_ENABLED", "false").lower() == "true"
+    RATELIMIT_ENABLED = os.getenv("RATELIMIT_ENABLED", "true").lower() == "true"  # false only for load tests
+
+    # Admission control (app/admission.py), per worker and request class:
+    # concurrency limits, latency SLOs that shrink them, and max queue wait
+    ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+    ADMISSION_LIMITS = os.getenv("ADMISSION_LIMITS", "read=64,write=16,upload=4,auth=4")
+    ADMISSION_SLO_MS = os.getenv("ADMISSION_SLO_MS", "read=500,write=1000,upload=10000,auth=2000")
+    ADMISSION_QUEUE_MS = os.getenv("ADMISSION_QUEUE_MS", "read=250,write=500,upload=1000,auth=1000")
+    ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "2"))  # seconds
+    ADMISSION_EXEMPT = os.getenv(
+        "ADMISSION_EXEMPT",
+        "healthz,healthz_pool,healthz_slow_queries,metrics,auth.me,"
+        "notifications.get_unread_count,messages.get_unread_count",
+    )
+
+    # JSON encoder for responses (app/serialization.py): auto uses orjson
+    # when it is installed, stdlib forces the json module
+    JSON_BACKEND = os.getenv("JSON_BACKEND", "auto").lower()  # auto, orjson or stdlib
+
+    # Response compression (app/compression.py). Brotli needs the brotli
+    # package; the levels trade CPU for egress bandwidth
+    COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+    COMPRESSION_ALGORITHMS = os.getenv("COMPRESSION_ALGORITHMS", "br,gzip")  # preference order
+    COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))  # 1-9
+    COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))  # 0-11
+    COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))  # bytes
+    COMPRESSION_MIMETYPES = os.getenv(
+        "COMPRESSION_MIMETYPES",
+        "application/json,text/plain,text/html,text/css,text/csv,text/javascript,"
+        "application/javascript,image/svg+xml",
+    )
+
+    # psycopg2 gevent wait callback: auto (only under a gevent worker), on, off
+    DB_GREEN_MODE = os.getenv("DB_GREEN_MODE", "auto")
@@ -0,0 +1,159 @@
+"""
+Database connection pool: sizing, warm-up and usage metrics.
+
+Engine options come from DB_POOL_* settings instead of SQLAlchemy's
+defaults, so a sleeping Neon compute or a restarted Postgres shows up as a
+pre-ping reconnect rather than a failed request. At startup `warm_pool`
+opens connections ahead of traffic. `pool_stats` reports checkout waits and
+usage; it is served at /healthz/pool for capacity planning.
+
+SQLite keeps SQLAlchemy's own pool; only server databases get these options.
+"""
+
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import QueuePool
+
+# Upper bounds (seconds) of the checkout wait histogram; the last bucket is +Inf
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+
+
+class PoolStats:
+    """Counters shared by every pool in the process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.wait_seconds = 0.0
+            self.max_wait_seconds = 0.0
+            self.wait_buckets = [0] * (len(WAIT_BUCKETS) + 1)
+            self.timeouts = 0
+            self.connects = 0
+            self.invalidations = 0
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+            for i, bound in enumerate(WAIT_BUCKETS):
+                if seconds <= bound:
+                    self.wait_buckets[i] += 1
+                    break
+            else:
+                self.wait_buckets[-1] += 1
+
+    def incr(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+stats = PoolStats()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeout:
+            stats.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        stats.record_wait(time.perf_counter() - start)
+        return conn
+
+
+def engine_options(config) -> dict:
+    """SQLALCHEMY_ENGINE_OPTIONS for the configured database URL."""
+    uri = config.get("SQLALCHEMY_DATABASE_URI", "")
+    if uri.startswith("sqlite"):
+        return {}
+    options = {
+        "poolclass": TimedQueuePool,
+        "pool_size": config.get("DB_POOL_SIZE", 5),
+        "max_overflow": config.get("DB_MAX_OVERFLOW", 10),
+        "pool_timeout": config.get("DB_POOL_TIMEOUT", 30),
+        "pool_recycle": config.get("DB_POOL_RECYCLE", 300),
+        "pool_pre_ping": config.get("DB_POOL_PRE_PING", True),
+    }
+    connect_timeout = config.get("DB_CONNECT_TIMEOUT")
+    if connect_timeout:
+        # psycopg2 and PyMySQL both take connect_timeout in seconds
+        options["connect_args"] = {"connect_timeout": connect_timeout}
+    return options
+
+
+def setup_pool(app):
+    """Merge pool options into SQLALCHEMY_ENGINE_OPTIONS; call before db.init_app."""
+    options = engine_options(app.config)
+    # Anything set explicitly in SQLALCHEMY_ENGINE_OPTIONS wins
+    options.update(app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+
+
+def instrument_engine(engine):
+    """Count new and invalidated connections (pre-ping failures, recycles)."""
+    event.listen(engine, "connect", lambda *args: stats.incr("connects"))
+    event.listen(engine, "invalidate", lambda *args: stats.incr("invalidations"))
+
+
+def warm_pool(app, engine, count: int) -> int:
+    """Open up to `count` connections before serving traffic.
+
+    Connections are held until all are open so the pool really grows to
+    `count`, then returned. Checking one out is enough to connect, so no
+    transaction is started. Failures are logged, not raised: the app still
+    starts and pre-ping reconnects once the database is reachable.
+    """
+    conns = []
+    try:
+        for _ in range(count):
+            conns.append(engine.connect())
+    except Exception as e:
+        app.logger.warning("Pool warm-up stopped after %d connections: %s", len(conns), e)
+    finally:
+        for conn in conns:
+            conn.close()
+    return len(conns)
+
+
+def pool_stats(engine) -> dict:
+    """Current pool usage plus cumulative checkout counters for this process."""
+    pool = engine.pool
+    usage = {"class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        usage.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "max_overflow": pool._max_overflow,
+        })
+    with stats._lock:
+        checkouts = stats.checkouts
+        usage.update({
+            "checkouts": checkouts,
+            "checkout_timeouts": stats.timeouts,
+            "checkout_wait_seconds_total": round(stats.wait_seconds, 6),
+            "checkout_wait_seconds_avg": round(stats.wait_seconds / checkouts, 6) if checkouts else 0.0,
+            "checkout_wait_seconds_max": round(stats.max_wait_seconds, 6),
+            "checkout_wait_buckets": {
+                **{str(b): n for b, n in zip(WAIT_BUCKETS, stats.wait_buckets)},
+                "+Inf": stats.wait_buckets[-1],
+            },
+            "connects": stats.connects,
+            "invalidations": stats.invalidations,
+        })
+    return usage
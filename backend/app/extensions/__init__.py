@@ -1,13 +1,15 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
 from flask_socketio import SocketIO
 import os
+from ..rate_limits import ConfigurableLimiter, rate_limit_key
+from ..replicas import RoutingSession
 
-db = SQLAlchemy()
+# RoutingSession sends GET reads to replicas when DATABASE_REPLICA_URLS is set
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 login_manager = LoginManager()
-limiter = Limiter(key_func=get_remote_address)
+# Keyed by user id when logged in; storage and overrides from RATELIMIT_* config
+limiter = ConfigurableLimiter(key_func=rate_limit_key)
 
 # SocketIO CORS - reads from ALLOWED_ORIGINS env var
 _allowed_origins_env = os.getenv("ALLOWED_ORIGINS", "")
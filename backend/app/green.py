@@ -0,0 +1,62 @@
+"""
+Cooperative psycopg2 for gevent workers.
+
+psycopg2 is a C extension, so gevent's monkey patching does not reach its
+socket I/O: every query blocks the hub and all greenlets queue behind it.
+psycopg2 exposes a wait-callback hook for exactly this case; installing one
+that waits with gevent's `wait_read`/`wait_write` lets queries from different
+greenlets overlap.
+"""
+
+try:
+    import psycopg2
+    from psycopg2 import extensions
+except ImportError:  # SQLite/MySQL deployments don't ship psycopg2
+    psycopg2 = None
+
+try:
+    from gevent import monkey
+    from gevent.socket import wait_read, wait_write
+except ImportError:
+    monkey = None
+
+
+def gevent_wait_callback(conn, timeout=None):
+    """psycopg2 wait callback that yields to the gevent hub."""
+    while True:
+        state = conn.poll()
+        if state == extensions.POLL_OK:
+            break
+        elif state == extensions.POLL_READ:
+            wait_read(conn.fileno(), timeout=timeout)
+        elif state == extensions.POLL_WRITE:
+            wait_write(conn.fileno(), timeout=timeout)
+        else:
+            raise psycopg2.OperationalError(f"Bad result from poll: {state!r}")
+
+
+def gevent_active() -> bool:
+    return bool(monkey and monkey.is_module_patched("socket"))
+
+
+def setup_green_driver(app) -> bool:
+    """Install the gevent wait callback if configured; return True if installed.
+
+    DB_GREEN_MODE is "auto" (install when running under a monkey-patched
+    gevent worker with a Postgres URL), "on" (always, fail if impossible)
+    or "off".
+    """
+    mode = app.config.get("DB_GREEN_MODE", "auto")
+    if mode == "off":
+        return False
+
+    uri = app.config.get("SQLALCHEMY_DATABASE_URI", "")
+    usable = psycopg2 is not None and monkey is not None and uri.startswith("postgresql")
+    if mode == "on" and not usable:
+        raise RuntimeError("DB_GREEN_MODE=on requires gevent, psycopg2 and a Postgres DATABASE_URL")
+    if not usable or (mode == "auto" and not gevent_active()):
+        return False
+
+    extensions.set_wait_callback(gevent_wait_callback)
+    app.logger.info("psycopg2 gevent wait callback installed")
+    return True
@@ -0,0 +1,127 @@
+"""
+Cross-request cache of authenticated user identities.
+
+Flask-Login already memoizes `current_user` for the lifetime of a request;
+this module keeps an immutable snapshot of each user for a short TTL so that
+most requests and socket events rebuild `current_user` without touching the
+database. Snapshots are dropped whenever the User row is updated or deleted
+in this process; other workers pick the change up once the TTL expires.
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from flask import current_app
+from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from .extensions import db
+from .models.user import User
+from .replicas import primary
+
+
+@dataclass(frozen=True)
+class UserSnapshot(UserMixin):
+    """Read-only stand-in for `User` used as `current_user`.
+
+    Routes that need to modify the user must load the ORM row themselves.
+    """
+    id: int
+    email: str
+    name: str
+    branch: Optional[str]
+    year: Optional[str]
+    bio: Optional[str]
+    profile_pic: Optional[str]
+    verified: bool
+    role: str
+    created_at: Optional[datetime]
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserSnapshot":
+        return cls(
+            id=user.id,
+            email=user.email,
+            name=user.name,
+            branch=user.branch,
+            year=user.year,
+            bio=user.bio,
+            profile_pic=user.profile_pic,
+            verified=bool(user.verified),
+            role=user.role,
+            created_at=user.created_at,
+        )
+
+    to_dict = User.to_dict
+
+
+class IdentityCache:
+    """TTL map of user id -> UserSnapshot."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # user_id -> (expires_at, snapshot)
+
+    def get(self, user_id: int) -> Optional[UserSnapshot]:
+        now = time.monotonic()
+        entry = self._entries.get(user_id)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+
+        # Cached for the whole TTL, so never load it from a lagging replica
+        with primary():
+            user = db.session.get(User, user_id)
+        if user is None:
+            self.invalidate(user_id)
+            return None
+        snapshot = UserSnapshot.from_user(user)
+        ttl = current_app.config.get("USER_CACHE_TTL_SECONDS", 60)
+        max_size = current_app.config.get("USER_CACHE_MAX_SIZE", 10000)
+        with self._lock:
+            if len(self._entries) >= max_size:
+                self._evict(now)
+            self._entries[user_id] = (now + ttl, snapshot)
+        return snapshot
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _evict(self, now):
+        expired = [uid for uid, (exp, _) in self._entries.items() if exp <= now]
+        for uid in expired:
+            del self._entries[uid]
+        # Still full: drop the entries closest to expiry
+        overflow = len(self._entries) - current_app.config.get("USER_CACHE_MAX_SIZE", 10000) + 1
+        if overflow > 0:
+            oldest = sorted(self._entries.items(), key=lambda kv: kv[1][0])[:overflow]
+            for uid, _ in oldest:
+                del self._entries[uid]
+
+
+identity_cache = IdentityCache()
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_user(mapper, connection, target):
+    identity_cache.invalidate(target.id)
+    # Drop it again once committed, in case another request re-cached the
+    # old row between flush and commit
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("stale_identities", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    for user_id in session.info.pop("stale_identities", ()):
+        identity_cache.invalidate(user_id)
@@ -0,0 +1,346 @@
+"""
+Image derivatives generated off the request path.
+
+Before an uploaded image is hashed into its storage key, `strip_metadata`
+rewrites it without EXIF, XMP, IPTC and comments (camera model, GPS
+position, capture time). It edits the container only, so pixels are not
+re-encoded and equal uploads still share one blob; an EXIF orientation
+other than "normal" is kept as a minimal EXIF block holding just that tag.
+Blobs stored before this step existed keep their metadata.
+
+After the upload is committed, `schedule_derivatives` hands a local copy
+of the file to a process pool that writes WebP thumbnail / medium /
+full-size variants, which are then moved into media storage. Orientation
+is baked into their pixels and no metadata is copied. When the job
+finishes the variant URLs are stored on `Media.derivatives` and list
+endpoints start serving them instead of the original.
+
+The same job renders a tiny blurred WebP placeholder (a data: URI of a few
+hundred bytes) that feed cards show inline while the real image loads.
+Width and height are read from the file header during the upload request
+itself, so clients can reserve the right box before anything is decoded.
+"""
+
+import base64
+import hashlib
+import io
+import multiprocessing
+import os
+import struct
+import threading
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import current_app
+
+from .extensions import db
+from .storage import get_storage
+
+# name -> longest side in pixels (None keeps the original size)
+SIZES = {
+    "thumb": 320,
+    "medium": 1080,
+    "webp": None,
+}
+
+# Longest side of the inline placeholder, in pixels
+PLACEHOLDER_SIZE = 16
+
+# EXIF orientations that rotate the image by 90 degrees
+_TRANSPOSED = {5, 6, 7, 8}
+
+_pool_lock = threading.Lock()
+_pool = None
+
+
+def image_size(path: str):
+    """(width, height) as displayed, from the header only; (None, None) if unreadable."""
+    from PIL import Image
+
+    try:
+        with Image.open(path) as im:
+            width, height = im.size
+            if im.getexif().get(0x0112) in _TRANSPOSED:
+                width, height = height, width
+            return width, height
+    except Exception:
+        return None, None
+
+
+def _orientation_tiff(orientation: int) -> bytes:
+    """A big-endian TIFF block with a single IFD entry: Orientation (0x0112)."""
+    return (b"MM\x00\x2a\x00\x00\x00\x08\x00\x01"
+            + struct.pack(">HHIHH", 0x0112, 3, 1, orientation, 0)
+            + b"\x00\x00\x00\x00")
+
+
+# JPEG APPn segments worth keeping: JFIF (APP0), ICC profile (APP2) and
+# Adobe (APP14, tells decoders the colour transform)
+_JPEG_KEEP_APP = {0xE0, 0xEE}
+_JPEG_STANDALONE = {0x01} | set(range(0xD0, 0xD8))
+
+
+def _strip_jpeg(data: bytes, orientation: int) -> bytes:
+    if data[:2] != b"\xff\xd8":
+        raise ValueError("not a JPEG")
+    out = [b"\xff\xd8"]
+    i = 2
+    while True:
+        if data[i] != 0xFF:
+            raise ValueError("bad JPEG marker")
+        marker = data[i + 1]
+        if marker == 0xFF:  # fill byte
+            i += 1
+            continue
+        if marker == 0xD9:
+            # Drop anything after EOI: MPF previews carry their own EXIF
+            out.append(b"\xff\xd9")
+            break
+        if marker in _JPEG_STANDALONE:
+            out.append(data[i:i + 2])
+            i += 2
+            continue
+        end = i + 2 + struct.unpack(">H", data[i + 2:i + 4])[0]
+        if end > len(data):
+            raise ValueError("truncated JPEG")
+        segment, i = data[i:end], end
+        is_icc = marker == 0xE2 and segment[4:16] == b"ICC_PROFILE\x00"
+        if 0xE0 <= marker <= 0xEF and marker not in _JPEG_KEEP_APP and not is_icc:
+            continue
+        if marker == 0xFE:  # comment
+            continue
+        out.append(segment)
+        if marker == 0xE0 and len(out) == 2 and orientation != 1:
+            out.append(_jpeg_app1(orientation))
+        if marker == 0xDA:
+            # Entropy-coded data runs to the next marker other than a
+            # stuffed 0xFF00 or a restart marker
+            j = i
+            while True:
+                j = data.index(b"\xff", j)
+                if data[j + 1] == 0 or 0xD0 <= data[j + 1] <= 0xD7:
+                    j += 2
+                    continue
+                break
+            out.append(data[i:j])
+            i = j
+    if orientation != 1 and not any(part[:2] == b"\xff\xe1" for part in out):
+        out.insert(1, _jpeg_app1(orientation))
+    return b"".join(out)
+
+
+def _jpeg_app1(orientation: int) -> bytes:
+    payload = b"Exif\x00\x00" + _orientation_tiff(orientation)
+    return b"\xff\xe1" + struct.pack(">H", len(payload) + 2) + payload
+
+
+# Ancillary PNG chunks with text, timestamps or EXIF
+_PNG_DROP = {b"eXIf", b"tEXt", b"zTXt", b"iTXt", b"tIME"}
+
+
+def _png_chunk(ctype: bytes, body: bytes) -> bytes:
+    return struct.pack(">I", len(body)) + ctype + body + struct.pack(">I", zlib.crc32(ctype + body))
+
+
+def _strip_png(data: bytes, orientation: int) -> bytes:
+    if data[:8] != b"\x89PNG\r\n\x1a\n":
+        raise ValueError("not a PNG")
+    out = [data[:8]]
+    i = 8
+    while True:
+        length, ctype = struct.unpack(">I4s", data[i:i + 8])
+        end = i + 12 + length
+        if end > len(data):
+            raise ValueError("truncated PNG")
+        if ctype not in _PNG_DROP:
+            out.append(data[i:end])
+        if ctype == b"IHDR" and orientation != 1:
+            out.append(_png_chunk(b"eXIf", _orientation_tiff(orientation)))
+        i = end
+        if ctype == b"IEND":
+            break
+    return b"".join(out)
+
+
+def _strip_webp(data: bytes, orientation: int) -> bytes:
+    if data[:4] != b"RIFF" or data[8:12] != b"WEBP":
+        raise ValueError("not a WebP")
+    end = 8 + struct.unpack("<I", data[4:8])[0]
+    if end > len(data):
+        raise ValueError("truncated WebP")
+    chunks = []
+    i = 12
+    while i + 8 <= end:
+        fourcc, size = struct.unpack("<4sI", data[i:i + 8])
+        chunk_end = i + 8 + size + (size & 1)
+        if fourcc not in (b"EXIF", b"XMP "):
+            chunks.append(bytearray(data[i:chunk_end]))
+        i = chunk_end
+    if orientation != 1:
+        tiff = _orientation_tiff(orientation)
+        chunks.append(bytearray(b"EXIF" + struct.pack("<I", len(tiff)) + tiff))
+    if chunks and chunks[0][:4] == b"VP8X":
+        # Flags byte: 0x08 = has EXIF, 0x04 = has XMP
+        chunks[0][8] = (chunks[0][8] & ~0x0C) | (0x08 if orientation != 1 else 0)
+    body = b"WEBP" + b"".join(chunks)
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+_STRIPPERS = {"image/jpeg": _strip_jpeg, "image/png": _strip_png, "image/webp": _strip_webp}
+
+
+def strip_metadata(path: str, mime: str):
+    """Rewrite the image at `path` in place without metadata.
+
+    Returns (sha256, size) of the new file, or None if there was nothing to
+    remove. Raises ValueError if the file cannot be parsed.
+    """
+    from PIL import Image
+
+    strip = _STRIPPERS.get(mime)
+    if strip is None:
+        return None
+    try:
+        with Image.open(path) as im:
+            orientation = im.getexif().get(0x0112, 1)
+    except Exception as e:
+        raise ValueError(f"unreadable image: {e}")
+    if orientation not in range(1, 9):
+        orientation = 1
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        cleaned = strip(data, orientation)
+    except (IndexError, struct.error) as e:
+        raise ValueError(f"malformed image: {e}")
+    if cleaned == data:
+        return None
+    tmp = path + ".strip"
+    with open(tmp, "wb") as f:
+        f.write(cleaned)
+    os.replace(tmp, path)
+    return hashlib.sha256(cleaned).hexdigest(), len(cleaned)
+
+
+def make_placeholder(im) -> str:
+    """A blurred PLACEHOLDER_SIZE px WebP of `im` as a data: URI."""
+    from PIL import Image, ImageFilter
+
+    small = im.copy()
+    small.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE), Image.BILINEAR)
+    small = small.filter(ImageFilter.GaussianBlur(1))
+    buf = io.BytesIO()
+    small.save(buf, "WEBP", quality=30, method=6)
+    return "data:image/webp;base64," + base64.b64encode(buf.getvalue()).decode()
+
+
+def make_derivatives(src_path: str, out_dir: str, stem: str, quality: int = 80) -> dict:
+    """Write WebP variants of `src_path`.
+
+    Returns {"files": {name: filename}, "width", "height", "placeholder"}.
+    Runs in a worker process, so it must only depend on Pillow and its args.
+    """
+    from PIL import Image, ImageOps
+
+    files = {}
+    with Image.open(src_path) as im:
+        im = ImageOps.exif_transpose(im)
+        if im.mode not in ("RGB", "RGBA"):
+            im = im.convert("RGBA" if "A" in im.getbands() else "RGB")
+        for name, size in SIZES.items():
+            variant = im.copy()
+            if size is not None:
+                variant.thumbnail((size, size), Image.LANCZOS)
+            fname = f"{stem}_{name}.webp"
+            # No exif= argument: Pillow writes no metadata
+            variant.save(os.path.join(out_dir, fname), "WEBP", quality=quality, method=4)
+            files[name] = fname
+        width, height = im.size
+        placeholder = make_placeholder(im)
+    return {"files": files, "width": width, "height": height, "placeholder": placeholder}
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # fork rather than spawn: spawn re-imports __main__, which
+                # for dev servers and scripts means running create_app again
+                _pool = ProcessPoolExecutor(
+                    max_workers=current_app.config.get("IMAGE_WORKERS", 2),
+                    mp_context=multiprocessing.get_context("fork"),
+                )
+    return _pool
+
+
+def _store(app, storage, media_id, key, source_path, result):
+    """Move finished derivatives into storage and record them on Media."""
+    from .models.post import Media
+
+    filenames = result["files"]
+    out_dir = os.path.dirname(source_path)
+    stem = os.path.splitext(key)[0]
+    urls = {}
+    try:
+        for name, fname in filenames.items():
+            final_key = f"{stem}_{name}.webp"
+            storage.put_file(final_key, os.path.join(out_dir, fname), "image/webp")
+            urls[name] = storage.url(final_key)
+    finally:
+        for fname in filenames.values():
+            leftover = os.path.join(out_dir, fname)
+            if os.path.exists(leftover):
+                os.remove(leftover)
+        os.remove(source_path)
+
+    with app.app_context():
+        media = db.session.get(Media, media_id)
+        if media is None:
+            return
+        # Duplicates uploaded while the job ran share the same blob
+        Media.query.filter(Media.url == media.url, Media.derivatives.is_(None))\
+            .update({
+                "derivatives": urls,
+                "width": result["width"],
+                "height": result["height"],
+                "placeholder": result["placeholder"],
+            }, synchronize_session=False)
+        db.session.commit()
+
+
+def schedule_derivatives(media_id: int, key: str, source_path: str):
+    """Generate derivatives for an uploaded image according to IMAGE_PIPELINE.
+
+    `source_path` is a local copy of the blob that this function takes
+    ownership of and deletes when done. "process" (default) runs the work in
+    the process pool and returns at once, "inline" runs it in the request
+    (handy for scripts), "off" skips it.
+    """
+    app = current_app._get_current_object()
+    storage = get_storage()
+    mode = app.config.get("IMAGE_PIPELINE", "process")
+    if mode == "off":
+        os.remove(source_path)
+        return
+    # Write variants beside the source under temp names; _store moves them
+    out_dir, base = os.path.split(source_path)
+    args = (source_path, out_dir, base, app.config.get("IMAGE_QUALITY", 80))
+
+    if mode == "inline":
+        _store(app, storage, media_id, key, source_path, make_derivatives(*args))
+        return
+
+    def done(future):
+        try:
+            result = future.result()
+        except Exception:
+            app.logger.exception("Image derivatives failed for media %s", media_id)
+            os.remove(source_path)
+            return
+        try:
+            _store(app, storage, media_id, key, source_path, result)
+        except Exception:
+            app.logger.exception("Storing image derivatives failed for media %s", media_id)
+
+    _get_pool().submit(make_derivatives, *args).add_done_callback(done)
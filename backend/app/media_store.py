@@ -0,0 +1,228 @@
+"""
+Content-addressed media blobs.
+
+Uploads are stored under the key `<sha256><ext>`, with derivatives as
+`<sha256>_<variant>.webp`, in whichever backend `storage.py` configured. A
+blob's references are the `Media` rows and profile pictures pointing at it
+or at one of its derivatives, so uploading the same file twice only inserts
+a second row. Blobs are reclaimed when their last reference goes
+(`release`, called by delete_post) or by the periodic sweep in
+`collect_garbage` (`flask media-gc`), which also removes abandoned local
+temp files.
+
+Adding a reference and reclaiming a blob both hold `lock_blobs` on the
+blob until their transaction ends. Otherwise `release` could find no
+reference, a concurrent upload of the same bytes could commit its row and
+drop its copy because the blob exists, and `release` would then delete
+the blob under the new row. Postgres takes an advisory lock per blob and
+SQLite its database write lock. Other databases have no lock here, so
+`release` leaves their blobs to `collect_garbage`.
+"""
+
+import hashlib
+import os
+import shutil
+import time
+
+from sqlalchemy import text
+
+from .extensions import db
+from .images import SIZES
+from .models.post import Media
+from .models.user import User
+from .uploads import MIME_TYPES, TEMP_PREFIX
+
+
+def blob_key(sha256: str, ext: str) -> str:
+    return f"{sha256}{ext}"
+
+
+def _blob_keys(key: str) -> list:
+    """The blob itself plus every derivative that may exist for it."""
+    stem = os.path.splitext(key)[0]
+    return [key] + [f"{stem}_{name}.webp" for name in SIZES]
+
+
+def _family(key: str) -> str:
+    """The stem shared by a blob and its derivatives."""
+    stem, ext = os.path.splitext(key)
+    base, _, variant = stem.rpartition("_")
+    if ext == ".webp" and base and variant in SIZES:
+        return base
+    return stem
+
+
+def _family_keys(family: str, listed=()) -> set:
+    """Every key a reference to `family` can name: the listed objects, the
+    original under any upload extension, and the derivatives."""
+    keys = {key for key, _, _ in listed}
+    keys.update(family + ext for _, ext in MIME_TYPES.values())
+    keys.update(f"{family}_{name}.webp" for name in SIZES)
+    return keys
+
+
+def lock_blobs(keys) -> bool:
+    """Lock these blobs (and their derivatives) until the session's
+    transaction ends. Returns False if the database has no lock for it."""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        # Sorted, so two transactions locking overlapping sets cannot deadlock
+        for family in sorted({_family(k) for k in keys}):
+            lock_id = int.from_bytes(hashlib.sha256(family.encode()).digest()[:8], "big", signed=True)
+            db.session.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": lock_id})
+        return True
+    if dialect == "sqlite":
+        # A write, even one that matches nothing, takes SQLite's single write lock
+        db.session.execute(text("DELETE FROM media WHERE 0"))
+        return True
+    return False
+
+
+def referenced_families(storage, urls=None) -> set:
+    """Families (see `_family`) that a Media row or a profile picture points
+    at. With `urls`, only references to those URLs are looked up."""
+    found = set()
+    for column in (Media.url, User.profile_pic):
+        query = db.session.query(column).filter(column.isnot(None))
+        if urls is not None:
+            query = query.filter(column.in_(list(urls)))
+        for (url,) in query.distinct():
+            key = storage.key_for_url(url)
+            if key:
+                found.add(_family(key))
+    return found
+
+
+def _reclaim(keys, storage) -> int:
+    """Delete the families of `keys` that nothing references, under lock.
+
+    Ends the session's transaction, which releases the lock.
+    """
+    try:
+        if not lock_blobs(keys):
+            return 0
+        family_urls = [storage.url(k) for key in keys for k in _family_keys(_family(key))]
+        in_use = referenced_families(storage, family_urls)
+        doomed = [k for key in keys if _family(key) not in in_use for k in _blob_keys(key)]
+        return storage.delete_many(doomed) if doomed else 0
+    finally:
+        db.session.rollback()
+
+
+def store_incoming(incoming, storage, keep_source: bool = False):
+    """Place a finished `IncomingFile` at its content address.
+
+    If the blob already exists the temp file is dropped and nothing new is
+    written. With `keep_source`, a newly stored blob's bytes are also left
+    in a local temp file whose path is returned; the caller owns it. Call
+    this after committing the referencing Media row under `lock_blobs`:
+    a `release` that ran first has then finished deleting, so `exists`
+    cannot see a blob that is about to go. On databases without a lock,
+    `release` never deletes inline. If storing fails, no temp file is left
+    behind and the caller should delete the rows it committed.
+    """
+    key = blob_key(incoming.sha256, incoming.ext)
+    if storage.exists(key):
+        incoming.discard()
+        return None
+    source = None
+    if keep_source:
+        source = incoming.temp_path + ".src"
+        try:
+            os.link(incoming.temp_path, source)
+        except OSError:
+            shutil.copyfile(incoming.temp_path, source)
+    path, incoming.temp_path = incoming.temp_path, None
+    try:
+        storage.put_file(key, path, incoming.mime)
+    except BaseException:
+        for leftover in (path, source):
+            if leftover and os.path.exists(leftover):
+                os.remove(leftover)
+        raise
+    return source
+
+
+# Families per locked transaction in collect_garbage
+GC_BATCH = 200
+
+# Columns filled in by the image pipeline; equal blobs share their values
+IMAGE_FIELDS = ("derivatives", "width", "height", "placeholder")
+
+
+def existing_image_fields(url: str) -> dict:
+    """Derivatives, size and placeholder already generated for another
+    reference to the same blob, as Media keyword arguments ({} if none)."""
+    row = db.session.query(*(getattr(Media, f) for f in IMAGE_FIELDS))\
+        .filter(Media.url == url, Media.derivatives.isnot(None))\
+        .first()
+    return dict(zip(IMAGE_FIELDS, row)) if row else {}
+
+
+def existing_image_fields_many(urls) -> dict:
+    """`existing_image_fields` for several URLs in one query: {url: fields}."""
+    urls = set(urls)
+    if not urls:
+        return {}
+    rows = db.session.query(Media.url, *(getattr(Media, f) for f in IMAGE_FIELDS))\
+        .filter(Media.url.in_(urls), Media.derivatives.isnot(None))
+    return {row[0]: dict(zip(IMAGE_FIELDS, row[1:])) for row in rows}
+
+
+def release(urls, storage) -> int:
+    """Delete blobs among `urls` that nothing references any more.
+
+    All unreferenced blobs and their derivatives go in one batch delete.
+    Returns the number of objects removed. Ends the session's transaction.
+    """
+    keys = sorted({k for k in (storage.key_for_url(u) for u in set(urls) if u) if k})
+    return _reclaim(keys, storage) if keys else 0
+
+
+def collect_garbage(storage, temp_dir: str, grace_seconds: int = 3600) -> dict:
+    """Sweep storage for unreferenced blobs and temp_dir for stale temp files.
+
+    Objects younger than `grace_seconds` are left alone so in-flight uploads
+    and derivative jobs are never touched.
+    """
+    referenced = referenced_families(storage)
+    db.session.rollback()
+
+    stats = {"blobs": 0, "temp": 0, "bytes": 0}
+    cutoff = time.time() - grace_seconds
+
+    listed = {}
+    for key, size, mtime in storage.list():
+        if key.startswith(TEMP_PREFIX) or key == ".gitkeep":
+            continue
+        listed.setdefault(_family(key), []).append((key, size, mtime))
+    families = sorted(f for f, objects in listed.items()
+                      if f not in referenced and any(mtime <= cutoff for _, _, mtime in objects))
+
+    # A blob may gain a reference while we list, so check again under lock,
+    # a batch of families at a time to keep each transaction short
+    for i in range(0, len(families), GC_BATCH):
+        batch = families[i:i + GC_BATCH]
+        try:
+            lock_blobs(batch)
+            urls = [storage.url(k) for f in batch for k in _family_keys(f, listed[f])]
+            in_use = referenced_families(storage, urls)
+            doomed = [(key, size) for f in batch if f not in in_use
+                      for key, size, mtime in listed[f] if mtime <= cutoff]
+            if doomed:
+                stats["blobs"] += storage.delete_many([k for k, _ in doomed])
+                stats["bytes"] += sum(size for _, size in doomed)
+        finally:
+            db.session.rollback()
+
+    if os.path.isdir(temp_dir):
+        for entry in os.scandir(temp_dir):
+            if not (entry.is_file() and entry.name.startswith(TEMP_PREFIX)):
+                continue
+            st = entry.stat()
+            if st.st_mtime > cutoff:
+                continue
+            os.remove(entry.path)
+            stats["temp"] += 1
+            stats["bytes"] += st.st_size
+    return stats
@@ -0,0 +1,321 @@
+"""
+Request, database and Socket.IO metrics in Prometheus text format.
+
+Each worker records into an in-process `Registry`: plain dicts and lists
+updated under one lock held for a couple of increments, so a request pays
+about a microsecond. Every METRICS_FLUSH_SECONDS (and at exit) a worker
+writes a JSON snapshot to METRICS_DIR/<pid>.json. GET /metrics merges the
+snapshots of every worker with its own live values, so any worker answers
+for the whole gunicorn server:
+
+- counters and histograms are summed, including those of workers that
+  have exited (their last snapshot is kept for METRICS_RETENTION_SECONDS)
+- gauges (requests in flight, pool usage) only count live workers
+
+Recorded series:
+
+- http_requests_total{blueprint,endpoint,method,status}
+- http_request_duration_seconds{blueprint,endpoint} histogram
+- http_request_db_seconds_total{blueprint,endpoint}: DB time, so
+  rate(db) / rate(duration_sum) is the database share of request time
+- http_requests_in_flight
+- socketio_emits_total{event}
+- admission_*: shed requests, queue time and current limits per request
+  class (app/admission.py)
+- db_pool_*: checkouts, checkout waits, timeouts, reconnects and pool
+  usage from app/db_pool.py
+- compression_{input,output}_bytes_total{encoding}: response bytes before
+  and after compression (app/compression.py)
+"""
+
+import atexit
+import bisect
+import json
+import os
+import tempfile
+import threading
+import time
+
+from flask import Response, g, has_request_context, request
+
+from . import db_pool
+from .query_profiler import statement_listeners
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUEUE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+
+# name -> (type, help, buckets for histograms)
+FAMILIES = {
+    "http_requests_total": ("counter", "HTTP requests by endpoint and status.", None),
+    "http_request_duration_seconds": ("histogram", "HTTP request latency.", LATENCY_BUCKETS),
+    "http_request_db_seconds_total": ("counter", "Time spent in SQL statements during requests.", None),
+    "http_requests_in_flight": ("gauge", "Requests currently being handled.", None),
+    "socketio_emits_total": ("counter", "Socket.IO events emitted by the server.", None),
+    "admission_rejected_total": ("counter", "Requests shed with 503 by admission control.", None),
+    "admission_queue_seconds": ("histogram", "Time requests waited for an admission slot.", QUEUE_BUCKETS),
+    "admission_limit": ("gauge", "Current adaptive concurrency limit per request class.", None),
+    "db_pool_checkouts_total": ("counter", "Connections checked out of the pool.", None),
+    "db_pool_checkout_wait_seconds": ("histogram", "Time spent waiting for a pooled connection.", db_pool.WAIT_BUCKETS),
+    "db_pool_checkout_timeouts_total": ("counter", "Checkouts that gave up after DB_POOL_TIMEOUT.", None),
+    "db_pool_connects_total": ("counter", "New database connections opened.", None),
+    "db_pool_invalidations_total": ("counter", "Connections discarded (failed pre-ping, recycle, disconnect).", None),
+    "db_pool_size": ("gauge", "Configured pool size.", None),
+    "db_pool_checked_out": ("gauge", "Connections currently checked out.", None),
+    "db_pool_overflow": ("gauge", "Connections open beyond the pool size.", None),
+    "compression_input_bytes_total": ("counter", "Response bytes before compression.", None),
+    "compression_output_bytes_total": ("counter", "Response bytes after compression.", None),
+}
+
+
+class Registry:
+    """One worker's metrics. Keys are (name, ((label, value), ...))."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}  # key -> [bucket counts..., +Inf count, sum]
+
+    def inc(self, name, labels=(), value=1.0):
+        key = (name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0.0) + value
+
+    def set(self, name, labels=(), value=0.0):
+        with self._lock:
+            self.gauges[(name, labels)] = value
+
+    def add(self, name, labels=(), value=1.0):
+        key = (name, labels)
+        with self._lock:
+            self.gauges[key] = self.gauges.get(key, 0.0) + value
+
+    def observe(self, name, labels, value):
+        buckets = FAMILIES[name][2]
+        i = bisect.bisect_left(buckets, value)
+        key = (name, labels)
+        with self._lock:
+            h = self.histograms.get(key)
+            if h is None:
+                h = self.histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+            h[i] += 1
+            h[-1] += value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "counters": [[n, list(l), v] for (n, l), v in self.counters.items()],
+                "gauges": [[n, list(l), v] for (n, l), v in self.gauges.items()],
+                "histograms": [[n, list(l), list(h)] for (n, l), h in self.histograms.items()],
+            }
+
+
+registry = Registry()
+
+
+def collect_pool_metrics(engine):
+    """Copy the pool counters of app/db_pool.py into the registry."""
+    usage = db_pool.pool_stats(engine)
+    with db_pool.stats._lock:
+        wait_buckets = list(db_pool.stats.wait_buckets)
+        wait_sum = db_pool.stats.wait_seconds
+    with registry._lock:
+        for name, field in (("db_pool_checkouts_total", "checkouts"),
+                            ("db_pool_checkout_timeouts_total", "checkout_timeouts"),
+                            ("db_pool_connects_total", "connects"),
+                            ("db_pool_invalidations_total", "invalidations")):
+            registry.counters[(name, ())] = float(usage[field])
+        registry.histograms[("db_pool_checkout_wait_seconds", ())] = wait_buckets + [wait_sum]
+        for name, field in (("db_pool_size", "size"), ("db_pool_checked_out", "checked_out"),
+                            ("db_pool_overflow", "overflow")):
+            if field in usage:
+                registry.gauges[(name, ())] = float(usage[field])
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _read_snapshots(directory, retention):
+    """Snapshots of the other workers as (snapshot, alive) pairs."""
+    if not directory or not os.path.isdir(directory):
+        return []
+    snapshots = []
+    now = time.time()
+    for name in os.listdir(directory):
+        if not name.endswith(".json") or name == f"{os.getpid()}.json":
+            continue
+        path = os.path.join(directory, name)
+        try:
+            with open(path) as f:
+                snapshot = json.load(f)
+            mtime = os.path.getmtime(path)
+        except (OSError, ValueError):
+            continue
+        alive = _pid_alive(snapshot["pid"])
+        if not alive and now - mtime > retention:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        snapshots.append((snapshot, alive))
+    return snapshots
+
+
+def merge(snapshots) -> dict:
+    """Sum (snapshot, alive) pairs into one set of series."""
+    counters, gauges, histograms = {}, {}, {}
+    for snapshot, alive in snapshots:
+        for name, labels, value in snapshot["counters"]:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0.0) + value
+        if alive:
+            for name, labels, value in snapshot["gauges"]:
+                key = (name, tuple(map(tuple, labels)))
+                gauges[key] = gauges.get(key, 0.0) + value
+        for name, labels, values in snapshot["histograms"]:
+            key = (name, tuple(map(tuple, labels)))
+            if key in histograms:
+                histograms[key] = [a + b for a, b in zip(histograms[key], values)]
+            else:
+                histograms[key] = list(values)
+    return {"counters": counters, "gauges": gauges, "histograms": histograms}
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels, extra=()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _number(value) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render(merged) -> str:
+    """Prometheus text exposition format (version 0.0.4)."""
+    series = {}
+    for kind in ("counters", "gauges", "histograms"):
+        for (name, labels), value in merged[kind].items():
+            series.setdefault(name, []).append((labels, value))
+    lines = []
+    for name, (kind, help_text, buckets) in FAMILIES.items():
+        if name not in series:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in sorted(series[name]):
+            if kind != "histogram":
+                lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets, value):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels, [('le', bound)])} {_number(cumulative)}")
+            cumulative += value[len(buckets)]
+            lines.append(f"{name}_bucket{_labels(labels, [('le', '+Inf')])} {_number(cumulative)}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(value[-1])}")
+            lines.append(f"{name}_count{_labels(labels)} {_number(cumulative)}")
+    return "\n".join(lines) + "\n"
+
+
+def write_snapshot(directory):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{os.getpid()}.json")
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(registry.snapshot(), f)
+    os.replace(tmp, path)
+
+
+def _count_emits(socketio):
+    emit = socketio.emit
+    if getattr(emit, "_counted", False):
+        return
+
+    def counted_emit(event, *args, **kwargs):
+        registry.inc("socketio_emits_total", (("event", event),))
+        return emit(event, *args, **kwargs)
+
+    counted_emit._counted = True
+    socketio.emit = counted_emit
+
+
+def _record_db_time(conn, statement, parameters, context, executemany, seconds):
+    if has_request_context():
+        g._metrics_db_seconds = g.get("_metrics_db_seconds", 0.0) + seconds
+
+
+def init_metrics(app, engine, socketio):
+    """Install request/emit recording, snapshot flushing and GET /metrics."""
+    if not app.config.get("METRICS_ENABLED", True):
+        return
+    directory = app.config.get("METRICS_DIR") or os.path.join(tempfile.gettempdir(), "campusfeed-metrics")
+    flush_interval = app.config.get("METRICS_FLUSH_SECONDS", 5)
+    retention = app.config.get("METRICS_RETENTION_SECONDS", 86400)
+    token = app.config.get("METRICS_TOKEN", "")
+
+    if _record_db_time not in statement_listeners:
+        statement_listeners.append(_record_db_time)
+    _count_emits(socketio)
+
+    @app.before_request
+    def _metrics_start():
+        g._metrics_start = time.perf_counter()
+        registry.add("http_requests_in_flight")
+
+    @app.after_request
+    def _metrics_status(response):
+        g._metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _metrics_finish(exc):
+        start = g.pop("_metrics_start", None)
+        if start is None:
+            return
+        registry.add("http_requests_in_flight", value=-1)
+        elapsed = time.perf_counter() - start
+        # Unmatched URLs share one label so scanners cannot blow up cardinality
+        route = (("blueprint", request.blueprint or "app"), ("endpoint", request.endpoint or "unmatched"))
+        status = g.pop("_metrics_status", 500)
+        registry.inc("http_requests_total", route + (("method", request.method), ("status", str(status))))
+        registry.observe("http_request_duration_seconds", route, elapsed)
+        registry.inc("http_request_db_seconds_total", route, g.pop("_metrics_db_seconds", 0.0))
+
+    def flush():
+        collect_pool_metrics(engine)
+        write_snapshot(directory)
+
+    def flush_loop():
+        while True:
+            time.sleep(flush_interval)
+            try:
+                flush()
+            except Exception:
+                app.logger.exception("Writing metrics snapshot failed")
+
+    if flush_interval > 0:
+        threading.Thread(target=flush_loop, name="metrics-flush", daemon=True).start()
+        atexit.register(flush)
+
+    @app.get("/metrics")
+    def metrics():
+        if token and request.headers.get("Authorization") != f"Bearer {token}":
+            return {"error": "Unauthorized"}, 401
+        collect_pool_metrics(engine)
+        snapshots = [(registry.snapshot(), True)] + _read_snapshots(directory, retention)
+        return Response(render(merge(snapshots)), mimetype="text/plain; version=0.0.4")
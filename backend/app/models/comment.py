@@ -13,6 +13,11 @@ class Comment(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_deleted = db.Column(db.Boolean, default=False)
 
+    __table_args__ = (
+        db.Index("ix_comments_post_created", "post_id", "created_at"),  # list_comments
+        db.Index("ix_comments_user_created", "user_id", "created_at"),  # profile comment lists
+    )
+
     # Relationships for nested comments
     replies = db.relationship("Comment", backref=db.backref("parent", remote_side=[id]), cascade="all, delete-orphan", passive_deletes=True)
     reactions = db.relationship("Reaction", backref="comment", cascade="all, delete-orphan", passive_deletes=True)
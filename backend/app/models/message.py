@@ -11,5 +11,12 @@ class Message(db.Model):
     is_read = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
+    __table_args__ = (
+        # Threads and conversations look messages up from both ends
+        db.Index("ix_messages_sender_recipient_created", "sender_id", "recipient_id", "created_at"),
+        db.Index("ix_messages_recipient_sender_created", "recipient_id", "sender_id", "created_at"),
+        db.Index("ix_messages_recipient_unread", "recipient_id", "is_read"),
+    )
+
     sender = db.relationship("User", foreign_keys=[sender_id])
     recipient = db.relationship("User", foreign_keys=[recipient_id])
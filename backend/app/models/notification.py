@@ -13,6 +13,11 @@ class Notification(db.Model):
     actor_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)  # Who triggered the notification
     is_read = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    __table_args__ = (
+        db.Index("ix_notifications_user_created", "user_id", "created_at"),
+        db.Index("ix_notifications_user_unread", "user_id", "is_read"),
+    )
     
     # Relationships
     user = db.relationship("User", foreign_keys=[user_id], backref="notifications")
@@ -13,6 +13,12 @@ class Post(db.Model):
     edited_at = db.Column(db.DateTime)
     is_deleted = db.Column(db.Boolean, default=False)
 
+    __table_args__ = (
+        db.Index("ix_posts_feed", "is_deleted", "created_at"),  # list_posts
+        db.Index("ix_posts_category_created", "category", "created_at"),
+        db.Index("ix_posts_user_created", "user_id", "created_at"),  # profile post lists
+    )
+
     # Relationships with cascade delete
     comments = db.relationship("Comment", backref="post", cascade="all, delete-orphan", passive_deletes=True)
     media = db.relationship("Media", backref="post", cascade="all, delete-orphan", passive_deletes=True)
@@ -26,4 +32,23 @@ class Media(db.Model):
     url = db.Column(db.String(512))
     mime = db.Column(db.String(120))
     size_bytes = db.Column(db.Integer)
+    sha256 = db.Column(db.String(64), index=True)  # content hash; the blob is shared by equal uploads
+    derivatives = db.Column(db.JSON(none_as_null=True))  # {"thumb": url, "medium": url, "webp": url} for images
+    width = db.Column(db.Integer)  # display size of images, after EXIF rotation
+    height = db.Column(db.Integer)
+    placeholder = db.Column(db.Text)  # tiny blurred data: URI shown while the image loads
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index("ix_media_url", "url"),  # blob reference counts and dedup lookups
+        db.Index("ix_media_post_type", "post_id", "type"),  # feed cover images
+    )
+
+    def variant_url(self, name: str) -> str:
+        """URL of a derivative, falling back to the original until it exists."""
+        return variant_url(self.url, self.derivatives, name)
+
+
+def variant_url(url, derivatives, name: str):
+    """`Media.variant_url` for column-projection rows."""
+    return (derivatives or {}).get(name) or url
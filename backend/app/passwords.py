@@ -0,0 +1,99 @@
+"""
+Password hashing off the request thread.
+
+scrypt/pbkdf2 are CPU bound and, under the gevent worker, would block the
+hub (and every socket connection on it) for the whole hash. The hashlib
+implementations release the GIL, so we run them on real OS threads: a
+gevent ThreadPool when the process is monkey-patched, a plain
+ThreadPoolExecutor otherwise. A bounded semaphore caps queued work so a
+login flood fails fast with `HashingBusy` instead of piling up.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash
+
+try:
+    from gevent import monkey as _gevent_monkey
+except ImportError:  # gevent is only needed for the production worker
+    _gevent_monkey = None
+
+DEFAULT_METHOD = "scrypt:32768:8:1"
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing queue is full."""
+
+
+_pool_lock = threading.Lock()
+_pool = None
+_slots = None
+_green = False
+_signatures = {}
+
+
+def _config(key, default):
+    if has_app_context():
+        return current_app.config.get(key, default)
+    return default
+
+
+def _get_pool():
+    global _pool, _slots, _green
+    if _pool is not None:
+        return _pool, _slots
+    with _pool_lock:
+        if _pool is None:
+            threads = _config("PASSWORD_HASH_THREADS", 4)
+            queue = _config("PASSWORD_HASH_QUEUE", 64)
+            _green = bool(_gevent_monkey and _gevent_monkey.is_module_patched("threading"))
+            if _green:
+                from gevent.threadpool import ThreadPool
+                _pool = ThreadPool(threads)
+            else:
+                _pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="pwhash")
+            # threading is looked up here so gevent's patched primitive is used
+            _slots = threading.BoundedSemaphore(threads + queue)
+    return _pool, _slots
+
+
+def _run(fn, *args):
+    pool, slots = _get_pool()
+    if not slots.acquire(timeout=_config("PASSWORD_HASH_QUEUE_TIMEOUT", 5)):
+        raise HashingBusy()
+    try:
+        if _green:
+            return pool.spawn(fn, *args).get()
+        return pool.submit(fn, *args).result()
+    finally:
+        slots.release()
+
+
+def _method():
+    return _config("PASSWORD_HASH_METHOD", DEFAULT_METHOD)
+
+
+def _signature(method):
+    """Parameter prefix werkzeug writes for `method`, e.g. "scrypt:32768:8:1"."""
+    sig = _signatures.get(method)
+    if sig is None:
+        sig = _run(generate_password_hash, "", method).split("$", 1)[0]
+        _signatures[method] = sig
+    return sig
+
+
+def hash_password(password: str) -> str:
+    return _run(generate_password_hash, password, _method())
+
+
+def verify_password(pwhash: str, password: str) -> bool:
+    if not pwhash or password is None:
+        return False
+    return _run(check_password_hash, pwhash, password)
+
+
+def needs_rehash(pwhash: str) -> bool:
+    """True when `pwhash` was made with different parameters than configured."""
+    return pwhash.split("$", 1)[0] != _signature(_method())
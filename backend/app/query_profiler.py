@@ -0,0 +1,196 @@
+"""
+Per-request SQL profiling and N+1 detection.
+
+Cursor-level SQLAlchemy events time every statement on every engine
+(primary and replicas). For each profiled request we keep the query count,
+total database time and how often each statement *shape* ran, where a
+shape is the SQL with literals and bound parameters replaced by `?`. A
+shape that repeats QUERY_PROFILER_N_PLUS_ONE times or more is reported as
+a likely N+1 loop, with the line of app code that issued it.
+
+- Debug (or QUERY_PROFILER_HEADERS=true): every response carries
+  X-Query-Count, X-Query-Time-Ms, X-Query-N-Plus-One and a Server-Timing
+  `db` entry, and suspected N+1 loops are logged as warnings.
+- Otherwise a QUERY_PROFILER_SAMPLE_RATE fraction of requests is profiled
+  and logged as one JSON line (`query_profile {...}`) on the `<app>.queries`
+  logger, which logs at INFO even when the app logger does not.
+"""
+
+import json
+import logging
+import os
+import random
+import re
+import sys
+import time
+from functools import lru_cache
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__)) + os.sep
+_THIS_FILE = os.path.abspath(__file__)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_PARAM = re.compile(r"%\(\w+\)s|%s|\?|(?<!:):\w+")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+_installed = False
+
+# Called as fn(conn, statement, parameters, context, executemany, seconds)
+# after every statement, e.g. by app/slow_queries.py
+statement_listeners = []
+
+
+@lru_cache(maxsize=4096)
+def statement_shape(statement: str) -> str:
+    """SQL with literals and parameters as `?` and IN lists collapsed."""
+    shape = _STRING.sub("?", statement)
+    shape = _PARAM.sub("?", shape)
+    shape = _NUMBER.sub("?", shape)
+    shape = _IN_LIST.sub("(?)", shape)
+    return _SPACE.sub(" ", shape).strip()
+
+
+def call_site() -> str:
+    """The innermost app frame on the stack, e.g. `routes/posts.py:54 list_posts`."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_APP_DIR) and filename != _THIS_FILE:
+            return f"{filename[len(_APP_DIR):]}:{frame.f_lineno} {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+class QueryProfile:
+    """Statements seen during one request."""
+
+    __slots__ = ("count", "seconds", "shapes", "sites", "threshold")
+
+    def __init__(self, threshold: int):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = {}
+        self.sites = {}
+        self.threshold = threshold
+
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        shape = statement_shape(statement)
+        n = self.shapes[shape] = self.shapes.get(shape, 0) + 1
+        # The stack is only walked once per suspicious shape, from inside the loop
+        if n == self.threshold:
+            self.sites[shape] = call_site()
+
+    def n_plus_one(self) -> list:
+        """Shapes repeated at least `threshold` times, most frequent first."""
+        suspects = [
+            {"count": n, "site": self.sites.get(shape, "unknown"), "sql": shape}
+            for shape, n in self.shapes.items() if n >= self.threshold
+        ]
+        return sorted(suspects, key=lambda s: -s["count"])
+
+    def summary(self) -> dict:
+        return {
+            "queries": self.count,
+            "db_ms": round(self.seconds * 1000, 2),
+            "distinct": len(self.shapes),
+            "n_plus_one": self.n_plus_one(),
+        }
+
+
+def current_profile():
+    """The QueryProfile of the current request, or None if it is not profiled."""
+    if has_request_context():
+        return g.get("_query_profile")
+    return None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("_query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    profile = current_profile()
+    if profile is not None:
+        profile.record(statement, elapsed)
+    for listener in statement_listeners:
+        listener(conn, statement, parameters, context, executemany, elapsed)
+
+
+def _handle_error(context):
+    # A failing statement never reaches after_cursor_execute; drop its start
+    # time so it does not stay on the pooled connection
+    conn = context.connection
+    if conn is None or context.execution_context is None:
+        return
+    starts = conn.info.get("_query_start")
+    if starts:
+        starts.pop()
+
+
+def _header_value(suspects) -> str:
+    # Header values must stay on one line and in latin-1
+    parts = [f"{s['count']}x {s['site']} {s['sql'][:80]}" for s in suspects[:3]]
+    return " | ".join(parts).encode("latin-1", "replace").decode("latin-1")
+
+
+def init_query_profiler(app):
+    """Install the statement timers and the per-request profiling hooks."""
+    global _installed
+    if not _installed:
+        # On the Engine class so replica engines are covered too
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+        _installed = True
+
+    headers = app.config.get("QUERY_PROFILER_HEADERS", "auto")
+    headers = app.debug if headers == "auto" else headers == "true"
+    sample_rate = app.config.get("QUERY_PROFILER_SAMPLE_RATE", 0.01)
+    threshold = app.config.get("QUERY_PROFILER_N_PLUS_ONE", 5)
+    # Child of app.logger, so it shares its handlers
+    log = logging.getLogger(f"{app.logger.name}.queries")
+    if log.level == logging.NOTSET:
+        log.setLevel(logging.INFO)
+
+    @app.before_request
+    def _start_query_profile():
+        if headers or (sample_rate > 0 and random.random() < sample_rate):
+            g._query_profile = QueryProfile(threshold)
+            g._query_profile_started = time.perf_counter()
+
+    @app.after_request
+    def _finish_query_profile(response):
+        profile = g.pop("_query_profile", None)
+        if profile is None:
+            return response
+        summary = profile.summary()
+        if headers:
+            response.headers["X-Query-Count"] = str(summary["queries"])
+            response.headers["X-Query-Time-Ms"] = str(summary["db_ms"])
+            response.headers.add("Server-Timing", f'db;dur={summary["db_ms"]};desc="{summary["queries"]} queries"')
+            if summary["n_plus_one"]:
+                response.headers["X-Query-N-Plus-One"] = _header_value(summary["n_plus_one"])
+                for s in summary["n_plus_one"]:
+                    app.logger.warning("Possible N+1 in %s %s: %dx at %s: %s",
+                                       request.method, request.path, s["count"], s["site"], s["sql"])
+        else:
+            log.info("query_profile %s", json.dumps({
+                "method": request.method,
+                "path": request.path,
+                "endpoint": request.endpoint,
+                "status": response.status_code,
+                "request_ms": round((time.perf_counter() - g._query_profile_started) * 1000, 2),
+                **summary,
+            }))
+        return response
@@ -0,0 +1,209 @@
+"""
+Rate limiting: shared storage, per-user keys and per-route overrides.
+
+flask-limiter keeps its counters wherever RATELIMIT_STORAGE_URI points.
+The default is a SQLite file in the temp directory, registered below as
+the `sqlite://` scheme. It is shared by every worker on the host, survives
+restarts and costs tens of microseconds per hit. Multi-host deployments
+should point it at Redis (`redis://...`, needs the `redis` package).
+
+Logged-in users are limited by user id, so a hostel behind one NAT address
+does not share a bucket. Anonymous requests are still limited by address.
+
+Any `@limiter.limit(...)` can be overridden without a code change:
+RATELIMIT_ROUTE_LIMITS="posts.list_posts=600/minute;auth.login=20/minute"
+(endpoint=limit, `;`-separated).
+"""
+
+import itertools
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from flask import request
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+from flask_login import current_user
+from limits.storage import MovingWindowSupport, Storage
+
+
+class SQLiteStorage(Storage, MovingWindowSupport):
+    """limits storage in a SQLite file, for fixed- and moving-window limits.
+
+    Every operation is one short statement or IMMEDIATE transaction on a
+    per-thread connection, in WAL mode with synchronous=OFF: losing the
+    last few counter updates in a power cut is fine for rate limits.
+
+    Moving-window entries are pruned per key on each check, and every
+    PRUNE_EVERY checks for all keys, so keys that are never seen again do
+    not pile up. The global prune keeps anything younger than the longest
+    window seen so far, and never less than the `max_window` option
+    (seconds, default one day); raise it through RATELIMIT_STORAGE_OPTIONS
+    if a route override uses a longer window.
+    """
+
+    STORAGE_SCHEME = ["sqlite"]
+    PRUNE_EVERY = 1000
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, **options):
+        # sqlite:///relative.db or sqlite:////absolute/path.db
+        self.path = uri.split("://", 1)[1][1:] or ":memory:"
+        self.busy_timeout_ms = int(options.pop("busy_timeout_ms", 5000))
+        self.max_window = float(options.pop("max_window", 86400))
+        self._checks = itertools.count()
+        self._local = threading.local()
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        conn = self._conn()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS counters (key TEXT PRIMARY KEY, value INTEGER NOT NULL, expiry REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS events (key TEXT NOT NULL, ts REAL NOT NULL);
+            CREATE INDEX IF NOT EXISTS ix_events_key_ts ON events (key, ts);
+        """)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Autocommit; transactions are opened explicitly where needed
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            conn.execute(f"PRAGMA busy_timeout={self.busy_timeout_ms}")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def incr(self, key: str, expiry: float, amount: int = 1) -> int:
+        now = time.time()
+        conn = self._conn()
+        # One atomic upsert: restart the window if it has expired
+        value = conn.execute(
+            """
+            INSERT INTO counters (key, value, expiry) VALUES (?1, ?2, ?3 + ?4)
+            ON CONFLICT (key) DO UPDATE SET
+                value = CASE WHEN expiry <= ?3 THEN ?2 ELSE value + ?2 END,
+                expiry = CASE WHEN expiry <= ?3 THEN ?3 + ?4 ELSE expiry END
+            RETURNING value
+            """,
+            (key, amount, now, expiry),
+        ).fetchone()[0]
+        if random.random() < 0.001:
+            conn.execute("DELETE FROM counters WHERE expiry <= ?", (now,))
+        return value
+
+    def decr(self, key: str, amount: int = 1) -> int:
+        row = self._conn().execute(
+            "UPDATE counters SET value = max(value - ?, 0) WHERE key = ? AND expiry > ? RETURNING value",
+            (amount, key, time.time()),
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get(self, key: str) -> int:
+        row = self._conn().execute(
+            "SELECT value FROM counters WHERE key = ? AND expiry > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key: str) -> float:
+        now = time.time()
+        row = self._conn().execute(
+            "SELECT expiry FROM counters WHERE key = ? AND expiry > ?", (key, now)
+        ).fetchone()
+        return row[0] if row else now
+
+    def check(self) -> bool:
+        try:
+            self._conn().execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self) -> int:
+        conn = self._conn()
+        removed = conn.execute("DELETE FROM counters").rowcount
+        removed += conn.execute("DELETE FROM events").rowcount
+        return removed
+
+    def clear(self, key: str) -> None:
+        conn = self._conn()
+        conn.execute("DELETE FROM counters WHERE key = ?", (key,))
+        conn.execute("DELETE FROM events WHERE key = ?", (key,))
+
+    def acquire_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        now = time.time()
+        self.max_window = max(self.max_window, expiry)
+        if next(self._checks) % self.PRUNE_EVERY == 0:
+            self.prune_events(now)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Drop this key's expired entries so the window count stays small
+            conn.execute("DELETE FROM events WHERE key = ? AND ts <= ?", (key, now - expiry))
+            count = conn.execute("SELECT count(*) FROM events WHERE key = ?", (key,)).fetchone()[0]
+            if count + amount > limit:
+                conn.execute("COMMIT")
+                return False
+            conn.executemany("INSERT INTO events (key, ts) VALUES (?, ?)", [(key, now)] * amount)
+            conn.execute("COMMIT")
+            return True
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def prune_events(self, now=None) -> int:
+        """Delete moving-window entries older than the longest window, for every key."""
+        now = time.time() if now is None else now
+        return self._conn().execute("DELETE FROM events WHERE ts <= ?", (now - self.max_window,)).rowcount
+
+    def get_moving_window(self, key: str, limit: int, expiry: int) -> tuple:
+        now = time.time()
+        oldest, count = self._conn().execute(
+            "SELECT min(ts), count(*) FROM events WHERE key = ? AND ts > ?", (key, now - expiry)
+        ).fetchone()
+        return (oldest, count) if count else (now, 0)
+
+
+def rate_limit_key() -> str:
+    """Limit logged-in users by id and everyone else by address."""
+    if current_user.is_authenticated:
+        return f"user:{current_user.id}"
+    return f"ip:{get_remote_address()}"
+
+
+def parse_route_limits(value: str) -> dict:
+    """'posts.list_posts=600/minute;auth.login=20/minute' -> {endpoint: limit}."""
+    limits = {}
+    for item in value.split(";"):
+        endpoint, _, limit = item.partition("=")
+        if endpoint.strip() and limit.strip():
+            limits[endpoint.strip()] = limit.strip()
+    return limits
+
+
+class ConfigurableLimiter(Limiter):
+    """Limiter whose route limits can be overridden by RATELIMIT_ROUTE_LIMITS."""
+
+    route_limits = {}
+
+    def init_app(self, app):
+        self.route_limits = parse_route_limits(app.config.get("RATELIMIT_ROUTE_LIMITS", ""))
+        super().init_app(app)
+
+    def limit(self, limit_value, *args, **kwargs):
+        if isinstance(limit_value, str):
+            default = limit_value
+
+            def limit_value():
+                return self.route_limits.get(request.endpoint, default)
+
+        return super().limit(limit_value, *args, **kwargs)
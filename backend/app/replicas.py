@@ -0,0 +1,174 @@
+"""
+Read-replica routing.
+
+With DATABASE_REPLICA_URLS set, `db.session` sends the reads of GET/HEAD
+requests to a healthy replica (round-robin) and everything else to the
+primary:
+
+- any flush, INSERT/UPDATE/DELETE, and every statement after the session's
+  first write go to the primary
+- after a request that wrote, the client's next requests read from the
+  primary for REPLICA_STICKY_SECONDS so users see their own changes despite
+  replication lag (read-your-writes)
+- views decorated with `use_primary`, code inside `with primary():`, and
+  work outside a request (CLI, background threads, socket events) always
+  use the primary
+- a health thread pings each replica every REPLICA_HEALTH_INTERVAL seconds;
+  replicas that fail, or that drop a connection mid-request, are skipped
+  until they answer again, and with none healthy reads fall back to the
+  primary
+
+Without replicas configured the session behaves exactly like before.
+"""
+
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+import sqlalchemy as sa
+from flask import current_app, g, has_request_context, request, session as cookie_session
+from flask_sqlalchemy.session import Session as FlaskSession
+from sqlalchemy import event, text
+
+from .db_pool import engine_options
+
+STICKY_KEY = "_db_primary_until"
+
+
+class ReplicaSet:
+    def __init__(self, app, urls):
+        self.app = app
+        self.engines = []
+        for url in urls:
+            options = engine_options({**app.config, "SQLALCHEMY_DATABASE_URI": url})
+            # Keep /healthz/pool checkout stats about the primary only
+            options.pop("poolclass", None)
+            engine = sa.create_engine(url, **options)
+            event.listen(engine, "handle_error", self._on_error)
+            self.engines.append(engine)
+        # Unhealthy until the first check passes, so a dead replica at boot
+        # never sees traffic
+        self.healthy = {engine: False for engine in self.engines}
+        self._rr = itertools.count()
+
+    def choose(self):
+        """A healthy replica engine, or None to use the primary."""
+        healthy = [e for e in self.engines if self.healthy[e]]
+        if not healthy:
+            return None
+        return healthy[next(self._rr) % len(healthy)]
+
+    def check(self):
+        for engine in self.engines:
+            try:
+                with engine.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+                ok = True
+            except Exception as e:
+                ok = False
+                if self.healthy[engine]:
+                    self.app.logger.warning("Replica %s failed health check: %s", _label(engine), e)
+            if ok and not self.healthy[engine]:
+                self.app.logger.info("Replica %s is healthy", _label(engine))
+            self.healthy[engine] = ok
+
+    def start_health_checks(self, interval: float):
+        def loop():
+            while True:
+                self.check()
+                time.sleep(interval)
+
+        threading.Thread(target=loop, name="replica-health", daemon=True).start()
+
+    def _on_error(self, context):
+        if context.is_disconnect and context.engine in self.healthy:
+            self.healthy[context.engine] = False
+
+
+def _label(engine):
+    return engine.url.render_as_string(hide_password=True)
+
+
+class RoutingSession(FlaskSession):
+    """Flask-SQLAlchemy session that can send a request's reads to a replica."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and not self.info.get("wrote") \
+                and not isinstance(clause, sa.sql.dml.UpdateBase):
+            replica = _request_replica()
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_write(session, flush_context):
+    session.info["wrote"] = True
+    if has_request_context():
+        g._db_wrote = True
+
+
+def _request_replica():
+    if not has_request_context():
+        return None
+    if "_db_replica" not in g:
+        g._db_replica = _route_request()
+    if g.get("_db_force_primary"):
+        return None
+    return g._db_replica
+
+
+def _route_request():
+    replicas = current_app.extensions.get("db_replicas")
+    if replicas is None or request.method not in ("GET", "HEAD") or request.url_rule is None:
+        return None
+    view = current_app.view_functions.get(request.endpoint)
+    if getattr(view, "_use_primary", False):
+        return None
+    if cookie_session.get(STICKY_KEY, 0) > time.time():
+        return None
+    return replicas.choose()
+
+
+def use_primary(view):
+    """Mark a GET view that must read from the primary (e.g. it writes)."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        return view(*args, **kwargs)
+    wrapper._use_primary = True
+    return wrapper
+
+
+@contextmanager
+def primary():
+    """Read from the primary inside this block, even on a replica-routed request."""
+    if not has_request_context():
+        yield
+        return
+    previous = g.get("_db_force_primary", False)
+    g._db_force_primary = True
+    try:
+        yield
+    finally:
+        g._db_force_primary = previous
+
+
+def init_replicas(app):
+    """Create replica engines from DATABASE_REPLICA_URLS and install the routing hooks."""
+    urls = [u.strip().replace("postgres://", "postgresql://")
+            for u in app.config.get("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
+    if not urls:
+        return None
+    replicas = ReplicaSet(app, urls)
+    app.extensions["db_replicas"] = replicas
+    replicas.start_health_checks(app.config.get("REPLICA_HEALTH_INTERVAL", 5))
+
+    @app.after_request
+    def _stick_to_primary(response):
+        if g.get("_db_wrote"):
+            cookie_session[STICKY_KEY] = time.time() + app.config.get("REPLICA_STICKY_SECONDS", 5)
+        return response
+
+    return replicas
@@ -3,6 +3,9 @@ from flask_login import login_user, logout_user, login_required, current_user
 from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
 from ..extensions import db, login_manager, limiter
 from ..models.user import User
+from ..identity import identity_cache
+from ..passwords import HashingBusy
+from ..replicas import use_primary
 from ..config import Config
 
 auth_bp = Blueprint("auth", __name__)
@@ -10,7 +13,7 @@ serializer = URLSafeTimedSerializer(secret_key=Config.SECRET_KEY)
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return identity_cache.get(int(user_id))
 
 @auth_bp.post("/signup")
 @limiter.limit("5/hour")
@@ -27,7 +30,10 @@ def signup():
     if User.query.filter_by(email=email).first():
         return jsonify({"error": "Email already registered"}), 400
     user = User(email=email, name=name)
-    user.set_password(password)
+    try:
+        user.set_password(password)
+    except HashingBusy:
+        return jsonify({"error": "Server busy, try again"}), 503, {"Retry-After": "5"}
     db.session.add(user)
     db.session.commit()
     token = serializer.dumps(email)
@@ -35,6 +41,7 @@ def signup():
     return jsonify({"message": "Signup successful. Check email for verification.", "token_debug": token}), 201
 
 @auth_bp.get("/verify")
+@use_primary
 def verify():
     token = request.args.get("token")
     try:
@@ -57,10 +64,17 @@ def login():
     email = data.get("email", "").strip().lower()
     password = data.get("password")
     user = User.query.filter_by(email=email).first()
-    if not user or not user.check_password(password):
-        return jsonify({"error": "Invalid credentials"}), 401
-    if not user.verified:
-        return jsonify({"error": "Email not verified"}), 403
+    try:
+        if not user or not user.check_password(password):
+            return jsonify({"error": "Invalid credentials"}), 401
+        if not user.verified:
+            return jsonify({"error": "Email not verified"}), 403
+        # Upgrade hashes made with old work-factor settings
+        if user.password_needs_rehash():
+            user.set_password(password)
+            db.session.commit()
+    except HashingBusy:
+        return jsonify({"error": "Server busy, try again"}), 503, {"Retry-After": "5"}
     login_user(user)
     return jsonify({"message": "Logged in", "user": user.to_dict()})
 
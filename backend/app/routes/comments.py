@@ -5,42 +5,32 @@ from ..extensions import db, limiter, socketio
 from ..models.comment import Comment
 from ..models.post import Post
 from ..models.notification import Notification
+from ..models.user import User
+from ..serialization import CommentNode
 
 comments_bp = Blueprint("comments", __name__)
 
 @comments_bp.get("/post/<int:post_id>")
 @limiter.limit("120/hour")
 def list_comments(post_id):
-    # Fetch all comments for the post
-    all_comments = Comment.query.filter_by(
-        post_id=post_id, 
-        is_deleted=False
+    # Fetch all comments for the post, with each author's name in the same query
+    rows = db.session.query(
+        Comment.id, Comment.post_id, Comment.parent_id, Comment.user_id,
+        User.name.label("user_name"), Comment.content, Comment.depth, Comment.created_at,
+    ).outerjoin(User, User.id == Comment.user_id).filter(
+        Comment.post_id == post_id,
+        Comment.is_deleted == False,
     ).order_by(Comment.created_at.asc()).all()
-    
-    def serialize(c: Comment):
-        return {
-            "id": c.id,
-            "post_id": c.post_id,
-            "parent_id": c.parent_id,
-            "user_id": c.user_id,
-            "user_name": c.user.name if c.user else "Unknown",
-            "content": c.content,
-            "depth": c.depth,
-            "created_at": c.created_at.isoformat() + "Z",
-        }
-    
+
     # Build tree structure
-    comment_map = {c.id: serialize(c) for c in all_comments}
-    for c in comment_map.values():
-        c['replies'] = []
-    
+    comment_map = {c.id: CommentNode.from_row(c) for c in rows}
+
     root_comments = []
-    for c in all_comments:
-        serialized = comment_map[c.id]
-        if c.parent_id is None:
-            root_comments.append(serialized)
-        elif c.parent_id in comment_map:
-            comment_map[c.parent_id]['replies'].append(serialized)
+    for node in comment_map.values():
+        if node.parent_id is None:
+            root_comments.append(node)
+        elif node.parent_id in comment_map:
+            comment_map[node.parent_id].replies.append(node)
     
     return jsonify({"comments": root_comments})
 
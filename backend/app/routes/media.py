@@ -1,13 +1,15 @@
+import base64
 import os
-from uuid import uuid4
+import tempfile
 from flask import Blueprint, request, jsonify, current_app
 from flask_login import login_required, current_user
-from werkzeug.utils import secure_filename
 from ..extensions import db, limiter
 from ..models.post import Media, Post
-
-ALLOWED_IMAGE_MIME = {"image/png", "image/jpeg", "image/webp"}
-ALLOWED_DOC_MIME = {"application/pdf"}
+from ..uploads import MIME_TYPES, SNIFF_BYTES, TEMP_PREFIX, UploadError, sniff_mime, stream_multipart
+from ..images import image_size, schedule_derivatives, strip_metadata
+from ..media_store import (blob_key, existing_image_fields, existing_image_fields_many, lock_blobs,
+                           store_incoming)
+from ..storage import get_storage
 
 media_bp = Blueprint("media", __name__)
 
@@ -15,42 +17,356 @@ media_bp = Blueprint("media", __name__)
 @login_required
 @limiter.limit("30/minute")
 def upload_media():
-    if "file" not in request.files:
-        return jsonify({"error": "No file part"}), 400
-    file = request.files["file"]
-    post_id = request.form.get("post_id")
+    # post_id may be sent in the query string so ownership is checked before
+    # any bytes are read; otherwise it is taken from the form after the file
+    post = None
+    if request.args.get("post_id"):
+        post = Post.query.get_or_404(int(request.args["post_id"]))
+        if post.user_id != current_user.id:
+            return jsonify({"error": "Not allowed"}), 403
+
+    upload_folder = current_app.config.get("UPLOAD_FOLDER")
+    os.makedirs(upload_folder, exist_ok=True)
+    max_bytes = current_app.config.get("MAX_UPLOAD_BYTES", 10 * 1024 * 1024)
+
+    try:
+        fields, files = stream_multipart(request, upload_folder, max_bytes)
+    except UploadError as e:
+        return jsonify({"error": e.message}), e.status
+
+    try:
+        incoming = next((f for f in files if f.field_name == "file"), None)
+        if incoming is None:
+            return jsonify({"error": "No file part"}), 400
+        if post is None:
+            post_id = fields.get("post_id")
+            if not post_id:
+                return jsonify({"error": "post_id required"}), 400
+            post = Post.query.get_or_404(int(post_id))
+            if post.user_id != current_user.id:
+                return jsonify({"error": "Not allowed"}), 403
+        _strip_metadata(incoming)
+        if incoming.error:
+            return jsonify({"error": incoming.error}), 400
+
+        # Content-addressed: identical uploads share one blob in storage
+        storage = get_storage()
+        key = blob_key(incoming.sha256, incoming.ext)
+        url = storage.url(key)
+        media = Media(
+            post_id=post.id,
+            type=incoming.type,
+            url=url,
+            mime=incoming.mime,
+            size_bytes=incoming.size_bytes,
+            sha256=incoming.sha256,
+            **_image_fields(incoming, existing_image_fields(url) if incoming.type == "image" else {}),
+        )
+        db.session.add(media)
+        lock_blobs([key])
+        db.session.commit()
+        try:
+            source = store_incoming(incoming, storage, keep_source=(media.type == "image" and media.derivatives is None))
+        except Exception:
+            # Don't leave a committed row pointing at a blob that never arrived
+            _delete_media([media])
+            raise
+    finally:
+        for f in files:
+            f.discard()
+
+    if source:
+        schedule_derivatives(media.id, key, source)
+
+    return jsonify({"id": media.id, "url": url, "type": incoming.type, "sha256": incoming.sha256}), 201
+
+
+@media_bp.post("/upload/batch")
+@login_required
+@limiter.limit("10/minute")
+def upload_media_batch():
+    """Attach several files to a post in one multipart request.
+
+    Form-data: one or more `files` parts + `post_id` (or `?post_id=`). Each
+    file is validated as it streams in; the valid ones become Media rows in
+    a single transaction. Responds with a result per file, in request
+    order: 201 if all were stored, 207 if only some were, 400 if none.
+    """
+    post = None
+    if request.args.get("post_id"):
+        post, error = _owned_post(request.args["post_id"])
+        if error:
+            return error
+
+    config = current_app.config
+    upload_folder = config.get("UPLOAD_FOLDER")
+    os.makedirs(upload_folder, exist_ok=True)
+    # The app-wide MAX_CONTENT_LENGTH is sized for one file
+    request.max_content_length = config.get("MAX_BATCH_UPLOAD_BYTES", 50 * 1024 * 1024)
+    max_files = config.get("MAX_BATCH_FILES", 20)
+
+    try:
+        fields, files = stream_multipart(request, upload_folder, config.get("MAX_UPLOAD_BYTES", 10 * 1024 * 1024))
+    except UploadError as e:
+        return jsonify({"error": e.message}), e.status
+
+    stored = []
+    try:
+        incoming = [f for f in files if f.field_name == "files"]
+        if not incoming:
+            return jsonify({"error": "No files"}), 400
+        if post is None:
+            post, error = _owned_post(fields.get("post_id"))
+            if error:
+                return error
+
+        for f in incoming[max_files:]:
+            f.error = f"Too many files (max {max_files})"
+            f.discard()
+        for f in incoming[:max_files]:
+            _strip_metadata(f)
+
+        storage = get_storage()
+        valid = [f for f in incoming if not f.error]
+        keys = {f: blob_key(f.sha256, f.ext) for f in valid}
+        existing = existing_image_fields_many(
+            storage.url(keys[f]) for f in valid if f.type == "image"
+        )
+        for f in valid:
+            url = storage.url(keys[f])
+            media = Media(
+                post_id=post.id,
+                type=f.type,
+                url=url,
+                mime=f.mime,
+                size_bytes=f.size_bytes,
+                sha256=f.sha256,
+                **_image_fields(f, existing.get(url, {})),
+            )
+            db.session.add(media)
+            stored.append((f, media))
+        if stored:
+            lock_blobs(keys.values())
+            db.session.commit()
+
+        # Rows are committed, so blobs are safe from a concurrent release
+        scheduled, failed = set(), []
+        for f, media in stored:
+            needs_source = media.type == "image" and media.derivatives is None and keys[f] not in scheduled
+            try:
+                source = store_incoming(f, storage, keep_source=needs_source)
+            except Exception:
+                current_app.logger.exception("Could not store upload %s", keys[f])
+                f.error = "Could not store file"
+                failed.append(media)
+                continue
+            if source:
+                scheduled.add(keys[f])
+                schedule_derivatives(media.id, keys[f], source)
+        if failed:
+            # Their rows would point at blobs that never arrived
+            _delete_media(failed)
+            stored = [(f, media) for f, media in stored if media not in failed]
+    finally:
+        for f in files:
+            f.discard()
+
+    media_for = dict(stored)
+    results = []
+    for f in incoming:
+        media = media_for.get(f)
+        if media is None:
+            results.append({"filename": f.filename, "ok": False, "error": f.error})
+        else:
+            results.append({"filename": f.filename, "ok": True, "id": media.id,
+                            "url": media.url, "type": media.type, "sha256": media.sha256})
+
+    if not stored:
+        status = 400
+    elif len(stored) < len(incoming):
+        status = 207
+    else:
+        status = 201
+    return jsonify({"results": results}), status
+
+
+def _delete_media(rows):
+    """Delete committed Media rows whose blob could not be stored."""
+    Media.query.filter(Media.id.in_([m.id for m in rows])).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def _strip_metadata(incoming):
+    """Drop EXIF/XMP from an uploaded image before its hash becomes its key."""
+    if incoming.type != "image" or incoming.error:
+        return
+    try:
+        result = strip_metadata(incoming.temp_path, incoming.mime)
+    except ValueError:
+        incoming.error = "Unreadable image"
+        incoming.discard()
+        return
+    if result:
+        incoming.sha256, incoming.size_bytes = result
+
+
+def _strip_stored_metadata(storage, key, content_type):
+    """`_strip_metadata` for an image uploaded straight to storage.
+
+    Returns (key, sha256, size) of the clean blob, or None if the image is
+    unreadable. If anything was removed the clean bytes get their own
+    content address and the uploaded object is deleted; otherwise the
+    sha256 and size are None.
+    """
+    upload_folder = current_app.config.get("UPLOAD_FOLDER")
+    os.makedirs(upload_folder, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=upload_folder, prefix=TEMP_PREFIX)
+    os.close(fd)
+    try:
+        storage.fetch(key, path)
+        try:
+            result = strip_metadata(path, content_type)
+        except ValueError:
+            storage.delete_many([key])
+            return None
+        if result is None:
+            return key, None, None
+        sha256, size = result
+        clean_key = blob_key(sha256, MIME_TYPES[content_type][1])
+        lock_blobs([clean_key])
+        if not storage.exists(clean_key):
+            storage.put_file(clean_key, path, content_type)
+        storage.delete_many([key])
+        return clean_key, sha256, size
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _image_fields(incoming, existing):
+    """Media kwargs for an image: copied from an equal blob if one was already
+    processed, otherwise at least its size, read from the temp file's header."""
+    if incoming.type != "image" or existing:
+        return existing
+    width, height = image_size(incoming.temp_path)
+    return {"width": width, "height": height}
+
+
+def _owned_post(post_id):
     if not post_id:
-        return jsonify({"error": "post_id required"}), 400
+        return None, (jsonify({"error": "post_id required"}), 400)
     post = Post.query.get_or_404(int(post_id))
     if post.user_id != current_user.id:
-        return jsonify({"error": "Not allowed"}), 403
-    if file.filename == "":
-        return jsonify({"error": "No selected file"}), 400
+        return None, (jsonify({"error": "Not allowed"}), 403)
+    return post, None
 
-    mime = file.mimetype or "application/octet-stream"
-    mtype = "image" if mime in ALLOWED_IMAGE_MIME else ("document" if mime in ALLOWED_DOC_MIME else None)
-    if mtype is None:
-        return jsonify({"error": "Unsupported file type"}), 400
 
-    # Ensure upload folder exists
-    upload_folder = current_app.config.get("UPLOAD_FOLDER")
-    os.makedirs(upload_folder, exist_ok=True)
+def _parse_sha256(value):
+    value = (value or "").lower()
+    if len(value) != 64 or any(c not in "0123456789abcdef" for c in value):
+        return None
+    return value
 
-    # Save with unique name
-    ext = os.path.splitext(secure_filename(file.filename))[1]
-    fname = f"{uuid4().hex}{ext}"
-    fpath = os.path.join(upload_folder, fname)
-    file.save(fpath)
 
-    size_bytes = os.path.getsize(fpath)
-    max_len = current_app.config.get("MAX_CONTENT_LENGTH", 10 * 1024 * 1024)
-    if size_bytes > max_len:
-        os.remove(fpath)
+@media_bp.post("/presign")
+@login_required
+@limiter.limit("30/minute")
+def presign_upload():
+    """Start a direct-to-storage upload that bypasses the Flask workers.
+
+    Body: {post_id, content_type, size, sha256 (hex)}. If the blob already
+    exists, returns {"exists": true} and the client can call
+    /media/presign/complete right away; otherwise returns a presigned PUT
+    that storage only accepts with the declared length and SHA-256.
+    """
+    storage = get_storage()
+    if not storage.supports_presign:
+        return jsonify({"error": "Direct uploads are not enabled"}), 400
+    data = request.json or {}
+    post, error = _owned_post(data.get("post_id"))
+    if error:
+        return error
+    content_type = data.get("content_type")
+    sha256 = _parse_sha256(data.get("sha256"))
+    size = data.get("size")
+    if content_type not in MIME_TYPES:
+        return jsonify({"error": "Unsupported file type"}), 400
+    if sha256 is None:
+        return jsonify({"error": "sha256 required"}), 400
+    if not isinstance(size, int) or size <= 0:
+        return jsonify({"error": "size required"}), 400
+    if size > current_app.config.get("MAX_UPLOAD_BYTES", 10 * 1024 * 1024):
         return jsonify({"error": "File too large"}), 400
 
-    rel_path = f"/uploads/{fname}"
-    media = Media(post_id=post.id, type=mtype, url=rel_path, mime=mime, size_bytes=size_bytes)
+    key = blob_key(sha256, MIME_TYPES[content_type][1])
+    if storage.exists(key):
+        return jsonify({"exists": True, "key": key})
+    upload = storage.presign_upload(
+        key, content_type, size,
+        base64.b64encode(bytes.fromhex(sha256)).decode(),
+        current_app.config.get("PRESIGN_EXPIRES_SECONDS", 900),
+    )
+    return jsonify({"exists": False, "key": key, "upload": upload})
+
+
+@media_bp.post("/presign/complete")
+@login_required
+@limiter.limit("30/minute")
+def complete_presigned_upload():
+    """Attach a blob uploaded through /media/presign to a post.
+
+    Body: {post_id, content_type, sha256}. On first use of a blob its size,
+    leading bytes and hash are checked before the Media row is created, and
+    an image is stripped of metadata. That gives it a new sha256 and url,
+    which the response returns.
+    """
+    storage = get_storage()
+    data = request.json or {}
+    post, error = _owned_post(data.get("post_id"))
+    if error:
+        return error
+    content_type = data.get("content_type")
+    sha256 = _parse_sha256(data.get("sha256"))
+    if content_type not in MIME_TYPES or sha256 is None:
+        return jsonify({"error": "content_type and sha256 required"}), 400
+
+    mtype, ext = MIME_TYPES[content_type]
+    key = blob_key(sha256, ext)
+    url = storage.url(key)
+    # Held until the Media row is committed, so a release cannot delete the blob meanwhile
+    lock_blobs([key])
+    stat = storage.stat(key)
+    if stat is None:
+        return jsonify({"error": "Upload not found"}), 400
+    size_bytes = stat[0]
+    # Blobs that already have a reference were verified when first attached
+    if Media.query.filter_by(url=url).first() is None:
+        if (size_bytes > current_app.config.get("MAX_UPLOAD_BYTES", 10 * 1024 * 1024)
+                or sniff_mime(storage.read_head(key, SNIFF_BYTES)) != content_type
+                or not storage.verify_sha256(key, sha256)):
+            storage.delete_many([key])
+            return jsonify({"error": "Upload rejected"}), 400
+        if mtype == "image":
+            stripped = _strip_stored_metadata(storage, key, content_type)
+            if stripped is None:
+                return jsonify({"error": "Unreadable image"}), 400
+            if stripped[1] is not None:
+                key, sha256, size_bytes = stripped
+                url = storage.url(key)
+
+    existing = existing_image_fields(url) if mtype == "image" else {}
+    media = Media(post_id=post.id, type=mtype, url=url, mime=content_type,
+                  size_bytes=size_bytes, sha256=sha256, **existing)
     db.session.add(media)
     db.session.commit()
 
-    return jsonify({"id": media.id, "url": rel_path, "type": mtype}), 201
+    # Size and placeholder for a new blob arrive with its derivatives
+    if mtype == "image" and media.derivatives is None:
+        upload_folder = current_app.config.get("UPLOAD_FOLDER")
+        os.makedirs(upload_folder, exist_ok=True)
+        fd, source = tempfile.mkstemp(dir=upload_folder, prefix=TEMP_PREFIX)
+        os.close(fd)
+        storage.fetch(key, source)
+        schedule_derivatives(media.id, key, source)
+
+    return jsonify({"id": media.id, "url": url, "type": mtype, "sha256": sha256}), 201
@@ -5,19 +5,14 @@ from ..extensions import db, limiter, socketio
 from ..models.message import Message
 from ..models.user import User
 from ..models.notification import Notification
+from ..serialization import MessageItem, as_dict
 
 messages_bp = Blueprint("messages", __name__)
 
 
-def _serialize_message(message: Message):
-    return {
-        "id": message.id,
-        "sender_id": message.sender_id,
-        "recipient_id": message.recipient_id,
-        "content": message.content,
-        "is_read": message.is_read,
-        "created_at": message.created_at.isoformat() + "Z",
-    }
+# Columns of MessageItem, for list queries that skip full ORM rows
+MESSAGE_COLUMNS = (Message.id, Message.sender_id, Message.recipient_id, Message.content,
+                   Message.is_read, Message.created_at)
 
 
 @messages_bp.get("/threads")
@@ -26,22 +21,27 @@ def _serialize_message(message: Message):
 def list_threads():
     """Return recent threads (distinct peers) ordered by last message time."""
     recent_messages = (
-        Message.query.filter(or_(Message.sender_id == current_user.id, Message.recipient_id == current_user.id))
+        db.session.query(*MESSAGE_COLUMNS)
+        .filter(or_(Message.sender_id == current_user.id, Message.recipient_id == current_user.id))
         .order_by(desc(Message.created_at))
         .limit(100)
         .all()
     )
 
+    peer_ids = {m.recipient_id if m.sender_id == current_user.id else m.sender_id for m in recent_messages}
+    # All peers in one query, not one per thread
+    peers = {u.id: u for u in User.query.filter(User.id.in_(peer_ids))} if peer_ids else {}
+
     threads = {}
     for m in recent_messages:
         other_id = m.recipient_id if m.sender_id == current_user.id else m.sender_id
         if other_id not in threads:
-            other_user = db.session.get(User, other_id)
+            other_user = peers.get(other_id)
             threads[other_id] = {
                 "user_id": other_id,
                 "user_name": other_user.name if other_user else "Unknown",
                 "username": other_user.email.split('@')[0] if other_user else "unknown",
-                "last_message": _serialize_message(m),
+                "last_message": MessageItem.from_row(m),
                 "unread_count": 0,
             }
         if not m.is_read and m.recipient_id == current_user.id:
@@ -56,7 +56,7 @@ def list_threads():
 def get_conversation(other_id):
     """Return last 50 messages with a specific user."""
     messages = (
-        Message.query.filter(
+        db.session.query(*MESSAGE_COLUMNS).filter(
             or_(
                 (Message.sender_id == current_user.id) & (Message.recipient_id == other_id),
                 (Message.sender_id == other_id) & (Message.recipient_id == current_user.id),
@@ -67,7 +67,7 @@ def get_conversation(other_id):
         .all()
     )
 
-    return jsonify({"messages": list(reversed([_serialize_message(m) for m in messages]))})
+    return jsonify({"messages": [MessageItem.from_row(m) for m in reversed(messages)]})
 
 
 @messages_bp.post("")
@@ -91,11 +91,12 @@ def send_message():
     db.session.add(message)
     db.session.commit()
 
-    payload = _serialize_message(message)
+    item = MessageItem.from_row(message)
 
     # Emit to recipient and sender rooms
     room_recipient = f"user_{recipient_id}"
     room_sender = f"user_{current_user.id}"
+    payload = as_dict(item)
     socketio.emit("message:new", payload, room=room_recipient)
     socketio.emit("message:sent", payload, room=room_sender)
 
@@ -123,7 +124,7 @@ def send_message():
         room=room_recipient,
     )
 
-    return jsonify({"message": payload, "notification_id": notification.id}), 201
+    return jsonify({"message": item, "notification_id": notification.id}), 201
 
 
 @messages_bp.post("/<int:message_id>/read")
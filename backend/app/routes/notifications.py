@@ -3,6 +3,7 @@ from flask_login import login_required, current_user
 from ..extensions import db, limiter
 from ..models.notification import Notification
 from ..models.user import User
+from ..serialization import NotificationItem
 
 notifications_bp = Blueprint("notifications", __name__)
 
@@ -11,25 +12,18 @@ notifications_bp = Blueprint("notifications", __name__)
 @limiter.limit("300/minute")
 def list_notifications():
     """Get current user's notifications"""
-    notifications = Notification.query.filter_by(user_id=current_user.id)\
+    # Each actor's name comes from the same query, not one lookup per notification
+    rows = db.session.query(
+        Notification.id, Notification.type, Notification.content, Notification.post_id,
+        Notification.comment_id, User.name.label("actor_name"), Notification.actor_id,
+        Notification.is_read, Notification.created_at,
+    ).outerjoin(User, User.id == Notification.actor_id)\
+        .filter(Notification.user_id == current_user.id)\
         .order_by(Notification.created_at.desc())\
         .limit(50)\
         .all()
-    
-    items = []
-    for n in notifications:
-        actor = db.session.get(User, n.actor_id)
-        items.append({
-            "id": n.id,
-            "type": n.type,
-            "content": n.content,
-            "post_id": n.post_id,
-            "comment_id": n.comment_id,
-            "actor_name": actor.name if actor else "Unknown",
-            "actor_id": n.actor_id,
-            "is_read": n.is_read,
-            "created_at": n.created_at.isoformat() + "Z",
-        })
+
+    items = [NotificationItem.from_row(n) for n in rows]
     
     return jsonify({"notifications": items})
 
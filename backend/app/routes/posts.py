@@ -6,6 +6,9 @@ from ..extensions import db, limiter
 from ..models.post import Post, Media
 from ..models.reaction import Reaction
 from ..models.user import User
+from ..media_store import release
+from ..storage import get_storage
+from ..serialization import PostCard
 from bleach import clean
 
 posts_bp = Blueprint("posts", __name__)
@@ -20,7 +23,10 @@ def list_posts():
     limit = int(request.args.get("limit", 20))
     offset = (page - 1) * limit
 
-    q = Post.query.filter_by(is_deleted=False)
+    # Only the columns a card shows; the bodies stay in the database
+    q = db.session.query(
+        Post.id, Post.title, Post.category, Post.user_id, Post.created_at, Post.edited_at
+    ).filter_by(is_deleted=False)
 
     # Filter by category
     if category:
@@ -47,23 +53,19 @@ def list_posts():
         q = q.order_by(Post.created_at.desc())
 
     total = q.count()
-    q = q.offset(offset).limit(limit)
-    
-    posts = []
-    for p in q.all():
-        user = db.session.get(User, p.user_id)
-        media = Media.query.filter_by(post_id=p.id, type="image").all()
-        preview_url = media[0].url if media else None
-        posts.append({
-            "id": p.id,
-            "title": p.title,
-            "category": p.category,
-            "user_id": p.user_id,
-            "user_name": user.name if user else "Unknown",
-            "created_at": p.created_at.isoformat() + "Z",
-            "edited_at": (p.edited_at.isoformat() + "Z") if p.edited_at else None,
-            "cover_url": preview_url,
-        })
+    rows = q.offset(offset).limit(limit).all()
+
+    # Authors and cover images for the whole page in one query each, not two per card
+    names, covers = {}, {}
+    if rows:
+        names = dict(db.session.query(User.id, User.name).filter(User.id.in_({p.user_id for p in rows})))
+        images = db.session.query(
+            Media.post_id, Media.url, Media.derivatives, Media.width, Media.height, Media.placeholder
+        ).filter(Media.post_id.in_([p.id for p in rows]), Media.type == "image")
+        for m in images.order_by(Media.post_id, Media.id):
+            covers.setdefault(m.post_id, m)
+
+    posts = [PostCard.from_row(p, names.get(p.user_id, "Unknown"), covers.get(p.id)) for p in rows]
 
     return jsonify({"posts": posts, "total": total, "page": page, "limit": limit})
 
@@ -103,7 +105,15 @@ def get_post(post_id):
         "category": post.category,
         "created_at": post.created_at.isoformat() + "Z",
         "edited_at": (post.edited_at.isoformat() + "Z") if post.edited_at else None,
-        "media": [{"id": m.id, "url": m.url, "type": m.type} for m in media]
+        "media": [{
+            "id": m.id,
+            "url": m.url,
+            "type": m.type,
+            "derivatives": m.derivatives or {},
+            "width": m.width,
+            "height": m.height,
+            "placeholder": m.placeholder,
+        } for m in media]
     })
 
 @posts_bp.patch("/<int:post_id>")
@@ -149,9 +159,13 @@ def delete_post(post_id):
     Comment.query.filter_by(post_id=post.id).delete()
     
     # Delete all media
+    media_urls = [url for (url,) in db.session.query(Media.url).filter_by(post_id=post.id)]
     Media.query.filter_by(post_id=post.id).delete()
     
     # Delete the post
     db.session.delete(post)
     db.session.commit()
+
+    # Reclaim blobs this post held the last reference to
+    release(media_urls, get_storage())
     return jsonify({"message": "Post deleted"})
@@ -6,6 +6,7 @@ from ..models.reaction import Reaction
 from ..models.post import Post
 from ..models.comment import Comment
 from ..models.notification import Notification
+from ..serialization import utc_iso
 
 reactions_bp = Blueprint("reactions", __name__)
 
@@ -71,7 +72,7 @@ def add_reaction():
                         "comment_id": notification.comment_id,
                         "actor_id": notification.actor_id,
                         "actor_name": current_user.name,
-                        "created_at": notification.created_at.isoformat(),
+                        "created_at": utc_iso(notification.created_at),
                         "is_read": notification.is_read,
                     },
                     room=f"user_{notification.user_id}",
@@ -99,7 +100,7 @@ def add_reaction():
                         "comment_id": notification.comment_id,
                         "actor_id": notification.actor_id,
                         "actor_name": current_user.name,
-                        "created_at": notification.created_at.isoformat(),
+                        "created_at": utc_iso(notification.created_at),
                         "is_read": notification.is_read,
                     },
                     room=f"user_{notification.user_id}",
@@ -0,0 +1,51 @@
+import mimetypes
+import os
+import re
+from flask import Blueprint, Response, abort, current_app, send_from_directory
+from werkzeug.security import safe_join
+
+uploads_bp = Blueprint("uploads", __name__)
+
+# <sha256>.<ext> or <sha256>_<variant>.webp: contents never change for a name
+CONTENT_ADDRESSED = re.compile(r"^(?P<sha>[0-9a-f]{64})(?:_(?P<variant>[a-z]+))?\.[a-z0-9]+$")
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+@uploads_bp.get("/<path:filename>")
+def uploaded_file(filename):
+    """Serve an uploaded file with caching, validators and Range support.
+
+    Content-addressed names get their hash as a strong ETag and an immutable
+    one-year Cache-Control. With UPLOADS_ACCEL_REDIRECT set, the body is
+    handed off to nginx via X-Accel-Redirect; otherwise Flask's send_file
+    answers Range/If-None-Match itself and the WSGI server may sendfile().
+    """
+    config = current_app.config
+    upload_folder = config["UPLOAD_FOLDER"]
+    if config.get("UPLOADS_DEBUG_LOG"):
+        current_app.logger.info("Serving upload %s from %s", filename, upload_folder)
+
+    match = CONTENT_ADDRESSED.match(os.path.basename(filename))
+    if match:
+        etag = match["sha"] + (f"-{match['variant']}" if match["variant"] else "")
+        max_age = IMMUTABLE_MAX_AGE
+    else:
+        etag = True
+        max_age = config.get("UPLOADS_MAX_AGE", 86400)
+
+    accel_prefix = config.get("UPLOADS_ACCEL_REDIRECT")
+    if accel_prefix:
+        path = safe_join(upload_folder, filename)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+        resp = Response(mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream")
+        resp.headers["X-Accel-Redirect"] = f"{accel_prefix.rstrip('/')}/{filename}"
+        if isinstance(etag, str):
+            resp.set_etag(etag)
+    else:
+        resp = send_from_directory(upload_folder, filename, etag=etag, max_age=max_age)
+
+    resp.cache_control.public = True
+    resp.cache_control.max_age = max_age
+    if match:
+        resp.cache_control.immutable = True
+    return resp
@@ -3,8 +3,10 @@ from sqlalchemy import func
 from flask_login import login_required, current_user
 from ..extensions import db, limiter
 from ..models.user import User
-from ..models.post import Post
+from ..models.post import Post, Media
+from ..models.reaction import Reaction
 from ..models.comment import Comment
+from ..search import user_index
 
 users_bp = Blueprint("users", __name__)
 
@@ -20,17 +22,19 @@ def get_my_profile():
 def update_profile():
     """Update current user profile"""
     data = request.get_json()
+    # current_user is a cached read-only snapshot; edit the real row
+    user = db.session.get(User, current_user.id)
     
     # Allowed fields
     allowed = ["bio", "branch", "year", "profile_pic"]
     
     for key in allowed:
         if key in data:
-            setattr(current_user, key, data[key])
+            setattr(user, key, data[key])
             
     try:
         db.session.commit()
-        return jsonify(current_user.to_dict())
+        return jsonify(user.to_dict())
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
@@ -74,10 +78,24 @@ def get_user_posts(user_id):
         .limit(50)\
         .all()
     
+    # Media and reaction counts for all posts in one query each, not per post
+    post_ids = [p.id for p in posts]
+    media_by_post, reaction_counts = {}, {}
+    if post_ids:
+        for m in Media.query.filter(Media.post_id.in_(post_ids)).order_by(Media.id):
+            media_by_post.setdefault(m.post_id, []).append(m)
+        reaction_counts = dict(
+            db.session.query(Reaction.post_id, func.count(Reaction.id))
+            .filter(Reaction.post_id.in_(post_ids))
+            .group_by(Reaction.post_id)
+        )
+
     items = []
     for p in posts:
         # Get first media if exists
-        media_list = [{"url": m.url, "type": m.type} for m in p.media]
+        media = media_by_post.get(p.id, [])
+        media_list = [{"url": m.url, "type": m.type} for m in media]
+        images = [m for m in media if m.type == "image"]
         
         items.append({
             "id": p.id,
@@ -86,8 +104,12 @@ def get_user_posts(user_id):
             "category": p.category,
             "created_at": p.created_at.isoformat() + "Z",
             "edited_at": (p.edited_at.isoformat() + "Z") if p.edited_at else None,
-            "vote_score": len(p.reactions),
+            "vote_score": reaction_counts.get(p.id, 0),
             "media": media_list,
+            "cover_url": images[0].variant_url("medium") if images else None,
+            "cover_width": images[0].width if images else None,
+            "cover_height": images[0].height if images else None,
+            "cover_placeholder": images[0].placeholder if images else None,
             "user_id": user.id,
             "user_name": user.name
         })
@@ -102,13 +124,11 @@ def search_users():
     if not query:
         return jsonify({"users": []})
         
-    search_pattern = f"%{query}%"
-    users = User.query.filter(
-        db.or_(
-            User.name.ilike(search_pattern),
-            User.email.ilike(search_pattern)
-        )
-    ).limit(20).all()
+    # Rank ids from the in-memory index, then load rows by primary key
+    user_index.ensure_fresh()
+    ids = user_index.search(query, limit=20)
+    by_id = {u.id: u for u in User.query.filter(User.id.in_(ids)).all()} if ids else {}
+    users = [by_id[i] for i in ids if i in by_id]
     
     return jsonify({"users": [
         {
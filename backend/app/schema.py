@@ -0,0 +1,123 @@
+"""
+Database schema management with Alembic.
+
+Migrations live in backend/migrations. What a worker does with the schema
+at boot depends on DB_SCHEMA_MODE:
+
+- "check": one query compares alembic_version to the newest migration and
+  refuses to start if they differ. Run `alembic upgrade head` from backend/
+  first, e.g. as a release step. No reflection and no DDL on the boot path.
+- "migrate": run `alembic upgrade head` at boot; cheap when already current.
+- "create": the old `db.create_all()`, for throwaway databases.
+- "off": do nothing.
+- "auto" (default): "migrate" for SQLite, "check" for everything else.
+"""
+
+import os
+import re
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import DBAPIError
+
+# Alembic itself is imported only when migrating: importing it costs more
+# than the rest of create_app, and "check" does not need it.
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+
+# Revision matching the schema that db.create_all() built before migrations
+BASELINE_REVISION = "0001"
+
+
+class SchemaOutOfDate(RuntimeError):
+    pass
+
+
+_REVISION = re.compile(r"^revision(?:: str)? = ['\"](\w+)['\"]", re.M)
+_DOWN_REVISION = re.compile(r"^down_revision(?:: [^=]+)? = ['\"](\w+)['\"]", re.M)
+
+
+def alembic_config(connection=None):
+    from alembic.config import Config as AlembicConfig
+
+    cfg = AlembicConfig()
+    cfg.set_main_option("script_location", MIGRATIONS_DIR)
+    cfg.attributes["connection"] = connection
+    return cfg
+
+
+def head_revision() -> str:
+    """Newest revision in migrations/versions, read straight from the files.
+
+    The same answer as Alembic's ScriptDirectory for our linear history,
+    without importing Alembic.
+    """
+    revisions, parents = set(), set()
+    versions = os.path.join(MIGRATIONS_DIR, "versions")
+    for name in os.listdir(versions):
+        if not name.endswith(".py"):
+            continue
+        with open(os.path.join(versions, name)) as f:
+            source = f.read()
+        revisions.update(_REVISION.findall(source))
+        parents.update(_DOWN_REVISION.findall(source))
+    heads = revisions - parents
+    if len(heads) != 1:
+        raise RuntimeError(f"Expected one migration head, found {sorted(heads)}")
+    return heads.pop()
+
+
+def current_revision(connection):
+    """The database's alembic_version, or None if it has never been migrated."""
+    try:
+        return connection.execute(text("SELECT version_num FROM alembic_version")).scalar()
+    except DBAPIError:
+        connection.rollback()
+        return None
+
+
+def adopt_legacy_database(migration_context, script):
+    """Stamp a database built by `db.create_all()` at the baseline.
+
+    Such a database has the tables but no alembic_version row; stamping it
+    means only the migrations after the baseline run against it. Called from
+    migrations/env.py before every upgrade.
+    """
+    if migration_context.get_current_revision() is None \
+            and inspect(migration_context.connection).has_table("users"):
+        migration_context.stamp(script, BASELINE_REVISION)
+
+
+def upgrade(engine, revision: str = "head"):
+    from alembic import command
+
+    with engine.begin() as conn:
+        command.upgrade(alembic_config(conn), revision)
+
+
+def schema_mode(app) -> str:
+    mode = app.config.get("DB_SCHEMA_MODE", "auto")
+    if mode == "auto":
+        return "migrate" if app.config["SQLALCHEMY_DATABASE_URI"].startswith("sqlite") else "check"
+    return mode
+
+
+def prepare_schema(app, db):
+    """Bring up or verify the schema according to DB_SCHEMA_MODE."""
+    mode = schema_mode(app)
+    if mode == "off":
+        return
+    if mode == "create":
+        db.create_all()
+    elif mode == "migrate":
+        upgrade(db.engine)
+    elif mode == "check":
+        with db.engine.connect() as conn:
+            current = current_revision(conn)
+        head = head_revision()
+        if current != head:
+            raise SchemaOutOfDate(
+                f"Database schema is at {current or 'no revision'}, code expects {head}. "
+                "Run `alembic upgrade head` in backend/."
+            )
+    else:
+        raise ValueError(f"Unknown DB_SCHEMA_MODE {mode!r}")
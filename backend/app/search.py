@@ -0,0 +1,276 @@
+"""
+In-process user search index.
+
+Backs the message-recipient autocomplete (`GET /users?search=`) so that a
+keystroke does not turn into a full `ILIKE '%q%'` scan of the users table.
+Names and email local parts are tokenized into a sorted prefix array (for
+type-ahead) and a trigram posting list (for typo tolerance). The index only
+returns ranked user ids; rows are then fetched by primary key so profile
+fields are always fresh.
+
+Mapper events keep the index in step with changes made by this process.
+Signups, renames and deletions made by other workers are picked up by a
+full rebuild every USER_SEARCH_REFRESH_SECONDS. Only the first build runs
+inside a request; later ones load in a background thread beside the live
+index and are swapped in, so no search waits on a rebuild.
+"""
+
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+from flask import current_app
+from sqlalchemy import event
+
+from .extensions import db
+from .models.user import User
+
+_TOKEN_SPLIT = re.compile(r"[^a-z0-9@.]+")
+_PART_SPLIT = re.compile(r"[._\-0-9]+")
+
+# Score weights; higher ranks first
+_EXACT = 3.0
+_PREFIX = 2.0
+_FUZZY = 1.0
+_MIN_SIMILARITY = 0.3
+
+
+def _normalize(text: str) -> str:
+    return (text or "").strip().lower()
+
+
+def _trigrams(token: str) -> set:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _user_tokens(name: str, email: str) -> set:
+    tokens = {t for t in _TOKEN_SPLIT.split(_normalize(name)) if t}
+    email = _normalize(email)
+    if email:
+        local = email.split("@")[0]
+        tokens.add(email)
+        tokens.add(local)
+        tokens.update(p for p in _PART_SPLIT.split(local) if p)
+    return tokens
+
+
+class UserSearchIndex:
+    """Prefix + trigram index over user names and emails."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._rebuild_lock = threading.Lock()
+        self._changes = None                # local changes while a rebuild loads
+        self._rebuild_thread = None
+        self._clear()
+
+    def _clear(self):
+        self._prefix = []                   # sorted distinct tokens
+        self._postings = {}                 # token -> {user_id}
+        self._tokens = {}                   # user_id -> {token}
+        self._trigrams = defaultdict(set)   # trigram -> {token}
+        self._refreshed_at = None
+
+    def __len__(self):
+        return len(self._tokens)
+
+    # -- maintenance ---------------------------------------------------------
+
+    def add(self, user_id: int, name: str, email: str):
+        with self._lock:
+            if self._changes is not None:
+                self._changes.append((user_id, name, email))
+            self._remove(user_id)
+            tokens = _user_tokens(name, email)
+            self._tokens[user_id] = tokens
+            for tok in tokens:
+                users = self._postings.get(tok)
+                if users is None:
+                    users = self._postings[tok] = set()
+                    insort(self._prefix, tok)
+                    # Whole emails are only useful for prefix lookups
+                    if "@" not in tok and "." not in tok:
+                        for tri in _trigrams(tok):
+                            self._trigrams[tri].add(tok)
+                users.add(user_id)
+
+    def remove(self, user_id: int):
+        with self._lock:
+            if self._changes is not None:
+                self._changes.append((user_id, None, None))
+            self._remove(user_id)
+
+    def _remove(self, user_id):
+        for tok in self._tokens.pop(user_id, ()):
+            users = self._postings[tok]
+            users.discard(user_id)
+            if users:
+                continue
+            del self._postings[tok]
+            del self._prefix[bisect_left(self._prefix, tok)]
+            for tri in _trigrams(tok):
+                self._trigrams[tri].discard(tok)
+
+    def _load(self, rows):
+        """Bulk `add` into an empty index: one sort instead of an insort per token."""
+        for user_id, name, email in rows:
+            tokens = _user_tokens(name, email)
+            self._tokens[user_id] = tokens
+            for tok in tokens:
+                users = self._postings.get(tok)
+                if users is None:
+                    users = self._postings[tok] = set()
+                    if "@" not in tok and "." not in tok:
+                        for tri in _trigrams(tok):
+                            self._trigrams[tri].add(tok)
+                users.add(user_id)
+        self._prefix = sorted(self._postings)
+
+    def rebuild(self):
+        """Reload every user from the database.
+
+        The new index is built off to the side, then swapped in; changes this
+        process made while it loaded are replayed on top.
+        """
+        with self._lock:
+            self._changes = []
+        try:
+            fresh = UserSearchIndex()
+            fresh._load(db.session.query(User.id, User.name, User.email).all())
+        except Exception:
+            with self._lock:
+                self._changes = None
+            raise
+        with self._lock:
+            changes, self._changes = self._changes, None
+            self._prefix, self._postings = fresh._prefix, fresh._postings
+            self._tokens, self._trigrams = fresh._tokens, fresh._trigrams
+            for user_id, name, email in changes:
+                if name is None:
+                    self._remove(user_id)
+                else:
+                    self.add(user_id, name, email)
+            self._refreshed_at = time.monotonic()
+
+    def ensure_fresh(self):
+        """Build the index on first use; once it is older than
+        USER_SEARCH_REFRESH_SECONDS, start a background rebuild and keep
+        searching the current index until it is swapped in."""
+        if self._refreshed_at is None:
+            with self._rebuild_lock:
+                if self._refreshed_at is None:
+                    self.rebuild()
+            return
+        interval = current_app.config.get("USER_SEARCH_REFRESH_SECONDS", 30)
+        if time.monotonic() - self._refreshed_at < interval:
+            return
+        if not self._rebuild_lock.acquire(blocking=False):
+            return
+        app = current_app._get_current_object()
+
+        def run():
+            try:
+                with app.app_context():
+                    self.rebuild()
+            except Exception:
+                app.logger.exception("User search index rebuild failed")
+            finally:
+                self._rebuild_lock.release()
+
+        try:
+            self._rebuild_thread = threading.Thread(target=run, name="user-search-rebuild", daemon=True)
+            self._rebuild_thread.start()
+        except Exception:
+            self._rebuild_lock.release()
+            raise
+
+    # -- querying ------------------------------------------------------------
+
+    def _token_scores(self, term: str, want) -> dict:
+        """Score distinct tokens matching `term`: prefix first, trigram fallback.
+
+        Prefix tokens are taken best first (exact, then shortest) until they
+        cover `want` users, keeping every token as good as the last one
+        taken. With `want=None` all of them are scored.
+        """
+        scores = {}
+        lo = bisect_left(self._prefix, term)
+        hi = bisect_left(self._prefix, term + "\uffff", lo)
+        # Shorter tokens are closer to an exact match, so rank before cutting off
+        matches = sorted(self._prefix[lo:hi], key=len)
+        matched = set()
+        last_len = 0
+        for tok in matches:
+            if want is not None and len(matched) >= want and len(tok) > last_len:
+                break
+            scores[tok] = _EXACT if tok == term else _PREFIX + len(term) / len(tok)
+            # A user has several tokens ("anu", "anu4"); count them once
+            matched.update(self._postings[tok])
+            last_len = len(tok)
+
+        if (want is None or len(matched) < want) and len(term) >= 3:
+            query_tris = _trigrams(term)
+            overlap = defaultdict(int)
+            for tri in query_tris:
+                for tok in self._trigrams.get(tri, ()):
+                    overlap[tok] += 1
+            for tok, shared in overlap.items():
+                if tok in scores:
+                    continue
+                similarity = shared / (len(query_tris) + len(tok) + 1 - shared)
+                if similarity >= _MIN_SIMILARITY:
+                    scores[tok] = _FUZZY * similarity
+        return scores
+
+    def _term_scores(self, term: str, want: int) -> dict:
+        scores = {}
+        for tok, score in self._token_scores(term, want).items():
+            for user_id in self._postings[tok]:
+                if score > scores.get(user_id, 0):
+                    scores[user_id] = score
+        return scores
+
+    def search(self, query: str, limit: int = 20) -> list:
+        """Return up to `limit` user ids, best match first.
+
+        Every whitespace-separated term must match some token of the user,
+        either by prefix or by trigram similarity.
+        """
+        terms = [t for t in _TOKEN_SPLIT.split(_normalize(query)) if t]
+        if not terms:
+            return []
+        # Later terms only filter, so with several terms no candidate of any
+        # term may be dropped before the intersection
+        want = limit if len(terms) == 1 else None
+        with self._lock:
+            combined = None
+            for term in terms:
+                scores = self._term_scores(term, want)
+                if combined is None:
+                    combined = scores
+                else:
+                    combined = {
+                        uid: combined[uid] + s for uid, s in scores.items() if uid in combined
+                    }
+                if not combined:
+                    return []
+        ranked = sorted(combined.items(), key=lambda kv: (-kv[1], kv[0]))
+        return [user_id for user_id, _ in ranked[:limit]]
+
+
+user_index = UserSearchIndex()
+
+
+@event.listens_for(User, "after_insert")
+@event.listens_for(User, "after_update")
+def _index_user(mapper, connection, target):
+    if user_index._refreshed_at is not None or user_index._changes is not None:
+        user_index.add(target.id, target.name, target.email)
+
+
+@event.listens_for(User, "after_delete")
+def _unindex_user(mapper, connection, target):
+    user_index.remove(target.id)
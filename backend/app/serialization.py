@@ -0,0 +1,249 @@
+"""
+JSON responses: a fast encoder and typed rows for the busiest lists.
+
+`FastJSONProvider` replaces Flask's JSON provider (`init_json`). With
+orjson installed it encodes straight to UTF-8 bytes, several times faster
+than the stdlib encoder. Without orjson, or with JSON_BACKEND=stdlib, it
+falls back to `json` with the same output rules:
+
+- naive datetimes are UTC (the models default to `datetime.utcnow`) and
+  are written as ISO 8601 with a "Z" suffix, like the hand-built
+  `created_at.isoformat() + "Z"` strings, so routes can return datetimes
+  as they are. Aware datetimes keep their own offset ("+05:30"), with
+  UTC written as "Z"; converting them would cost orjson a Python call per
+  datetime, and the models never produce them
+- dataclasses, including the row DTOs below, become objects with their
+  fields in declaration order
+- keys keep insertion order and non-ASCII text is written as UTF-8
+
+The DTOs are dataclasses with `__slots__` (no per-row `__dict__`), built
+from column-projection queries such as `db.session.query(Comment.id,
+Comment.content, ..., User.name)` instead of full ORM instances. A list
+response then skips identity-map bookkeeping, columns it does not show
+(post bodies in the feed) and per-row lazy loads. orjson encodes them
+natively, without building an intermediate dict.
+
+Socket.IO payloads are still encoded by python-socketio's own json, so
+emits send plain dicts: `as_dict` turns a DTO into one, and `utc_iso`
+formats datetimes in hand-built payloads the same way.
+"""
+
+import dataclasses
+import decimal
+import json
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional
+
+from flask.json.provider import JSONProvider
+
+from .models.post import variant_url
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder gives the same output
+    orjson = None
+
+
+def utc_iso(value: Optional[datetime]) -> Optional[str]:
+    """'2026-01-01T08:30:00.123456Z' for a naive UTC (or aware) datetime."""
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat() + "Z"
+
+
+def _default(o):
+    """Types neither encoder handles on its own; mirrors Flask's defaults."""
+    if isinstance(o, datetime):
+        # What orjson writes with OPT_NAIVE_UTC | OPT_UTC_Z
+        if o.tzinfo is None or o.utcoffset() == timedelta(0):
+            return o.replace(tzinfo=None).isoformat() + "Z"
+        return o.isoformat()
+    if isinstance(o, date):
+        return o.isoformat()
+    if dataclasses.is_dataclass(o):
+        return {f.name: getattr(o, f.name) for f in dataclasses.fields(o)}
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if hasattr(o, "__html__"):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def as_dict(item) -> dict:
+    """A DTO as a plain dict with ISO 8601 UTC datetimes, for Socket.IO emits."""
+    values = {f.name: getattr(item, f.name) for f in dataclasses.fields(item)}
+    return {k: utc_iso(v) if isinstance(v, datetime) else v for k, v in values.items()}
+
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider backed by orjson, or by `json` as a fallback."""
+
+    mimetype = "application/json"
+    # None: pretty-print in debug mode only, like Flask's default provider
+    compact = None
+
+    def __init__(self, app, backend: str = "auto"):
+        super().__init__(app)
+        if backend == "orjson" and orjson is None:
+            raise RuntimeError("JSON_BACKEND=orjson but orjson is not installed")
+        self.use_orjson = orjson is not None and backend != "stdlib"
+        if self.use_orjson:
+            self._options = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+    def _pretty(self) -> bool:
+        return self.compact is False or (self.compact is None and self._app.debug)
+
+    def _encode(self, obj) -> bytes:
+        options = self._options | (orjson.OPT_INDENT_2 if self._pretty() else 0)
+        try:
+            return orjson.dumps(obj, default=_default, option=options)
+        except orjson.JSONEncodeError:
+            # orjson stops at 255 levels of nesting, about 127 replies deep
+            # in a comment tree; the stdlib encoder writes the same output
+            return self._stdlib_dumps(obj).encode()
+
+    def _stdlib_dumps(self, obj, **kwargs) -> str:
+        kwargs.setdefault("default", _default)
+        kwargs.setdefault("ensure_ascii", False)
+        if self._pretty():
+            kwargs.setdefault("indent", 2)
+        else:
+            kwargs.setdefault("separators", (",", ":"))
+        return json.dumps(obj, **kwargs)
+
+    def dumps(self, obj, **kwargs) -> str:
+        # Callers passing encoder options (cls=, sort_keys=, ...) get the stdlib
+        if self.use_orjson and not kwargs:
+            return self._encode(obj).decode()
+        return self._stdlib_dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if self.use_orjson and not kwargs:
+            # orjson.JSONDecodeError subclasses ValueError, which Flask turns into a 400
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if self.use_orjson:
+            body = self._encode(obj) + b"\n"
+        else:
+            body = f"{self._stdlib_dumps(obj)}\n"
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def init_json(app):
+    """Install FastJSONProvider as `app.json` (JSON_BACKEND: auto, orjson, stdlib)."""
+    app.json = FastJSONProvider(app, app.config.get("JSON_BACKEND", "auto"))
+    return app.json
+
+
+@dataclass
+class PostCard:
+    """A feed card (GET /posts). No post body; the cover is the first image."""
+
+    __slots__ = ("id", "title", "category", "user_id", "user_name", "created_at", "edited_at",
+                 "cover_url", "cover_thumb_url", "cover_width", "cover_height", "cover_placeholder")
+    id: int
+    title: str
+    category: Optional[str]
+    user_id: int
+    user_name: str
+    created_at: datetime
+    edited_at: Optional[datetime]
+    cover_url: Optional[str]
+    cover_thumb_url: Optional[str]
+    cover_width: Optional[int]
+    cover_height: Optional[int]
+    cover_placeholder: Optional[str]
+
+    @classmethod
+    def from_row(cls, p, user_name, cover=None):
+        """`p`: (id, title, category, user_id, created_at, edited_at) row;
+        `cover`: (url, derivatives, width, height, placeholder) row or None."""
+        return cls(
+            id=p.id, title=p.title, category=p.category, user_id=p.user_id, user_name=user_name,
+            created_at=p.created_at, edited_at=p.edited_at,
+            # Feed cards use the medium derivative once it has been generated
+            cover_url=variant_url(cover.url, cover.derivatives, "medium") if cover else None,
+            cover_thumb_url=variant_url(cover.url, cover.derivatives, "thumb") if cover else None,
+            # Lets cards reserve the image box and paint a blur-up before it loads
+            cover_width=cover.width if cover else None,
+            cover_height=cover.height if cover else None,
+            cover_placeholder=cover.placeholder if cover else None,
+        )
+
+
+@dataclass
+class CommentNode:
+    """A comment in GET /comments/post/<id>, with its replies nested."""
+
+    __slots__ = ("id", "post_id", "parent_id", "user_id", "user_name", "content", "depth",
+                 "created_at", "replies")
+    id: int
+    post_id: int
+    parent_id: Optional[int]
+    user_id: int
+    user_name: str
+    content: str
+    depth: int
+    created_at: datetime
+    replies: List["CommentNode"]
+
+    @classmethod
+    def from_row(cls, c):
+        """`c`: (id, post_id, parent_id, user_id, user_name, content, depth, created_at) row."""
+        return cls(
+            id=c.id, post_id=c.post_id, parent_id=c.parent_id, user_id=c.user_id,
+            user_name=c.user_name or "Unknown", content=c.content, depth=c.depth,
+            created_at=c.created_at, replies=[],
+        )
+
+
+@dataclass
+class NotificationItem:
+    """One entry of GET /notifications."""
+
+    __slots__ = ("id", "type", "content", "post_id", "comment_id", "actor_name", "actor_id",
+                 "is_read", "created_at")
+    id: int
+    type: str
+    content: str
+    post_id: Optional[int]
+    comment_id: Optional[int]
+    actor_name: str
+    actor_id: Optional[int]
+    is_read: bool
+    created_at: datetime
+
+    @classmethod
+    def from_row(cls, n):
+        return cls(
+            id=n.id, type=n.type, content=n.content, post_id=n.post_id, comment_id=n.comment_id,
+            actor_name=n.actor_name or "Unknown", actor_id=n.actor_id, is_read=n.is_read,
+            created_at=n.created_at,
+        )
+
+
+@dataclass
+class MessageItem:
+    """A direct message in conversations and thread lists."""
+
+    __slots__ = ("id", "sender_id", "recipient_id", "content", "is_read", "created_at")
+    id: int
+    sender_id: int
+    recipient_id: int
+    content: str
+    is_read: bool
+    created_at: datetime
+
+    @classmethod
+    def from_row(cls, m):
+        return cls(
+            id=m.id, sender_id=m.sender_id, recipient_id=m.recipient_id, content=m.content,
+            is_read=m.is_read, created_at=m.created_at,
+        )
@@ -0,0 +1,176 @@
+"""
+Slow-query log with EXPLAIN capture.
+
+Any statement slower than SLOW_QUERY_MS is logged on the `<app>.slow_queries`
+logger as one JSON line: fingerprint, normalized SQL (the statement shape
+from app/query_profiler.py), the shape of its bound parameters (types,
+never values), duration and endpoint.
+
+A background thread then runs EXPLAIN for it on the same engine: `EXPLAIN
+QUERY PLAN` on SQLite, `EXPLAIN (ANALYZE, FORMAT JSON)` on Postgres
+(plain EXPLAIN for writes or with SLOW_QUERY_EXPLAIN_ANALYZE=false) inside
+a transaction that is rolled back, and `EXPLAIN` elsewhere. Each
+fingerprint is explained at most once per SLOW_QUERY_EXPLAIN_INTERVAL
+seconds and the queue is bounded, so a slow storm cannot pile EXPLAINs on
+top of a struggling database.
+
+Entries are aggregated per fingerprint in this worker (count, total, max,
+endpoints, last plan); admins can rank them at GET /healthz/slow-queries.
+"""
+
+import hashlib
+import json
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+
+from flask import has_request_context, request
+
+from .query_profiler import statement_listeners, statement_shape
+
+_LOCAL = threading.local()
+
+
+def fingerprint(shape: str) -> str:
+    return hashlib.sha1(shape.encode()).hexdigest()[:12]
+
+
+def parameter_shape(parameters, executemany: bool = False):
+    """Types of the bound parameters, e.g. {"id_1": "int"} or ["str", "int"]."""
+    if executemany:
+        rows = list(parameters or [])
+        return {"rows": len(rows), "row": parameter_shape(rows[0]) if rows else None}
+    if isinstance(parameters, dict):
+        return {k: type(v).__name__ for k, v in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(v).__name__ for v in parameters]
+    return None
+
+
+def explain_statement(dialect: str, statement: str, analyze: bool):
+    """The EXPLAIN statement to run for `statement`, or None if unsupported."""
+    if dialect == "sqlite":
+        return f"EXPLAIN QUERY PLAN {statement}"
+    if dialect == "postgresql":
+        is_read = statement.lstrip().upper().startswith(("SELECT", "WITH"))
+        if analyze and is_read:
+            return f"EXPLAIN (ANALYZE, FORMAT JSON) {statement}"
+        return f"EXPLAIN (FORMAT JSON) {statement}"
+    if dialect in ("mysql", "mariadb"):
+        return f"EXPLAIN {statement}"
+    return None
+
+
+class SlowQueryLog:
+    def __init__(self, app):
+        self.app = app
+        self.threshold = app.config.get("SLOW_QUERY_MS", 200) / 1000
+        self.analyze = app.config.get("SLOW_QUERY_EXPLAIN_ANALYZE", True)
+        self.explain_interval = app.config.get("SLOW_QUERY_EXPLAIN_INTERVAL", 300)
+        self.max_entries = app.config.get("SLOW_QUERY_MAX_FINGERPRINTS", 500)
+        self.log = logging.getLogger(f"{app.logger.name}.slow_queries")
+        self.entries = {}
+        self._lock = threading.Lock()
+        self._explained_at = {}
+        self._queue = queue.Queue(maxsize=100)
+        threading.Thread(target=self._explain_loop, name="slow-query-explain", daemon=True).start()
+
+    def observe(self, conn, statement, parameters, context, executemany, seconds):
+        if seconds < self.threshold or getattr(_LOCAL, "explaining", False):
+            return
+        shape = statement_shape(statement)
+        fp = fingerprint(shape)
+        endpoint = (request.endpoint or request.path) if has_request_context() else None
+        params = parameter_shape(parameters, executemany)
+        ms = round(seconds * 1000, 2)
+        now = time.time()
+
+        with self._lock:
+            entry = self.entries.get(fp)
+            if entry is None:
+                if len(self.entries) >= self.max_entries:
+                    # Forget the fingerprint that has cost the least so far
+                    del self.entries[min(self.entries, key=lambda k: self.entries[k]["total_ms"])]
+                entry = self.entries[fp] = {
+                    "fingerprint": fp, "sql": shape, "count": 0, "total_ms": 0.0,
+                    "max_ms": 0.0, "endpoints": Counter(), "params": params, "plan": None,
+                }
+            entry["count"] += 1
+            entry["total_ms"] += ms
+            entry["last_seen"] = now
+            if ms >= entry["max_ms"]:
+                entry["max_ms"] = ms
+                entry["params"] = params
+            if endpoint:
+                entry["endpoints"][endpoint] += 1
+            explain = now - self._explained_at.get(fp, 0) >= self.explain_interval
+            if explain:
+                self._explained_at[fp] = now
+
+        self.log.warning("slow_query %s", json.dumps({
+            "fingerprint": fp, "ms": ms, "endpoint": endpoint, "sql": shape, "params": params,
+        }))
+        if explain and not executemany:
+            try:
+                self._queue.put_nowait((conn.engine, fp, statement, parameters))
+            except queue.Full:
+                pass
+
+    def _explain_loop(self):
+        _LOCAL.explaining = True
+        while True:
+            engine, fp, statement, parameters = self._queue.get()
+            try:
+                plan = self.explain(engine, statement, parameters)
+            except Exception as e:
+                plan = {"error": str(e)}
+            if plan is None:
+                continue
+            with self._lock:
+                if fp in self.entries:
+                    self.entries[fp]["plan"] = plan
+            self.log.warning("slow_query_plan %s", json.dumps({"fingerprint": fp, "plan": plan}, default=str))
+
+    def explain(self, engine, statement, parameters):
+        sql = explain_statement(engine.dialect.name, statement, self.analyze)
+        if sql is None:
+            return None
+        conn = engine.connect()
+        try:
+            rows = conn.exec_driver_sql(sql, parameters or ()).fetchall()
+        finally:
+            # ANALYZE really runs the statement; never keep what it did
+            conn.rollback()
+            conn.close()
+        if engine.dialect.name == "postgresql":
+            return rows[0][0]
+        if engine.dialect.name == "sqlite":
+            # (id, parent, notused, detail)
+            return [row[-1] for row in rows]
+        return [list(row) for row in rows]
+
+    def top(self, limit: int = 20, sort: str = "total_ms") -> list:
+        """The worst fingerprints by total_ms, max_ms or count."""
+        with self._lock:
+            entries = [
+                {**e, "total_ms": round(e["total_ms"], 2),
+                 "avg_ms": round(e["total_ms"] / e["count"], 2),
+                 "endpoints": dict(e["endpoints"].most_common(5))}
+                for e in self.entries.values()
+            ]
+        return sorted(entries, key=lambda e: -e[sort])[:limit]
+
+
+def init_slow_query_log(app):
+    """Start logging statements slower than SLOW_QUERY_MS; 0 disables."""
+    if app.config.get("SLOW_QUERY_MS", 200) <= 0:
+        return None
+    slow_log = SlowQueryLog(app)
+    app.extensions["slow_queries"] = slow_log
+    # One log per process, even if create_app runs more than once
+    statement_listeners[:] = [fn for fn in statement_listeners
+                              if not isinstance(getattr(fn, "__self__", None), SlowQueryLog)]
+    statement_listeners.append(slow_log.observe)
+    return slow_log
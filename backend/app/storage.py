@@ -0,0 +1,242 @@
+"""
+Media storage backends.
+
+`LocalStorage` keeps blobs in UPLOAD_FOLDER and serves them through the
+/uploads blueprint. `S3Storage` talks to any S3-compatible service (AWS,
+Cloudflare R2, MinIO) so web nodes can stay stateless. Both expose the same
+small interface used by media_store, images and the media routes; pick one
+with MEDIA_STORAGE=local|s3.
+
+Uploads are always streamed to a local temp file first (see uploads.py);
+`put_file` then consumes that file: a rename for local storage, a
+(multipart above S3_MULTIPART_THRESHOLD) upload for S3.
+"""
+
+import base64
+import hashlib
+import os
+from datetime import datetime, timezone
+
+from flask import current_app
+
+
+class StorageError(Exception):
+    pass
+
+
+class LocalStorage:
+    supports_presign = False
+
+    def __init__(self, root: str, url_prefix: str = "/uploads"):
+        self.root = root
+        self.url_prefix = url_prefix.rstrip("/")
+        os.makedirs(root, exist_ok=True)
+
+    def local_path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def url(self, key: str) -> str:
+        return f"{self.url_prefix}/{key}"
+
+    def key_for_url(self, url: str):
+        prefix = self.url_prefix + "/"
+        return url[len(prefix):] if url and url.startswith(prefix) else None
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.local_path(key))
+
+    def put_file(self, key: str, path: str, content_type: str):
+        os.replace(path, self.local_path(key))
+
+    def fetch(self, key: str, dest_path: str):
+        with open(self.local_path(key), "rb") as src, open(dest_path, "wb") as dst:
+            while chunk := src.read(1024 * 1024):
+                dst.write(chunk)
+
+    def read_head(self, key: str, n: int) -> bytes:
+        with open(self.local_path(key), "rb") as f:
+            return f.read(n)
+
+    def stat(self, key: str):
+        """(size, content_type) or None; content type is not tracked locally."""
+        try:
+            return os.path.getsize(self.local_path(key)), None
+        except OSError:
+            return None
+
+    def verify_sha256(self, key: str, sha256: str) -> bool:
+        h = hashlib.sha256()
+        with open(self.local_path(key), "rb") as f:
+            while chunk := f.read(1024 * 1024):
+                h.update(chunk)
+        return h.hexdigest() == sha256
+
+    def delete_many(self, keys) -> int:
+        removed = 0
+        for key in keys:
+            try:
+                os.remove(self.local_path(key))
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def list(self):
+        """Yield (key, size, mtime) for every stored object."""
+        for entry in os.scandir(self.root):
+            if entry.is_file():
+                st = entry.stat()
+                yield entry.name, st.st_size, st.st_mtime
+
+    def presign_upload(self, key, content_type, size, sha256_b64, expires):
+        raise StorageError("Direct uploads require S3 storage")
+
+
+class S3Storage:
+    supports_presign = True
+
+    def __init__(self, bucket, endpoint_url=None, region=None, access_key=None, secret_key=None,
+                 public_url=None, multipart_threshold=8 * 1024 * 1024):
+        import boto3
+        from boto3.s3.transfer import TransferConfig
+        from botocore.config import Config as BotoConfig
+
+        self.bucket = bucket
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url or None,
+            region_name=region or None,
+            aws_access_key_id=access_key or None,
+            aws_secret_access_key=secret_key or None,
+            config=BotoConfig(signature_version="s3v4", s3={"addressing_style": "path"}),
+        )
+        self.transfer = TransferConfig(multipart_threshold=multipart_threshold,
+                                       multipart_chunksize=multipart_threshold)
+        if not public_url:
+            base = endpoint_url or f"https://{bucket}.s3.amazonaws.com"
+            public_url = f"{base.rstrip('/')}/{bucket}" if endpoint_url else base
+        self.public_url = public_url.rstrip("/")
+
+    def local_path(self, key: str):
+        return None
+
+    def url(self, key: str) -> str:
+        return f"{self.public_url}/{key}"
+
+    def key_for_url(self, url: str):
+        prefix = self.public_url + "/"
+        return url[len(prefix):] if url and url.startswith(prefix) else None
+
+    def exists(self, key: str) -> bool:
+        return self.stat(key) is not None
+
+    def stat(self, key: str):
+        from botocore.exceptions import ClientError
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return head["ContentLength"], head.get("ContentType")
+
+    def put_file(self, key: str, path: str, content_type: str):
+        # upload_file switches to a streamed multipart upload above the threshold
+        self.client.upload_file(
+            path, self.bucket, key,
+            ExtraArgs={"ContentType": content_type, "CacheControl": "public, max-age=31536000, immutable"},
+            Config=self.transfer,
+        )
+        os.remove(path)
+
+    def fetch(self, key: str, dest_path: str):
+        self.client.download_file(self.bucket, key, dest_path, Config=self.transfer)
+
+    def read_head(self, key: str, n: int) -> bytes:
+        obj = self.client.get_object(Bucket=self.bucket, Key=key, Range=f"bytes=0-{n - 1}")
+        return obj["Body"].read()
+
+    def verify_sha256(self, key: str, sha256: str) -> bool:
+        """Check an object's content hash, using the stored checksum if any."""
+        head = self.client.head_object(Bucket=self.bucket, Key=key, ChecksumMode="ENABLED")
+        stored = head.get("ChecksumSHA256")
+        if stored and "-" not in stored:
+            return stored == base64.b64encode(bytes.fromhex(sha256)).decode()
+        # Provider kept no (whole-object) checksum: hash the bytes ourselves
+        h = hashlib.sha256()
+        body = self.client.get_object(Bucket=self.bucket, Key=key)["Body"]
+        for chunk in body.iter_chunks(1024 * 1024):
+            h.update(chunk)
+        return h.hexdigest() == sha256
+
+    def delete_many(self, keys) -> int:
+        keys = list(keys)
+        removed = 0
+        # DeleteObjects takes at most 1000 keys per call
+        for i in range(0, len(keys), 1000):
+            batch = [{"Key": k} for k in keys[i:i + 1000]]
+            resp = self.client.delete_objects(Bucket=self.bucket, Delete={"Objects": batch, "Quiet": False})
+            removed += len(resp.get("Deleted", []))
+        return removed
+
+    def list(self):
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket):
+            for obj in page.get("Contents", []):
+                modified = obj["LastModified"]
+                if modified.tzinfo is None:
+                    modified = modified.replace(tzinfo=timezone.utc)
+                yield obj["Key"], obj["Size"], modified.timestamp()
+
+    def presign_upload(self, key, content_type, size, sha256_b64, expires):
+        """Presigned PUT; S3 rejects bodies whose length or SHA-256 differ,
+        and If-None-Match keeps it from overwriting an existing blob."""
+        url = self.client.generate_presigned_url(
+            "put_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": key,
+                "ContentType": content_type,
+                "ContentLength": size,
+                "ChecksumSHA256": sha256_b64,
+                "CacheControl": "public, max-age=31536000, immutable",
+                "IfNoneMatch": "*",
+            },
+            ExpiresIn=expires,
+        )
+        return {
+            "method": "PUT",
+            "url": url,
+            "headers": {
+                "Content-Type": content_type,
+                "x-amz-checksum-sha256": sha256_b64,
+                "Cache-Control": "public, max-age=31536000, immutable",
+                "If-None-Match": "*",
+            },
+            "expires_at": datetime.now(timezone.utc).timestamp() + expires,
+        }
+
+
+def init_storage(app):
+    """Build the configured backend and attach it to the app."""
+    kind = app.config.get("MEDIA_STORAGE", "local")
+    if kind == "s3":
+        storage = S3Storage(
+            bucket=app.config["S3_BUCKET"],
+            endpoint_url=app.config.get("S3_ENDPOINT_URL"),
+            region=app.config.get("S3_REGION"),
+            access_key=app.config.get("S3_ACCESS_KEY_ID"),
+            secret_key=app.config.get("S3_SECRET_ACCESS_KEY"),
+            public_url=app.config.get("S3_PUBLIC_URL"),
+            multipart_threshold=app.config.get("S3_MULTIPART_THRESHOLD", 8 * 1024 * 1024),
+        )
+    elif kind == "local":
+        storage = LocalStorage(app.config["UPLOAD_FOLDER"])
+    else:
+        raise ValueError(f"Unknown MEDIA_STORAGE {kind!r}")
+    app.extensions["media_storage"] = storage
+    return storage
+
+
+def get_storage():
+    return current_app.extensions["media_storage"]
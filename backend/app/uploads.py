@@ -0,0 +1,188 @@
+"""
+Streaming multipart upload parsing.
+
+Reads the request body in fixed-size chunks with werkzeug's sans-IO
+multipart decoder instead of letting `request.files` buffer/spool it. Each
+file part is sniffed from its first bytes, size-checked and hashed while it
+is written once to a temp file next to its final location, so accepting an
+upload is a single atomic rename and rejecting one never leaves a partial
+file behind. Memory per upload stays at roughly one chunk.
+"""
+
+import hashlib
+import os
+import tempfile
+
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+
+CHUNK_SIZE = 64 * 1024
+SNIFF_BYTES = 12
+TEMP_PREFIX = ".upload-"
+
+# mime -> (media type, extension)
+MIME_TYPES = {
+    "image/png": ("image", ".png"),
+    "image/jpeg": ("image", ".jpg"),
+    "image/webp": ("image", ".webp"),
+    "application/pdf": ("document", ".pdf"),
+}
+
+
+def sniff_mime(head: bytes):
+    """Detect an allowed MIME type from the first bytes of a file."""
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head.startswith(b"%PDF-"):
+        return "application/pdf"
+    return None
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+class IncomingFile:
+    """One file part, written to a temp file as it arrives.
+
+    Problems with this file (type, size) are recorded on `error` rather than
+    raised so the rest of the request can still be consumed.
+    """
+
+    def __init__(self, field_name, filename, tmp_dir, max_bytes):
+        self.field_name = field_name
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.mime = None
+        self.type = None
+        self.ext = None
+        self.size_bytes = 0
+        self.sha256 = None
+        self.temp_path = None
+        self.error = None if filename else "No selected file"
+        self._tmp_dir = tmp_dir
+        self._hash = hashlib.sha256()
+        self._head = b""
+        self._fh = None
+
+    def write(self, data: bytes):
+        if self.error:
+            return
+        if self._fh is None:
+            # Hold back the first bytes until we can tell what the file is
+            self._head += data
+            if len(self._head) < SNIFF_BYTES:
+                return
+            data, self._head = self._head, b""
+            if not self._open(data):
+                return
+        self.size_bytes += len(data)
+        if self.size_bytes > self.max_bytes:
+            self._fail("File too large")
+            return
+        self._hash.update(data)
+        self._fh.write(data)
+
+    def finish(self):
+        if self._fh is None and not self.error:
+            data, self._head = self._head, b""
+            if self._open(data):
+                self.write(data)
+        if self.error:
+            return
+        self._fh.close()
+        self.sha256 = self._hash.hexdigest()
+
+    def commit(self, dest_path: str):
+        """Atomically move the finished upload to `dest_path`."""
+        os.replace(self.temp_path, dest_path)
+        self.temp_path = None
+
+    def discard(self):
+        if self._fh is not None and not self._fh.closed:
+            self._fh.close()
+        if self.temp_path and os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+        self.temp_path = None
+
+    def _open(self, head: bytes) -> bool:
+        self.mime = sniff_mime(head)
+        if self.mime is None:
+            self._fail("Unsupported file type")
+            return False
+        self.type, self.ext = MIME_TYPES[self.mime]
+        fd, self.temp_path = tempfile.mkstemp(dir=self._tmp_dir, prefix=TEMP_PREFIX)
+        self._fh = os.fdopen(fd, "wb")
+        return True
+
+    def _fail(self, message):
+        self.error = message
+        self.discard()
+
+
+def stream_multipart(req, tmp_dir: str, max_bytes: int):
+    """Consume a multipart request body in one pass.
+
+    Returns `(fields, files)`: a dict of form values and a list of
+    `IncomingFile` in request order. The caller owns the files and must
+    `commit` or `discard` each one.
+    """
+    ctype, opts = parse_options_header(req.headers.get("Content-Type", ""))
+    if ctype != "multipart/form-data" or not opts.get("boundary"):
+        raise UploadError("Expected multipart/form-data")
+
+    max_field = req.max_form_memory_size
+    decoder = MultipartDecoder(
+        opts["boundary"].encode("latin-1"),
+        max_form_memory_size=max_field,
+        max_parts=req.max_form_parts,
+    )
+    fields = {}
+    files = []
+    current = None
+    buf = []
+
+    try:
+        while True:
+            chunk = req.stream.read(CHUNK_SIZE)
+            decoder.receive_data(chunk or None)
+            event = decoder.next_event()
+            while not isinstance(event, (Epilogue, NeedData)):
+                if isinstance(event, File):
+                    current = IncomingFile(event.name, event.filename, tmp_dir, max_bytes)
+                    files.append(current)
+                elif isinstance(event, Field):
+                    current = event
+                    buf = []
+                elif isinstance(event, Data):
+                    if isinstance(current, IncomingFile):
+                        current.write(event.data)
+                        if not event.more_data:
+                            current.finish()
+                    else:
+                        buf.append(event.data)
+                        if max_field is not None and sum(map(len, buf)) > max_field:
+                            raise RequestEntityTooLarge()
+                        if not event.more_data:
+                            fields[current.name] = b"".join(buf).decode("utf-8", "replace")
+                event = decoder.next_event()
+            if not chunk:
+                break
+    except ValueError:
+        for f in files:
+            f.discard()
+        raise UploadError("Malformed upload")
+    except BaseException:
+        for f in files:
+            f.discard()
+        raise
+
+    return fields, files
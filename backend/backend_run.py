@@ -1,9 +1,7 @@
 from app import create_app
-from app.extensions import db, socketio
+from app.extensions import socketio
 
 app = create_app()
 
 if __name__ == "__main__":
-    with app.app_context():
-        db.create_all()
     socketio.run(app, debug=True, host="0.0.0.0", port=5000)
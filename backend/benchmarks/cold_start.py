@@ -0,0 +1,66 @@
+"""
+Worker cold start: time to `create_app()` per DB_SCHEMA_MODE.
+
+Each sample is a fresh interpreter, like a new gunicorn worker, booting
+against a database already at the newest migration. Reports the median and
+max time spent in `create_app()` (imports excluded) and the SQL statements
+it ran. "create" is the old create_all() path; "check" is what server
+databases use by default.
+
+    python benchmarks/cold_start.py --runs 10
+    DATABASE_URL=postgresql://... python benchmarks/cold_start.py --modes create check
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app import create_app
+
+statements = []
+event.listen(Engine, "before_cursor_execute", lambda conn, cur, sql, *a: statements.append(sql))
+start = time.perf_counter()
+create_app()
+print(json.dumps({"seconds": time.perf_counter() - start, "statements": len(statements)}))
+"""
+
+
+def sample(url, mode):
+    env = dict(os.environ, DATABASE_URL=url, DB_SCHEMA_MODE=mode, DB_POOL_WARMUP="0", PYTHONPATH=BACKEND)
+    out = subprocess.run([sys.executable, "-c", CHILD], env=env, cwd=BACKEND,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--modes", nargs="+", default=["create", "migrate", "check"])
+    args = parser.parse_args()
+
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "cold_start.db")
+    # Bring the database to head once; every mode then boots against it
+    sample(url, "migrate")
+
+    print(f"{'mode':<8} {'median ms':>10} {'max ms':>8} {'statements':>11}")
+    for mode in args.modes:
+        runs = [sample(url, mode) for _ in range(args.runs)]
+        times = [r["seconds"] * 1000 for r in runs]
+        print(f"{mode:<8} {statistics.median(times):>10.1f} {max(times):>8.1f} "
+              f"{statistics.median(r['statements'] for r in runs):>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Compressed size and CPU cost of real JSON payloads, per encoder and level.
+
+Seeds a temporary SQLite database with seed_large.py, fetches the biggest
+responses (the busiest post's comment tree, a user's posts with full
+`content_md`, threads, the feed, notifications) through the Flask test
+client, then compresses each body with app/compression.py's encoders at
+several levels. Reports bytes, ratio and median compression time, to pick
+COMPRESSION_GZIP_LEVEL and COMPRESSION_BROTLI_QUALITY:
+
+    python benchmarks/compression.py
+    python benchmarks/compression.py --posts 5000 --gzip-levels 1 6 9 --brotli-qualities 4 5 11
+
+Brotli rows are skipped when the `brotli` package is not installed.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PAYLOADS = [
+    ("comment tree", "/comments/post/{post}"),
+    ("user posts", "/users/{user}/posts"),
+    ("threads", "/messages/threads"),
+    ("feed", "/posts?limit=50"),
+    ("notifications", "/notifications"),
+]
+
+
+def time_compress(data, encoding, config, repeat):
+    from app.compression import compress
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = compress(data, encoding, config)
+        times.append(time.perf_counter() - start)
+    return len(body), statistics.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--posts", type=int, default=3000)
+    parser.add_argument("--repeat", type=int, default=20, help="timed compressions per payload and level")
+    parser.add_argument("--gzip-levels", type=int, nargs="+", default=[1, 4, 6, 9])
+    parser.add_argument("--brotli-qualities", type=int, nargs="+", default=[1, 4, 5, 6, 9, 11])
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'compression.db')}"
+    os.environ["RATELIMIT_ENABLED"] = "false"
+    os.environ["RATELIMIT_STORAGE_URI"] = "memory://"
+    os.environ.setdefault("METRICS_ENABLED", "false")
+    os.environ.setdefault("UPLOAD_FOLDER", tempfile.mkdtemp())
+
+    import seed_large
+    from app import create_app, compression
+    from app.extensions import db
+    from query_budgets import pick_ids
+
+    app = create_app()
+    with app.app_context():
+        seed_large.seed(db.engine, seed_large.parse_args(
+            ["--users", str(args.users), "--posts", str(args.posts), "--end-date", "2026-01-01"]))
+        db.session.remove()
+        ids = pick_ids(db)
+        db.session.remove()
+
+    client = app.test_client()
+    client.post("/auth/login", json={"email": f"seed{ids['me']}@nitrkl.ac.in", "password": "password"})
+    bodies = []
+    for name, path in PAYLOADS:
+        # No Accept-Encoding, so these are the identity bodies
+        response = client.get(path.format(**ids))
+        bodies.append((name, response.get_data()))
+
+    runs = [("gzip", "COMPRESSION_GZIP_LEVEL", level) for level in args.gzip_levels]
+    if compression.brotli is not None:
+        runs += [("br", "COMPRESSION_BROTLI_QUALITY", q) for q in args.brotli_qualities]
+    else:
+        print("brotli is not installed; gzip only\n")
+
+    print(f"{'payload':<14} {'bytes':>9}  {'encoding':<8} {'level':>5} {'bytes':>9} {'ratio':>6} {'ms':>7} {'MB/s':>7}")
+    for name, data in bodies:
+        for encoding, key, level in runs:
+            size, ms = time_compress(data, encoding, {key: level}, args.repeat)
+            print(f"{name:<14} {len(data):>9,}  {encoding:<8} {level:>5} {size:>9,} {len(data) / size:>6.2f}"
+                  f" {ms:>7.2f} {len(data) / 1e3 / max(ms, 1e-6):>7.1f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Concurrent slow queries under gevent: do they overlap or queue?
+
+Spawns N greenlets that each run `SELECT pg_sleep(S)` through the app's
+SQLAlchemy engine. With the green wait callback installed the wall time is
+about S; without it (`--no-green`) it is about N * S.
+
+    DATABASE_URL=postgresql://... python benchmarks/green_queries.py -n 10 -s 0.5
+"""
+
+from gevent import monkey
+monkey.patch_all()
+
+import argparse
+import os
+import sys
+import time
+
+import gevent
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-n", "--concurrency", type=int, default=10)
+    parser.add_argument("-s", "--sleep", type=float, default=0.5)
+    parser.add_argument("--no-green", action="store_true", help="skip the wait callback")
+    args = parser.parse_args()
+
+    if not os.getenv("DATABASE_URL", "").startswith(("postgres://", "postgresql://")):
+        sys.exit("DATABASE_URL must point at a Postgres database")
+    os.environ["DB_GREEN_MODE"] = "off" if args.no_green else "on"
+
+    from app import create_app
+    from app.extensions import db
+
+    app = create_app()
+
+    def slow_query():
+        with app.app_context():
+            with db.engine.connect() as conn:
+                conn.execute(text("SELECT pg_sleep(:s)"), {"s": args.sleep})
+
+    # Open connections first so connect time is not measured
+    with app.app_context():
+        db.engine.dispose()
+    gevent.joinall([gevent.spawn(slow_query) for _ in range(args.concurrency)])
+
+    start = time.perf_counter()
+    gevent.joinall([gevent.spawn(slow_query) for _ in range(args.concurrency)], raise_error=True)
+    elapsed = time.perf_counter() - start
+
+    serial = args.concurrency * args.sleep
+    print(f"green={'no' if args.no_green else 'yes'} n={args.concurrency} sleep={args.sleep}s")
+    print(f"elapsed={elapsed:.2f}s (fully serial would be {serial:.2f}s, overlap={serial / elapsed:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
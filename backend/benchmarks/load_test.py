@@ -0,0 +1,334 @@
+"""
+HTTP load test: scripted user sessions against a seeded server.
+
+Each of C virtual users logs in as a seeded account (seed<id>@nitrkl.ac.in /
+"password", see seed_large.py) on its own keep-alive connection and then
+runs sessions picked by --mix:
+
+- browse: feed page (newest or popular), both unread-count polls
+- open:   a post from the feed, its comments and its reactions
+- react:  POST /reactions on a post from the feed
+- chat:   threads, one conversation, POST /messages
+
+Requests issued during --warmup are not counted. Reports per endpoint
+p50/p95/p99 latency, throughput, errors and SQL queries per request (from
+the X-Query-Count/X-Query-Time-Ms headers of app/query_profiler.py), and
+saves everything as JSON for --compare.
+
+Against a running server, start it with QUERY_PROFILER_HEADERS=true and
+RATELIMIT_ENABLED=false (or the limits will be what you measure):
+
+    python seed_large.py --reset --users 2000 --posts 50000 --seed 1 --end-date 2026-01-01
+    python benchmarks/load_test.py --url http://127.0.0.1:5000 -c 16 --duration 30
+    python benchmarks/load_test.py --serve -c 8 --compare benchmarks/results/before.json
+
+--serve runs the app in this process on a threaded Werkzeug server
+instead; client and server then share one interpreter, so use it to
+compare changes, not to size production.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from http.cookies import SimpleCookie
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REACTION_TYPES = ["like", "helpful", "funny", "insightful", "celebrate"]
+
+
+class Session:
+    """One virtual user: a keep-alive connection, its cookies and samples."""
+
+    def __init__(self, url, user_id, rng, samples):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.user_id = user_id
+        self.rng = rng
+        self.samples = samples
+        self.cookies = {}
+        self.conn = None
+        self.post_ids = []
+        self.recording = False
+
+    def request(self, method, path, name, body=None):
+        """Send one request; returns the decoded JSON body or None."""
+        headers = {"Accept": "application/json"}
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        start = time.perf_counter()
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            self.conn.request(method, path, payload, headers)
+            response = self.conn.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            self.conn = None
+            if self.recording:
+                self.samples.append((name, 0, time.perf_counter() - start, None, None))
+            return None
+        elapsed = time.perf_counter() - start
+        for header in response.headers.get_all("Set-Cookie") or []:
+            for key, morsel in SimpleCookie(header).items():
+                self.cookies[key] = morsel.value
+        if self.recording:
+            queries = response.getheader("X-Query-Count")
+            db_ms = response.getheader("X-Query-Time-Ms")
+            self.samples.append((
+                name, response.status, elapsed,
+                int(queries) if queries is not None else None,
+                float(db_ms) if db_ms is not None else None,
+            ))
+        if response.status >= 400 or not data:
+            return None
+        try:
+            return json.loads(data)
+        except ValueError:
+            return None
+
+    def login(self) -> bool:
+        body = {"email": f"seed{self.user_id}@nitrkl.ac.in", "password": "password"}
+        return self.request("POST", "/auth/login", "POST /auth/login", body) is not None
+
+    # Sessions
+
+    def browse(self):
+        sort = "popular" if self.rng.random() < 0.2 else "newest"
+        feed = self.request("GET", f"/posts?page={self.rng.randint(1, 5)}&sort={sort}", "GET /posts")
+        if feed and feed.get("posts"):
+            self.post_ids = [p["id"] for p in feed["posts"]]
+        self.request("GET", "/notifications/unread-count", "GET /notifications/unread-count")
+        self.request("GET", "/messages/unread-count", "GET /messages/unread-count")
+
+    def open(self):
+        post_id = self.pick_post()
+        if post_id is None:
+            return
+        self.request("GET", f"/posts/{post_id}", "GET /posts/<id>")
+        self.request("GET", f"/comments/post/{post_id}", "GET /comments/post/<id>")
+        self.request("GET", f"/reactions/post/{post_id}", "GET /reactions/post/<id>")
+
+    def react(self):
+        post_id = self.pick_post()
+        if post_id is None:
+            return
+        body = {"post_id": post_id, "type": self.rng.choice(REACTION_TYPES)}
+        self.request("POST", "/reactions", "POST /reactions", body)
+
+    def chat(self, peers):
+        threads = self.request("GET", "/messages/threads", "GET /messages/threads")
+        peer_ids = [t["user_id"] for t in (threads or {}).get("threads", [])]
+        other = self.rng.choice(peer_ids) if peer_ids and self.rng.random() < 0.7 else self.rng.choice(peers)
+        if other == self.user_id:
+            return
+        self.request("GET", f"/messages/conversation/{other}", "GET /messages/conversation/<id>")
+        body = {"recipient_id": other, "content": f"load test {self.rng.random():.6f}"}
+        self.request("POST", "/messages", "POST /messages", body)
+
+    def pick_post(self):
+        if not self.post_ids:
+            self.browse()
+        return self.rng.choice(self.post_ids) if self.post_ids else None
+
+
+def parse_mix(value: str) -> dict:
+    """'browse=50,open=30' -> {"browse": 50.0, "open": 30.0}."""
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip():
+            mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - {"browse", "open", "react", "chat"}
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown sessions: {', '.join(sorted(unknown))}")
+    return mix
+
+
+def virtual_user(url, user_id, peers, args, seed, start_at, stop_at, samples, logged_in):
+    rng = random.Random(seed)
+    session = Session(url, user_id, rng, samples)
+    if not session.login():
+        return
+    logged_in.append(user_id)
+    names, weights = zip(*args.mix.items())
+    while True:
+        now = time.perf_counter()
+        if now >= stop_at:
+            break
+        session.recording = now >= start_at
+        name = rng.choices(names, weights)[0]
+        if name == "chat":
+            session.chat(peers)
+        else:
+            getattr(session, name)()
+        if args.think_ms:
+            time.sleep(rng.expovariate(1000 / args.think_ms))
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def summarize(samples, duration) -> dict:
+    by_name = {}
+    for name, status, elapsed, queries, db_ms in samples:
+        by_name.setdefault(name, []).append((status, elapsed, queries, db_ms))
+
+    def stats(rows):
+        latencies = [r[1] for r in rows]
+        queries = [r[2] for r in rows if r[2] is not None]
+        db_ms = [r[3] for r in rows if r[3] is not None]
+        return {
+            "requests": len(rows),
+            "rps": round(len(rows) / duration, 2),
+            "errors": sum(1 for r in rows if not 200 <= r[0] < 400),
+            "statuses": dict(Counter(str(r[0]) for r in rows)),
+            "p50_ms": round(percentile(latencies, 0.5) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+            "max_ms": round(max(latencies) * 1000, 2) if latencies else 0.0,
+            "queries_avg": round(sum(queries) / len(queries), 2) if queries else None,
+            "queries_max": max(queries) if queries else None,
+            "db_ms_avg": round(sum(db_ms) / len(db_ms), 2) if db_ms else None,
+        }
+
+    return {
+        "total": stats([row for rows in by_name.values() for row in rows]),
+        "endpoints": {name: stats(rows) for name, rows in sorted(by_name.items())},
+    }
+
+
+def print_report(summary, baseline=None):
+    header = f"{'endpoint':<34} {'req':>7} {'rps':>8} {'err':>5} {'p50':>8} {'p95':>8} {'p99':>8} {'queries':>8}"
+    print(header)
+    print("-" * len(header))
+    rows = list(summary["endpoints"].items()) + [("TOTAL", summary["total"])]
+    for name, s in rows:
+        queries = "-" if s["queries_avg"] is None else f"{s['queries_avg']:g}"
+        print(f"{name:<34} {s['requests']:>7} {s['rps']:>8.1f} {s['errors']:>5} "
+              f"{s['p50_ms']:>8.2f} {s['p95_ms']:>8.2f} {s['p99_ms']:>8.2f} {queries:>8}")
+        if baseline is None:
+            continue
+        old = baseline["total"] if name == "TOTAL" else baseline["endpoints"].get(name)
+        if old:
+            deltas = []
+            for key in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+                if old[key]:
+                    deltas.append(f"{key} {(s[key] - old[key]) / old[key]:+.0%}")
+            if old.get("queries_avg") is not None and s["queries_avg"] is not None:
+                deltas.append(f"queries {old['queries_avg']:g} -> {s['queries_avg']:g}")
+            print(f"{'':<34} vs baseline: {', '.join(deltas)}")
+
+
+def serve_in_process():
+    """Start the app on a threaded Werkzeug server; returns its URL."""
+    os.environ.setdefault("QUERY_PROFILER_HEADERS", "true")
+    os.environ.setdefault("RATELIMIT_ENABLED", "false")
+    import logging
+
+    from werkzeug.serving import make_server
+
+    from app import create_app
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", 0, create_app(), threaded=True)
+    threading.Thread(target=server.serve_forever, name="load-test-server", daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", default="http://127.0.0.1:5000")
+    target.add_argument("--serve", action="store_true", help="run the app in this process (DATABASE_URL)")
+    parser.add_argument("-c", "--concurrency", type=int, default=8, help="virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="unmeasured seconds first")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("browse=50,open=30,react=10,chat=10"))
+    parser.add_argument("--think-ms", type=float, default=0, help="mean pause between sessions")
+    parser.add_argument("--users", type=int, default=1000, help="log in as seed1..seedN")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="JSON results path (default: benchmarks/results/<time>.json)")
+    parser.add_argument("--compare", help="earlier JSON results to diff against")
+    args = parser.parse_args()
+
+    url = serve_in_process() if args.serve else args.url.rstrip("/")
+    rng = random.Random(args.seed)
+    peers = list(range(1, args.users + 1))
+    user_ids = rng.sample(peers, min(args.concurrency, len(peers)))
+    samples, logged_in = [], []
+
+    start_at = time.perf_counter() + args.warmup
+    stop_at = start_at + args.duration
+    threads = [
+        threading.Thread(
+            target=virtual_user,
+            args=(url, user_id, peers, args, args.seed * 1000 + i, start_at, stop_at, samples, logged_in),
+            daemon=True,
+        )
+        for i, user_id in enumerate(user_ids)
+    ]
+    started = datetime.now()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    if not logged_in:
+        sys.exit(f"No virtual user could log in at {url}; seed the database with seed_large.py first.")
+    summary = summarize(samples, args.duration)
+    if summary["total"]["queries_avg"] is None:
+        print("No X-Query-Count headers: start the server with QUERY_PROFILER_HEADERS=true for query counts.")
+    print(f"{url}: {len(logged_in)} users, {args.duration:g}s (+{args.warmup:g}s warmup), mix "
+          + ",".join(f"{k}={v:g}" for k, v in args.mix.items()))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(summary, baseline)
+
+    out = args.out or os.path.join(HERE, "results", f"{started:%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump({
+            "started": started.isoformat(timespec="seconds"),
+            "git": git_revision(),
+            "url": url,
+            "database": os.getenv("DATABASE_URL", "").split("@")[-1] if args.serve else None,
+            "args": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+            "virtual_users": len(logged_in),
+            **summary,
+        }, f, indent=2)
+    print(f"Saved {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Login throughput under concurrent load, gevent worker style.
+
+Runs N concurrent /auth/login calls through the Flask test client inside a
+monkey-patched gevent process and reports logins/sec plus the worst event
+loop stall seen by a 10ms heartbeat greenlet. Compare against `--inline`,
+which hashes on the calling greenlet like the old `User.check_password`.
+
+    python benchmarks/login_throughput.py --users 20 --concurrency 50 --requests 200
+"""
+
+from gevent import monkey
+monkey.patch_all()
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import gevent
+from gevent.pool import Pool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--inline", action="store_true", help="hash on the hub (old behaviour)")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+
+    from app import create_app, passwords
+    from app.extensions import db, limiter
+    from app.models.user import User
+
+    if args.inline:
+        passwords._run = lambda fn, *a: fn(*a)
+
+    app = create_app()
+    limiter.enabled = False
+    with app.app_context():
+        for i in range(args.users):
+            u = User(email=f"bench{i}@nitrkl.ac.in", name=f"Bench {i}", verified=True)
+            u.set_password("password")
+            db.session.add(u)
+        db.session.commit()
+
+    stalls = []
+
+    def heartbeat():
+        while True:
+            t = time.perf_counter()
+            gevent.sleep(0.01)
+            stalls.append(time.perf_counter() - t - 0.01)
+
+    def login(i):
+        client = app.test_client()
+        r = client.post("/auth/login", json={
+            "email": f"bench{i % args.users}@nitrkl.ac.in",
+            "password": "password",
+        })
+        return r.status_code
+
+    hb = gevent.spawn(heartbeat)
+    start = time.perf_counter()
+    statuses = Pool(args.concurrency).map(login, range(args.requests))
+    elapsed = time.perf_counter() - start
+    hb.kill()
+
+    ok = sum(1 for s in statuses if s == 200)
+    mode = "inline" if args.inline else "threadpool"
+    print(f"mode={mode} requests={args.requests} ok={ok} concurrency={args.concurrency}")
+    print(f"throughput={args.requests / elapsed:.1f} logins/s elapsed={elapsed:.2f}s")
+    print(f"max_loop_stall={max(stalls or [0]) * 1000:.1f}ms heartbeats={len(stalls)}")
+
+
+if __name__ == "__main__":
+    main()
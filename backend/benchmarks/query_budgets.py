@@ -0,0 +1,133 @@
+"""
+Per-route SQL query and latency budgets, as a report.
+
+`pytest` already fails when a route goes over its query budget, its
+query count grows with the data, or its median latency is over twice its
+budget (tests/test_query_budgets.py). This script runs the same CASES
+(tests/budget_cases.py) against the same two fixtures and prints them as
+a table, with more timed calls per case and the exact latency budgets.
+
+Exits with status 1 if any budget is exceeded:
+
+    python benchmarks/query_budgets.py
+    python benchmarks/query_budgets.py --only posts. users. --repeat 50
+    python benchmarks/query_budgets.py --latency-factor 3   # slow CI machines
+
+Routes without a case (uploads, deletes) are listed at the end.
+"""
+
+import argparse
+import contextlib
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+sys.path.insert(0, os.path.join(BACKEND, "tests"))
+
+from budget_cases import CASES, fill, pick_ids  # noqa: E402
+
+
+def measure(client, method, path, body, repeat):
+    """(max queries, p50 ms, status) over `repeat` calls after one warmup call."""
+    client.open(path, method=method, json=body)
+    queries, times, status = [], [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.open(path, method=method, json=body)
+        times.append(time.perf_counter() - start)
+        queries.append(int(response.headers.get("X-Query-Count", -1)))
+        status = response.status_code
+    return max(queries), statistics.median(times) * 1000, status
+
+
+def run_cases(app, cases, ids, repeat):
+    client = app.test_client()
+    response = client.post("/auth/login", json={"email": f"seed{ids['me']}@nitrkl.ac.in", "password": "password"})
+    if response.status_code != 200:
+        sys.exit(f"Could not log in as seed{ids['me']}: {response.status_code} {response.get_data(as_text=True)}")
+    results = []
+    # Routes that print (feedback) would drown the report
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for endpoint, method, path, max_queries, max_ms, body in cases:
+            path, body = fill(path, ids), fill(body, ids)
+            queries, ms, status = measure(client, method, path, body, repeat)
+            results.append((endpoint, method, path, queries, ms, status))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=200, help="fixture size before growing")
+    parser.add_argument("--posts", type=int, default=1000, help="fixture size before growing")
+    parser.add_argument("--growth", type=int, default=4, help="second fixture is this many times larger")
+    parser.add_argument("--repeat", type=int, default=20, help="timed calls per case")
+    parser.add_argument("--latency-factor", type=float, default=1.0, help="multiply every latency budget")
+    parser.add_argument("--only", nargs="+", help="endpoint prefixes to run, e.g. posts. users.get_user_posts")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'budgets.db')}"
+    os.environ["QUERY_PROFILER_HEADERS"] = "true"
+    os.environ["RATELIMIT_ENABLED"] = "false"
+    os.environ["RATELIMIT_STORAGE_URI"] = "memory://"
+    os.environ.setdefault("METRICS_ENABLED", "false")
+    os.environ.setdefault("UPLOAD_FOLDER", tempfile.mkdtemp())
+
+    import seed_large
+    from app import create_app
+    from app.extensions import db
+
+    cases = [c for c in CASES if not args.only or c[0].startswith(tuple(args.only))]
+    app = create_app()
+    # The report covers N+1s and slow statements; skip the per-request log lines
+    logging.getLogger(app.logger.name).setLevel(logging.ERROR)
+    fixtures = [
+        ["--users", str(args.users), "--posts", str(args.posts)],
+        ["--users", str(args.users * (args.growth - 1)), "--posts", str(args.posts * (args.growth - 1))],
+    ]
+    runs = []
+    with app.app_context():
+        for i, fixture in enumerate(fixtures):
+            seed_args = seed_large.parse_args(fixture + ["--seed", str(i + 1), "--end-date", "2026-01-01"])
+            counts = seed_large.seed(db.engine, seed_args)
+            db.session.remove()
+            ids = pick_ids(db)
+            db.session.remove()
+            print(f"fixture {i + 1}: +{sum(counts.values()):,} rows")
+            runs.append(run_cases(app, cases, ids, args.repeat))
+
+    print(f"{'endpoint':<34} {'request':<38} {'queries':>9} {'budget':>6} {'p50 ms':>7} {'budget':>6}")
+    failures = 0
+    for case, small, large in zip(cases, *runs):
+        endpoint, method, _, max_queries, max_ms, _ = case
+        queries, ms, status = large[3], large[4], large[5]
+        budget_ms = max_ms * args.latency_factor
+        problems = []
+        if status >= 400:
+            problems.append(f"status {status}")
+        if queries > max_queries:
+            problems.append("too many queries")
+        if method == "GET" and queries != small[3]:
+            problems.append(f"queries grow with data ({small[3]} -> {queries})")
+        if ms > budget_ms:
+            problems.append("too slow")
+        failures += bool(problems)
+        request = f"{method} {large[2]}"
+        print(f"{endpoint:<34} {request[:38]:<38} {queries:>9} {max_queries:>6} {ms:>7.1f} {budget_ms:>6.0f}"
+              + (f"  FAIL: {', '.join(problems)}" if problems else ""))
+
+    covered = {c[0] for c in CASES}
+    uncovered = sorted(rule.endpoint for rule in app.url_map.iter_rules()
+                       if "." in rule.endpoint and rule.endpoint not in covered)
+    if uncovered:
+        print(f"\nNo budget: {', '.join(uncovered)}")
+    print(f"\n{len(cases) - failures}/{len(cases)} within budget")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Mixed read/write throughput on SQLite, per profile.
+
+Forks W worker processes, like gunicorn, that share one database file for
+D seconds. Each operation is a feed read (latest 20 rows and a count) or,
+with probability --write-ratio, a request-style write transaction (read a
+row, then insert one). The run is repeated for every profile given and
+reports ops/sec, p50/p99 latency and "database is locked" failures.
+
+    python benchmarks/sqlite_mixed.py --workers 4 --duration 10 --write-ratio 0.2
+    python benchmarks/sqlite_mixed.py --profiles safe fast
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.sqlite_tuning import apply_profile
+
+SEED_ROWS = 20000
+
+
+def make_engine(path, config):
+    engine = create_engine(f"sqlite:///{path}")
+    apply_profile(engine, config)
+    return engine
+
+
+def setup(path, config):
+    engine = make_engine(path, config)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE posts (id INTEGER PRIMARY KEY, user_id INTEGER, title TEXT,"
+            " body TEXT, created_at REAL)"
+        ))
+        conn.execute(text("CREATE INDEX ix_posts_created ON posts (created_at)"))
+        conn.execute(
+            text("INSERT INTO posts (user_id, title, body, created_at) VALUES (:u, :t, :b, :c)"),
+            [{"u": i % 500, "t": f"Post {i}", "b": "x" * 400, "c": time.time() - i} for i in range(SEED_ROWS)],
+        )
+    engine.dispose()
+
+
+def worker(path, config, duration, write_ratio, seed, results):
+    rng = random.Random(seed)
+    engine = make_engine(path, config)
+    reads, writes, locked = [], [], 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        write = rng.random() < write_ratio
+        start = time.perf_counter()
+        try:
+            with engine.begin() as conn:
+                if write:
+                    user_id = conn.execute(
+                        text("SELECT user_id FROM posts WHERE id = :id"), {"id": rng.randint(1, SEED_ROWS)}
+                    ).scalar()
+                    conn.execute(
+                        text("INSERT INTO posts (user_id, title, body, created_at) VALUES (:u, 'bench', :b, :c)"),
+                        {"u": user_id or 0, "b": "y" * 400, "c": time.time()},
+                    )
+                else:
+                    conn.execute(text("SELECT id, title, body FROM posts ORDER BY created_at DESC LIMIT 20")).all()
+                    conn.execute(text("SELECT COUNT(*) FROM posts")).scalar()
+        except OperationalError as e:
+            if "locked" not in str(e) and "busy" not in str(e):
+                raise
+            locked += 1
+            continue
+        (writes if write else reads).append(time.perf_counter() - start)
+    engine.dispose()
+    results.put((reads, writes, locked))
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def run(profile, args):
+    config = {"SQLITE_PROFILE": profile}
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    setup(path, config)
+
+    ctx = multiprocessing.get_context("fork")
+    results = ctx.Queue()
+    procs = [
+        ctx.Process(target=worker, args=(path, config, args.duration, args.write_ratio, i, results))
+        for i in range(args.workers)
+    ]
+    for p in procs:
+        p.start()
+    reads, writes, locked = [], [], 0
+    for _ in procs:
+        r, w, l = results.get()
+        reads += r
+        writes += w
+        locked += l
+    for p in procs:
+        p.join()
+
+    ops = len(reads) + len(writes)
+    print(
+        f"{profile:<16} {ops / args.duration:>9.0f} ops/s  "
+        f"reads {len(reads):>7} (p50 {percentile(reads, .5) * 1000:6.2f}ms p99 {percentile(reads, .99) * 1000:7.2f}ms)  "
+        f"writes {len(writes):>6} (p50 {percentile(writes, .5) * 1000:6.2f}ms p99 {percentile(writes, .99) * 1000:7.2f}ms)  "
+        f"locked {locked:>4}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--profiles", nargs="+", default=["safe", "fast"], choices=["safe", "fast"])
+    args = parser.parse_args()
+    print(f"{args.workers} workers, {args.duration:g}s, {args.write_ratio:.0%} writes")
+    for profile in args.profiles:
+        run(profile, args)
+
+
+if __name__ == "__main__":
+    main()
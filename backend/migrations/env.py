@@ -0,0 +1,58 @@
+"""Alembic environment.
+
+Called either from app/schema.py, which passes an open connection in
+`config.attributes["connection"]`, or from the `alembic` command line in
+backend/, which builds the app (schema handling off) and uses its engine so
+the database URL resolves exactly as it does for the server.
+"""
+
+import os
+import sys
+from logging.config import fileConfig
+
+from alembic import context
+
+config = context.config
+connection = config.attributes.get("connection")
+
+if connection is None:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    os.environ["DB_SCHEMA_MODE"] = "off"
+    if config.config_file_name is not None:
+        fileConfig(config.config_file_name)
+
+from app.extensions import db  # noqa: E402
+from app.schema import adopt_legacy_database  # noqa: E402
+import app.models  # noqa: E402,F401  registers every table on db.metadata
+
+target_metadata = db.metadata
+
+
+def run_migrations(connection):
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        # SQLite can only ALTER by copying tables
+        render_as_batch=connection.dialect.name == "sqlite",
+        compare_type=True,
+    )
+    with context.begin_transaction():
+        adopt_legacy_database(context.get_context(), context.script)
+        context.run_migrations()
+
+
+if connection is not None:
+    run_migrations(connection)
+else:
+    from app import create_app
+
+    flask_app = create_app()
+    with flask_app.app_context():
+        if context.is_offline_mode():
+            context.configure(url=db.engine.url, target_metadata=target_metadata, literal_binds=True)
+            with context.begin_transaction():
+                context.run_migrations()
+        else:
+            with db.engine.connect() as conn:
+                run_migrations(conn)
+                conn.commit()
@@ -0,0 +1,163 @@
+"""baseline schema
+
+The tables as db.create_all() built them before migrations were added.
+Existing databases without an alembic_version table are stamped at this
+revision instead of running it (see app/schema.py).
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 05:39:18.137435
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(length=255), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.Column('branch', sa.String(length=120), nullable=True),
+    sa.Column('year', sa.String(length=20), nullable=True),
+    sa.Column('bio', sa.Text(), nullable=True),
+    sa.Column('profile_pic', sa.String(length=512), nullable=True),
+    sa.Column('verified', sa.Boolean(), nullable=True),
+    sa.Column('role', sa.String(length=20), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('password_hash', sa.String(length=255), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+
+    op.create_table('messages',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('sender_id', sa.Integer(), nullable=False),
+    sa.Column('recipient_id', sa.Integer(), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('is_read', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['recipient_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['sender_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_messages_created_at', 'messages', ['created_at'], unique=False)
+
+    op.create_table('posts',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=200), nullable=False),
+    sa.Column('content_md', sa.Text(), nullable=False),
+    sa.Column('content_html', sa.Text(), nullable=True),
+    sa.Column('category', sa.String(length=50), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('edited_at', sa.DateTime(), nullable=True),
+    sa.Column('is_deleted', sa.Boolean(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_posts_category', 'posts', ['category'], unique=False)
+    op.create_index('ix_posts_user_id', 'posts', ['user_id'], unique=False)
+
+    op.create_table('comments',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('post_id', sa.Integer(), nullable=False),
+    sa.Column('parent_id', sa.Integer(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('depth', sa.Integer(), nullable=True),
+    sa.Column('path', sa.String(length=1024), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('is_deleted', sa.Boolean(), nullable=True),
+    sa.ForeignKeyConstraint(['parent_id'], ['comments.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['post_id'], ['posts.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_comments_parent_id', 'comments', ['parent_id'], unique=False)
+    op.create_index('ix_comments_path', 'comments', ['path'], unique=False)
+    op.create_index('ix_comments_post_id', 'comments', ['post_id'], unique=False)
+    op.create_index('ix_comments_user_id', 'comments', ['user_id'], unique=False)
+
+    op.create_table('media',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('post_id', sa.Integer(), nullable=True),
+    sa.Column('type', sa.String(length=20), nullable=True),
+    sa.Column('url', sa.String(length=512), nullable=True),
+    sa.Column('mime', sa.String(length=120), nullable=True),
+    sa.Column('size_bytes', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['post_id'], ['posts.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_media_post_id', 'media', ['post_id'], unique=False)
+
+    op.create_table('notifications',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('type', sa.String(length=50), nullable=False),
+    sa.Column('content', sa.String(length=512), nullable=False),
+    sa.Column('post_id', sa.Integer(), nullable=True),
+    sa.Column('comment_id', sa.Integer(), nullable=True),
+    sa.Column('actor_id', sa.Integer(), nullable=False),
+    sa.Column('is_read', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['actor_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['comment_id'], ['comments.id'], ),
+    sa.ForeignKeyConstraint(['post_id'], ['posts.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_notifications_created_at', 'notifications', ['created_at'], unique=False)
+
+    op.create_table('reactions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('post_id', sa.Integer(), nullable=True),
+    sa.Column('comment_id', sa.Integer(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('type', sa.String(length=30), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['comment_id'], ['comments.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['post_id'], ['posts.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('post_id', 'comment_id', 'user_id', 'type', name='uniq_reaction')
+    )
+    op.create_index('ix_reactions_comment_id', 'reactions', ['comment_id'], unique=False)
+    op.create_index('ix_reactions_post_id', 'reactions', ['post_id'], unique=False)
+    op.create_index('ix_reactions_user_id', 'reactions', ['user_id'], unique=False)
+
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_reactions_user_id', table_name='reactions')
+    op.drop_index('ix_reactions_post_id', table_name='reactions')
+    op.drop_index('ix_reactions_comment_id', table_name='reactions')
+    op.drop_table('reactions')
+    op.drop_index('ix_notifications_created_at', table_name='notifications')
+    op.drop_table('notifications')
+    op.drop_index('ix_media_post_id', table_name='media')
+    op.drop_table('media')
+    op.drop_index('ix_comments_user_id', table_name='comments')
+    op.drop_index('ix_comments_post_id', table_name='comments')
+    op.drop_index('ix_comments_path', table_name='comments')
+    op.drop_index('ix_comments_parent_id', table_name='comments')
+    op.drop_table('comments')
+    op.drop_index('ix_posts_user_id', table_name='posts')
+    op.drop_index('ix_posts_category', table_name='posts')
+    op.drop_table('posts')
+    op.drop_index('ix_messages_created_at', table_name='messages')
+    op.drop_table('messages')
+    op.drop_index('ix_users_email', table_name='users')
+    op.drop_table('users')
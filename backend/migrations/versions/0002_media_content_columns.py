@@ -0,0 +1,51 @@
+"""media content hash, derivatives, size and placeholder
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 05:45:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def columns():
+    return [
+        sa.Column('sha256', sa.String(length=64), nullable=True),
+        sa.Column('derivatives', sa.JSON(none_as_null=True), nullable=True),
+        sa.Column('width', sa.Integer(), nullable=True),
+        sa.Column('height', sa.Integer(), nullable=True),
+        sa.Column('placeholder', sa.Text(), nullable=True),
+    ]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Databases adopted at the baseline may already have some of these
+    # if they were created by a create_all() that post-dated the columns
+    inspector = sa.inspect(op.get_bind())
+    existing = {c['name'] for c in inspector.get_columns('media')}
+    indexes = {i['name'] for i in inspector.get_indexes('media')}
+    with op.batch_alter_table('media', schema=None) as batch_op:
+        for column in columns():
+            if column.name not in existing:
+                batch_op.add_column(column)
+    if 'ix_media_sha256' not in indexes:
+        op.create_index('ix_media_sha256', 'media', ['sha256'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_media_sha256', table_name='media')
+    with op.batch_alter_table('media', schema=None) as batch_op:
+        for column in reversed(columns()):
+            batch_op.drop_column(column.name)
@@ -0,0 +1,49 @@
+"""composite indexes for feed, profile, message and notification queries
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 05:39:59.390556
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('ix_posts_feed', 'posts', ['is_deleted', 'created_at']),
+    ('ix_posts_category_created', 'posts', ['category', 'created_at']),
+    ('ix_posts_user_created', 'posts', ['user_id', 'created_at']),
+    ('ix_comments_post_created', 'comments', ['post_id', 'created_at']),
+    ('ix_comments_user_created', 'comments', ['user_id', 'created_at']),
+    ('ix_media_url', 'media', ['url']),
+    ('ix_media_post_type', 'media', ['post_id', 'type']),
+    ('ix_messages_sender_recipient_created', 'messages', ['sender_id', 'recipient_id', 'created_at']),
+    ('ix_messages_recipient_sender_created', 'messages', ['recipient_id', 'sender_id', 'created_at']),
+    ('ix_messages_recipient_unread', 'messages', ['recipient_id', 'is_read']),
+    ('ix_notifications_user_created', 'notifications', ['user_id', 'created_at']),
+    ('ix_notifications_user_unread', 'notifications', ['user_id', 'is_read']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Skip indexes a create_all() database adopted at the baseline already has
+    inspector = sa.inspect(op.get_bind())
+    for name, table, cols in INDEXES:
+        if name not in {i['name'] for i in inspector.get_indexes(table)}:
+            op.create_index(name, table, cols, unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -1,200 +1,369 @@
+"""
+Generate a large synthetic dataset for benchmarks.
+
+    python seed_large.py --users 20000 --posts 200000 --seed 7
+    python seed_large.py --posts 2000000 --comments-per-post 6 --reset
+    DATABASE_URL=postgresql://... python seed_large.py --posts 1000000
+
+Rows are built in plain Python and written in batches of --batch-size:
+COPY on Postgres and one SQLAlchemy Core `insert()` executemany per table
+elsewhere. Every user gets the same precomputed password hash ("password"),
+ids are assigned here (continuing after any existing rows), and everything
+is drawn from one seeded RNG, so the same arguments, --seed and --end-date
+always produce the same database.
+
+Distributions are skewed the way a campus feed is:
+- a Zipf-like minority of users writes most posts, comments and messages
+- post popularity is heavy-tailed (Pareto), and comment and reaction
+  counts follow it, so a few posts carry hundreds of comments
+- comments often reply to recent comments, building deep reply chains
+  with materialized `path`/`depth` (capped at --max-depth)
+- activity is denser towards --end-date; older notifications and
+  messages are mostly read
+"""
+
+import argparse
+import csv
+import io
 import os
-import sys
 import random
-import string
+import sys
+import time
+from bisect import bisect_left
 from datetime import datetime, timedelta
+from itertools import accumulate
 
-# Add parent dir to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+from sqlalchemy import func, select, text
+
 from app import create_app
 from app.extensions import db
-from app.models.user import User
-from app.models.post import Post
 from app.models.comment import Comment
+from app.models.message import Message
+from app.models.notification import Notification
+from app.models.post import Media, Post
 from app.models.reaction import Reaction
-from app.models.message import Message  # Assuming Message model exists, though not in imports above
+from app.models.user import User
+from app.passwords import hash_password
 
-# Constants
-NUM_USERS = 50
-NUM_POSTS = 100
+CATEGORIES = ["General", "Events", "Announcements", "Academic", "Campus Life", "Lost & Found"]
+CATEGORY_WEIGHTS = [40, 20, 10, 15, 10, 5]
 REACTION_TYPES = ["like", "helpful", "funny", "insightful", "celebrate"]
-CATEGORIES = ['Academics', 'Events', 'Clubs', 'Sports', 'Placements', 'General', 'Food', 'Housing']
+REACTION_WEIGHTS = [60, 12, 12, 8, 8]
+BRANCHES = ["CS", "EE", "ECE", "ME", "CE", "CH", "BT", "MM"]
+YEARS = ["1st", "2nd", "3rd", "4th"]
+WORDS = (
+    "campus hostel mess library exam quiz lab project club fest night class notes "
+    "assignment deadline semester placement internship result lecture seminar hackathon "
+    "cricket football music dance canteen wifi bus gate ground department professor "
+    "anyone found lost please help today tomorrow evening morning meet join free new "
+    "the a is at in on for to and with from of this that will be are there"
+).split()
 
-def random_string(length=10):
-    return ''.join(random.choices(string.ascii_letters, k=length))
+# Tables in foreign-key order; flushed in this order
+TABLES = [User.__table__, Post.__table__, Media.__table__, Comment.__table__,
+          Reaction.__table__, Message.__table__, Notification.__table__]
 
-def random_date(days_back=30):
-    return datetime.utcnow() - timedelta(days=random.randint(0, days_back), hours=random.randint(0, 23), minutes=random.randint(0, 59))
 
-def seed():
-    app = create_app()
-    with app.app_context():
-        print("🌱 Seeding large dataset...")
-
-        # 1. Clear interactions
-        print("🗑️  Clearing old comments, reactions, and messages...")
-        try:
-            db.session.query(Reaction).delete()
-            db.session.query(Comment).delete()
-            # Try to clear messages if model exists
-            try:
-                from app.models.message import Message
-                db.session.query(Message).delete()
-            except Exception:
-                pass
-            db.session.commit()
-            print("  ✓ Cleared interactions")
-        except Exception as e:
-            db.session.rollback()
-            print(f"  ✗ Failed to clear interactions: {e}")
+class BulkWriter:
+    """Buffers rows per table and writes them in batches, parents first."""
+
+    def __init__(self, engine, batch_size: int):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.buffers = {table.name: [] for table in TABLES}
+        self.pending = 0
+        self.counts = dict.fromkeys(self.buffers, 0)
+        self.dialect = engine.dialect.name
+
+    def add(self, table, row: dict):
+        self.buffers[table.name].append(row)
+        self.pending += 1
+        if self.pending >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        with self.engine.begin() as conn:
+            for table in TABLES:
+                rows = self.buffers[table.name]
+                if not rows:
+                    continue
+                if self.dialect == "postgresql":
+                    self._copy(conn, table, rows)
+                else:
+                    conn.execute(table.insert(), rows)
+                self.counts[table.name] += len(rows)
+                self.buffers[table.name] = []
+        self.pending = 0
+
+    def _copy(self, conn, table, rows):
+        columns = list(rows[0])
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        for row in rows:
+            writer.writerow([r"\N" if row[c] is None else row[c] for c in columns])
+        buf.seek(0)
+        cursor = conn.connection.cursor()
+        cursor.copy_expert(
+            f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buf
+        )
+
+
+class Generator:
+    def __init__(self, args, writer, start_ids):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.writer = writer
+        self.ids = dict(start_ids)
+        self.end = args.end_date
+        self.span = timedelta(days=args.days).total_seconds()
+        self.password_hash = hash_password("password")
+        self.user_ids = []
+        # Zipf-like activity: user k (in a shuffled order) has weight 1/k^s
+        self.user_cum = []
+
+    def next_id(self, table) -> int:
+        self.ids[table] += 1
+        return self.ids[table]
+
+    def words(self, n: int) -> str:
+        return " ".join(self.rng.choices(WORDS, k=n))
+
+    def active_user(self) -> int:
+        r = self.rng.random() * self.user_cum[-1]
+        return self.user_ids[bisect_left(self.user_cum, r)]
+
+    def timestamp(self, fraction: float) -> datetime:
+        """A time `fraction` of the way through the period, 0 = oldest."""
+        return self.end - timedelta(seconds=self.span * (1 - fraction))
+
+    def users(self):
+        rng = self.rng
+        for _ in range(self.args.users):
+            uid = self.next_id("users")
+            self.user_ids.append(uid)
+            self.writer.add(User.__table__, {
+                "id": uid,
+                "email": f"seed{uid}@nitrkl.ac.in",
+                "name": f"{self.words(1).title()} {uid}",
+                "branch": rng.choice(BRANCHES),
+                "year": rng.choice(YEARS),
+                "bio": self.words(rng.randint(0, 12)) or None,
+                "profile_pic": None,
+                "verified": True,
+                "role": "user",
+                "created_at": self.timestamp(rng.random() * 0.2),
+                "password_hash": self.password_hash,
+            })
+        order = list(range(1, len(self.user_ids) + 1))
+        rng.shuffle(order)
+        self.user_cum = list(accumulate(1 / k ** self.args.user_skew for k in order))
+
+    def posts(self):
+        args, rng = self.args, self.rng
+        # Pareto(alpha) has mean alpha / (alpha - 1); scale counts so the
+        # averages match the requested per-post means
+        mean_popularity = args.popularity_alpha / (args.popularity_alpha - 1)
+        for i in range(args.posts):
+            pid = self.next_id("posts")
+            author = self.active_user()
+            # Ids stay chronological; sqrt makes recent months busier
+            created = self.timestamp(((i + rng.random()) / args.posts) ** 0.5)
+            title = self.words(rng.randint(3, 10)).capitalize()
+            body = self.words(rng.randint(10, 80))
+            self.writer.add(Post.__table__, {
+                "id": pid, "user_id": author, "title": title[:200],
+                "content_md": body, "content_html": f"<p>{body}</p>",
+                "category": rng.choices(CATEGORIES, CATEGORY_WEIGHTS)[0],
+                "created_at": created, "edited_at": None,
+                "is_deleted": rng.random() < args.deleted_ratio,
+            })
+            if rng.random() < args.media_ratio:
+                self.media(pid, created)
+            popularity = rng.paretovariate(args.popularity_alpha) / mean_popularity
+            n_comments = min(args.max_comments, int(popularity * args.comments_per_post + rng.random()))
+            n_reactions = min(len(self.user_ids), int(popularity * args.reactions_per_post + rng.random()))
+            self.comments(pid, author, created, n_comments)
+            self.post_reactions(pid, author, created, n_reactions)
+
+    def media(self, pid, created):
+        rng = self.rng
+        for _ in range(rng.choice((1, 1, 1, 2, 3))):
+            mid = self.next_id("media")
+            width, height = rng.choice(((1200, 900), (900, 1200), (1280, 720), (1080, 1080)))
+            self.writer.add(Media.__table__, {
+                "id": mid, "post_id": pid, "type": "image",
+                "url": f"/uploads/seed/{mid}.jpg", "mime": "image/jpeg",
+                "size_bytes": rng.randint(80_000, 2_000_000), "sha256": None,
+                "derivatives": None, "width": width, "height": height,
+                "placeholder": None, "created_at": created,
+            })
+
+    def comments(self, pid, post_author, post_created, count):
+        args, rng = self.args, self.rng
+        nodes = []  # (id, user_id, depth, path) of this post's comments so far
+        t = post_created
+        for _ in range(count):
+            cid = self.next_id("comments")
+            user = self.active_user()
+            # Replies arrive quickly at first, then taper off
+            t = min(self.end, t + timedelta(seconds=rng.expovariate(1 / 1800)))
+            parent = None
+            if nodes and rng.random() < args.reply_ratio:
+                # Mostly reply to one of the latest comments: long chains
+                parent = nodes[-1 - min(len(nodes) - 1, int(rng.expovariate(1.5)))]
+                if parent[2] + 1 > args.max_depth:
+                    parent = None
+            if parent is None:
+                depth, path, parent_id = 0, None, None
+            else:
+                parent_id = parent[0]
+                depth = parent[2] + 1
+                path = f"{parent[3]}/{parent_id}" if parent[3] else str(parent_id)
+            nodes.append((cid, user, depth, path))
+            self.writer.add(Comment.__table__, {
+                "id": cid, "post_id": pid, "parent_id": parent_id, "user_id": user,
+                "content": self.words(rng.randint(3, 40)), "depth": depth, "path": path,
+                "created_at": t, "is_deleted": rng.random() < args.deleted_ratio,
+            })
+            target = parent[1] if parent else post_author
+            if target != user:
+                kind = "replied to your comment" if parent else "commented on your post"
+                self.notification(target, user, "comment_reply", f"User {user} {kind}", pid, cid, t)
+            if rng.random() < args.comment_reaction_ratio:
+                for reactor in self.reactors(rng.randint(1, 4)):
+                    self.reaction(None, cid, reactor, t)
+
+    def reactors(self, k: int) -> set:
+        # Active users react more; duplicates collapse (unique constraint)
+        return {self.active_user() for _ in range(k)}
+
+    def post_reactions(self, pid, author, created, count):
+        for reactor in self.reactors(count):
+            t = min(self.end, created + timedelta(seconds=self.rng.expovariate(1 / 3600)))
+            self.reaction(pid, None, reactor, t)
+            if reactor != author:
+                self.notification(author, reactor, "post_reaction",
+                                  f"User {reactor} reacted to your post", pid, None, t)
+
+    def reaction(self, pid, cid, user, t):
+        self.writer.add(Reaction.__table__, {
+            "id": self.next_id("reactions"), "post_id": pid, "comment_id": cid, "user_id": user,
+            "type": self.rng.choices(REACTION_TYPES, REACTION_WEIGHTS)[0], "created_at": t,
+        })
+
+    def notification(self, user, actor, kind, content, pid, cid, t):
+        if self.rng.random() >= self.args.notification_ratio:
             return
+        recent = (self.end - t).total_seconds() < 2 * 86400
+        self.writer.add(Notification.__table__, {
+            "id": self.next_id("notifications"), "user_id": user, "type": kind,
+            "content": content, "post_id": pid, "comment_id": cid, "actor_id": actor,
+            "is_read": not recent and self.rng.random() < 0.9, "created_at": t,
+        })
 
-        # 2. Create Users
-        print(f"👤 Creating {NUM_USERS} users...")
-        users = []
-        for i in range(NUM_USERS):
-            name = f"User_{random_string(5)}"
-            email = f"user{i}_{random_string(4)}@nitrkl.ac.in"
-            user = User(
-                name=name,
-                email=email.lower(),
-                branch=random.choice(["CS", "EE", "ME", "CE", "BT"]),
-                year=random.choice(["1st", "2nd", "3rd", "4th"]),
-                bio=f"Bio for {name}",
-                verified=True,
-                role="user"
-            )
-            user.set_password("password")
-            db.session.add(user)
-            users.append(user)
-        
-        try:
-            db.session.commit()
-            # Reload users to get IDs
-            users = User.query.filter(User.email.contains("@nitrkl.ac.in")).limit(NUM_USERS).all() # Just get the ones we made or all
-            # Actually, let's just fetch all users to be safe including old ones
-            users = User.query.all()
-            print(f"  ✓ Total users in DB: {len(users)}")
-        except Exception as e:
-            print(f"  ✗ Failed to create users: {e}")
-        
-        if not users:
-            print("No users found/created. Aborting.")
+    def messages(self):
+        args, rng = self.args, self.rng
+        if len(self.user_ids) < 2:
             return
+        for _ in range(args.conversations):
+            a = self.active_user()
+            b = self.active_user()
+            while b == a:
+                b = self.user_ids[rng.randrange(len(self.user_ids))]
+            length = min(args.max_messages, int(rng.paretovariate(1.3) * 3))
+            t = self.timestamp(rng.random() ** 0.5)
+            for m in range(length):
+                t = min(self.end, t + timedelta(seconds=rng.expovariate(1 / 600)))
+                sender, recipient = (a, b) if rng.random() < 0.5 else (b, a)
+                recent = (self.end - t).total_seconds() < 86400
+                self.writer.add(Message.__table__, {
+                    "id": self.next_id("messages"), "sender_id": sender, "recipient_id": recipient,
+                    "content": self.words(rng.randint(1, 25)),
+                    "is_read": not (recent or m == length - 1) or rng.random() < 0.3,
+                    "created_at": t,
+                })
+                if m == 0:
+                    self.notification(recipient, sender, "direct_message",
+                                      f"User {sender} sent you a message", None, None, t)
+
+
+def reset_sequences(conn):
+    """Move Postgres id sequences past the ids written here."""
+    for table in TABLES:
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+            f"COALESCE((SELECT max(id) FROM {table.name}), 1))"
+        ))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a large synthetic CampusFeed dataset.")
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--posts", type=int, default=50000)
+    parser.add_argument("--comments-per-post", type=float, default=4, help="mean; heavy-tailed per post")
+    parser.add_argument("--reactions-per-post", type=float, default=6, help="mean; heavy-tailed per post")
+    parser.add_argument("--max-comments", type=int, default=2000, help="per post")
+    parser.add_argument("--reply-ratio", type=float, default=0.75, help="share of comments that are replies")
+    parser.add_argument("--max-depth", type=int, default=40)
+    parser.add_argument("--comment-reaction-ratio", type=float, default=0.2)
+    parser.add_argument("--conversations", type=int, default=None, help="default: users * 2")
+    parser.add_argument("--max-messages", type=int, default=500, help="per conversation")
+    parser.add_argument("--notification-ratio", type=float, default=1.0,
+                        help="share of comments/reactions/first messages that notify")
+    parser.add_argument("--media-ratio", type=float, default=0.3, help="share of posts with images")
+    parser.add_argument("--deleted-ratio", type=float, default=0.01)
+    parser.add_argument("--user-skew", type=float, default=1.0, help="Zipf exponent of user activity")
+    parser.add_argument("--popularity-alpha", type=float, default=1.5, help="Pareto shape; lower = more skewed")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--end-date", type=datetime.fromisoformat,
+                        default=datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0),
+                        help="newest timestamp (default: today 00:00 UTC); pin it for identical reruns")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=20000)
+    parser.add_argument("--reset", action="store_true", help="delete all existing rows first")
+    args = parser.parse_args(argv)
+    if args.conversations is None:
+        args.conversations = args.users * 2
+    return args
+
+
+def seed(engine, args) -> dict:
+    """Write the dataset described by `args`; returns rows written per table."""
+    if args.reset:
+        with engine.begin() as conn:
+            for table in reversed(TABLES):
+                conn.execute(table.delete())
+    with engine.connect() as conn:
+        start_ids = {t.name: conn.execute(select(func.coalesce(func.max(t.c.id), 0))).scalar()
+                     for t in TABLES}
+
+    writer = BulkWriter(engine, args.batch_size)
+    gen = Generator(args, writer, start_ids)
+    gen.users()
+    gen.posts()
+    gen.messages()
+    writer.flush()
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            reset_sequences(conn)
+    return writer.counts
+
+
+def main():
+    args = parse_args()
+    app = create_app()
+    with app.app_context():
+        started = time.perf_counter()
+        counts = seed(db.engine, args)
+        elapsed = time.perf_counter() - started
+
+        total = sum(counts.values())
+        for name, count in counts.items():
+            print(f"  {name:<14} {count:>10,}")
+        print(f"  {'total':<14} {total:>10,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
 
-        # 3. Create Posts
-        print(f"📝 Creating {NUM_POSTS} posts...")
-        posts = []
-        for i in range(NUM_POSTS):
-            user = random.choice(users)
-            post = Post(
-                user_id=user.id,
-                title=f"Post Title {i} - {random_string(20)}",
-                content_md=f"This is the content for post {i}. {random_string(50)}.\n\nMore content here.",
-                content_html=f"<p>This is the content for post {i}. {random_string(50)}.</p><p>More content here.</p>",
-                category=random.choice(CATEGORIES),
-                created_at=random_date()
-            )
-            db.session.add(post)
-            posts.append(post)
-        
-        try:
-            db.session.commit()
-            # Fetch all posts (old + new)
-            posts = Post.query.all()
-            print(f"  ✓ Total posts in DB: {len(posts)}")
-        except Exception as e:
-            print(f"  ✗ Failed to create posts: {e}")
-
-        # 4. Create Comments & Reactions
-        print("💬 Generating interactions...")
-        
-        # Reactions on posts
-        reaction_count = 0
-        for post in posts:
-            # Random reactions
-            num_reactions = random.randint(0, 20)
-            reacting_users = random.sample(users, min(num_reactions, len(users)))
-            for user in reacting_users:
-                reaction = Reaction(
-                    post_id=post.id,
-                    user_id=user.id,
-                    type=random.choice(REACTION_TYPES)
-                )
-                db.session.add(reaction)
-                reaction_count += 1
-        
-        # Comments on posts
-        comment_count = 0
-        created_comments = []
-        for post in posts:
-            num_comments = random.randint(0, 10)
-            commenting_users = random.choices(users, k=num_comments)
-            for user in commenting_users:
-                comment = Comment(
-                    post_id=post.id,
-                    user_id=user.id,
-                    content=f"Comment on post {post.id} by {user.name}. {random_string(10)}",
-                    created_at=post.created_at + timedelta(minutes=random.randint(1, 100))
-                )
-                db.session.add(comment)
-                created_comments.append(comment)
-                comment_count += 1
-        
-        db.session.commit() # Commit comments first to get IDs
-        
-        # Reactions on comments
-        for comment in created_comments:
-             if random.random() < 0.3: # 30% chance
-                 user = random.choice(users)
-                 reaction = Reaction(
-                     comment_id=comment.id,
-                     user_id=user.id,
-                     type=random.choice(REACTION_TYPES)
-                 )
-                 db.session.add(reaction)
-                 reaction_count += 1
-
-        try:
-            db.session.commit()
-            print(f"  ✓ Added {reaction_count} reactions and {comment_count} comments")
-        except Exception as e:
-             print(f"  ✗ Failed to add interactions: {e}")
-
-        # 5. Create Chats
-        print("💬 Generating chats...")
-        message_count = 0
-        # Pick random pairs of users
-        for _ in range(50): # 50 conversation pairs
-            sender, recipient = random.sample(users, 2)
-            # Generate a conversation history
-            num_messages = random.randint(2, 10)
-            base_time = datetime.utcnow() - timedelta(days=random.randint(1, 10))
-            
-            for m in range(num_messages):
-                msg_time = base_time + timedelta(minutes=m*random.randint(5, 60))
-                # Alternate sender
-                current_sender = sender if m % 2 == 0 else recipient
-                current_recipient = recipient if m % 2 == 0 else sender
-                
-                msg = Message(
-                    sender_id=current_sender.id,
-                    recipient_id=current_recipient.id,
-                    content=f"Hey, this is message {m} in our convo. {random_string(10)}",
-                    created_at=msg_time,
-                    is_read=True if m < num_messages - 1 else False # Last message unread
-                )
-                db.session.add(msg)
-                message_count += 1
-        
-        try:
-            db.session.commit()
-            print(f"  ✓ Added {message_count} messages")
-        except Exception as e:
-            print(f"  ✗ Failed to add messages: {e}")
-
-        print("\n✅ Database seeded successfully!")
 
 if __name__ == "__main__":
-    seed()
+    main()
@@ -0,0 +1,91 @@
+"""
+Per-route SQL query and latency budgets.
+
+CASES is the parametrization of tests/test_query_budgets.py, which checks
+every case's status, query count and median latency (the budget times
+QUERY_BUDGET_LATENCY_FACTOR, 2 by default), and the table behind the
+report of benchmarks/query_budgets.py. Paths and bodies are formatted with
+the ids picked by `pick_ids` from a seed_large.py fixture. When a route
+changes, update its budget in the same commit.
+"""
+
+# (endpoint, method, path, max queries, max p50 ms, JSON body)
+# Paths are formatted with the ids picked by `pick_ids`.
+CASES = [
+    ("posts.list_posts", "GET", "/posts?limit=5", 4, 30, None),
+    ("posts.list_posts", "GET", "/posts?limit=20", 4, 40, None),
+    ("posts.list_posts", "GET", "/posts?limit=50&page=3", 4, 60, None),
+    ("posts.list_posts", "GET", "/posts?sort=popular", 4, 120, None),
+    ("posts.list_posts", "GET", "/posts?category=Events&search=campus", 4, 60, None),
+    ("posts.get_post", "GET", "/posts/{post}", 2, 15, None),
+    ("posts.create_post", "POST", "/posts", 3, 30, {"title": "Budget", "content_md": "**hello**"}),
+    ("posts.edit_post", "PATCH", "/posts/{my_post}", 3, 30, {"content_md": "edited"}),
+    ("comments.list_comments", "GET", "/comments/post/{post}", 1, 40, None),
+    ("comments.add_comment", "POST", "/comments/post/{post}", 8, 40, {"content": "budget"}),
+    ("comments.add_comment", "POST", "/comments/post/{post}", 10, 40, {"content": "reply", "parent_id": "{comment}"}),
+    ("comments.edit_comment", "PATCH", "/comments/{my_comment}", 2, 30, {"content": "edited"}),
+    ("reactions.add_reaction", "POST", "/reactions", 6, 40, {"post_id": "{post}", "type": "helpful"}),
+    ("reactions.get_post_reactions", "GET", "/reactions/post/{post}", 2, 15, None),
+    ("reactions.get_comment_reactions", "GET", "/reactions/comment/{comment}", 2, 15, None),
+    ("notifications.list_notifications", "GET", "/notifications", 1, 30, None),
+    ("notifications.get_unread_count", "GET", "/notifications/unread-count", 1, 10, None),
+    ("notifications.mark_as_read", "POST", "/notifications/{notification}/read", 2, 30, None),
+    ("notifications.mark_all_as_read", "POST", "/notifications/read-all", 2, 30, None),
+    ("messages.list_threads", "GET", "/messages/threads", 2, 40, None),
+    ("messages.get_conversation", "GET", "/messages/conversation/{peer}", 1, 20, None),
+    ("messages.send_message", "POST", "/messages", 7, 40, {"recipient_id": "{peer}", "content": "budget"}),
+    ("messages.mark_message_read", "POST", "/messages/{message}/read", 3, 30, None),
+    ("messages.get_unread_count", "GET", "/messages/unread-count", 1, 10, None),
+    ("users.get_my_profile", "GET", "/users/me", 2, 15, None),
+    ("users.update_profile", "PATCH", "/users/me", 2, 30, {"bio": "budget"}),
+    ("users.get_user_profile", "GET", "/users/{user}", 2, 15, None),
+    ("users.get_user_posts", "GET", "/users/{user}/posts", 3, 60, None),
+    ("users.get_user_comments", "GET", "/users/{user}/comments", 1, 30, None),
+    ("users.search_users", "GET", "/users?search=seed", 1, 30, None),
+    ("users.submit_feedback", "POST", "/users/feedback", 0, 10, {"content": "budget"}),
+    ("auth.me", "GET", "/auth/me", 0, 10, None),
+]
+
+
+def pick_ids(db):
+    """Ids the cases run against: the busiest post, user, thread, ..."""
+    from sqlalchemy import func
+
+    from app.models.comment import Comment
+    from app.models.message import Message
+    from app.models.notification import Notification
+    from app.models.post import Post
+
+    session = db.session
+    me = session.query(Post.user_id).group_by(Post.user_id).order_by(func.count().desc()).limit(1).scalar()
+    post = (session.query(Comment.post_id).join(Post, Post.id == Comment.post_id)
+            .filter(Post.is_deleted.is_(False))
+            .group_by(Comment.post_id).order_by(func.count().desc()).limit(1).scalar())
+    peer = (session.query(Message.sender_id).filter(Message.recipient_id == me)
+            .group_by(Message.sender_id).order_by(func.count().desc()).limit(1).scalar())
+    ids = {
+        "me": me,
+        "user": me,
+        "post": post,
+        "my_post": session.query(Post.id).filter_by(user_id=me, is_deleted=False).limit(1).scalar(),
+        "comment": (session.query(Comment.id).filter_by(post_id=post, is_deleted=False)
+                    .order_by(Comment.depth.desc()).limit(1).scalar()),
+        "my_comment": session.query(Comment.id).filter_by(user_id=me).limit(1).scalar(),
+        "peer": peer,
+        "notification": session.query(Notification.id).filter_by(user_id=me).limit(1).scalar(),
+        "message": session.query(Message.id).filter_by(recipient_id=me).limit(1).scalar(),
+    }
+    missing = [k for k, v in ids.items() if v is None]
+    if missing:
+        raise RuntimeError(f"Fixture too small, nothing to use for: {', '.join(missing)}")
+    return ids
+
+
+def fill(value, ids):
+    if isinstance(value, str):
+        if value.startswith("{") and value.endswith("}") and value[1:-1] in ids:
+            return ids[value[1:-1]]
+        return value.format(**ids)
+    if isinstance(value, dict):
+        return {k: fill(v, ids) for k, v in value.items()}
+    return value
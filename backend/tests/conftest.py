@@ -0,0 +1,53 @@
+import os
+import tempfile
+
+import pytest
+
+# Config reads the environment when app.config is imported, so this runs first
+_tmp = tempfile.mkdtemp(prefix="campusfeed-tests-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{os.path.join(_tmp, 'test.db')}",
+    "UPLOAD_FOLDER": os.path.join(_tmp, "uploads"),
+    "RATELIMIT_ENABLED": "false",
+    "RATELIMIT_STORAGE_URI": "memory://",
+    "METRICS_ENABLED": "false",
+    "ADMISSION_ENABLED": "false",
+    "IMAGE_PIPELINE": "inline",
+    "MEDIA_STORAGE": "local",
+})
+
+from app import create_app  # noqa: E402
+from app.extensions import db as _db  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def app():
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture
+def db(app):
+    yield _db
+    _db.session.rollback()
+    _db.session.remove()
+
+
+@pytest.fixture
+def user(db):
+    from app.models.user import User
+
+    user = User(email=f"tester{User.query.count() + 1}@nitrkl.ac.in", name="Test User", verified=True)
+    user.set_password("password")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def auth_client(client, user):
+    response = client.post("/auth/login", json={"email": user.email, "password": "password"})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return client
@@ -0,0 +1,96 @@
+import threading
+
+import pytest
+from flask import Flask
+
+from app.admission import Gate, init_admission
+
+
+@pytest.fixture
+def gated():
+    app = Flask(__name__)
+    app.config.update(
+        ADMISSION_LIMITS="read=1,write=4",
+        ADMISSION_QUEUE_MS="read=50",
+        ADMISSION_RETRY_AFTER=3,
+        ADMISSION_EXEMPT="healthz",
+    )
+    gates = init_admission(app)
+    entered, release = threading.Event(), threading.Event()
+
+    @app.get("/slow")
+    def slow():
+        entered.set()
+        release.wait(5)
+        return {"ok": True}
+
+    @app.get("/fast")
+    def fast():
+        return {"ok": True}
+
+    @app.get("/healthz")
+    def healthz():
+        return {"status": "ok"}
+
+    @app.post("/write")
+    def write():
+        return {"ok": True}
+
+    # One read holds the only read slot until `release` is set
+    holder = threading.Thread(target=lambda: app.test_client().get("/slow"))
+    holder.start()
+    assert entered.wait(5)
+    yield app.test_client(), gates
+    release.set()
+    holder.join()
+
+
+def test_full_class_sheds_with_503_and_retry_after(gated):
+    client, gates = gated
+    response = client.get("/fast")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "3"
+    assert "busy" in response.get_json()["error"]
+    assert gates["read"].in_flight == 1 and gates["read"].waiting == 0
+
+
+def test_other_classes_and_exempt_endpoints_still_pass(gated):
+    client, _ = gated
+    assert client.post("/write").status_code == 200
+    assert client.get("/healthz").status_code == 200
+
+
+def test_slot_is_released_after_the_request(gated):
+    client, gates = gated
+    assert client.post("/write").status_code == 200
+    assert gates["write"].in_flight == 0
+
+
+def test_queued_request_is_admitted_when_a_slot_frees():
+    gate = Gate("read", 1, slo=1.0, queue_timeout=2.0)
+    assert gate.acquire() == (True, 0.0)
+    threading.Timer(0.05, gate.release, args=(0.01,)).start()
+    admitted, waited = gate.acquire()
+    assert admitted and 0 < waited < 2
+
+
+def test_full_queue_is_rejected_without_waiting():
+    gate = Gate("upload", 1, slo=1.0, queue_timeout=5.0)
+    gate.acquire()
+    gate.waiting = 1  # as many queued as the limit
+    assert gate.acquire() == (False, 0.0)
+
+
+def test_limit_shrinks_over_slo_and_recovers():
+    gate = Gate("read", 8, slo=0.5, queue_timeout=0.1)
+    gate.acquire()
+    gate.release(2.0)
+    assert gate.limit == 6
+    # At most one decrease per SLO period
+    gate.acquire()
+    gate.release(2.0)
+    assert gate.limit == 6
+    for _ in range(50):
+        gate.acquire()
+        gate.release(0.01)
+    assert gate.limit == 8
@@ -0,0 +1,158 @@
+import gzip
+import json
+import zlib
+
+import pytest
+from flask import Flask, Response, jsonify
+from werkzeug.datastructures import Accept
+from werkzeug.http import parse_accept_header
+
+from app import compression
+from app.compression import available_encodings, choose_encoding, init_compression
+
+needs_brotli = pytest.mark.skipif(compression.brotli is None, reason="brotli is not installed")
+
+BIG = {"items": [{"id": i, "title": f"post {i}"} for i in range(200)]}
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.config.update(
+        COMPRESSION_ALGORITHMS="br,gzip",
+        COMPRESSION_MIN_SIZE=1024,
+        COMPRESSION_MIMETYPES="application/json,text/plain",
+    )
+    init_compression(app)
+
+    @app.get("/big")
+    def big():
+        return jsonify(BIG)
+
+    @app.get("/small")
+    def small():
+        return jsonify({"ok": True})
+
+    @app.get("/etag")
+    def etag():
+        response = jsonify(BIG)
+        response.set_etag("v1")
+        return response
+
+    @app.get("/partial")
+    def partial():
+        return Response(json.dumps(BIG), status=206, mimetype="application/json")
+
+    @app.get("/no-transform")
+    def no_transform():
+        response = jsonify(BIG)
+        response.headers["Cache-Control"] = "no-transform"
+        return response
+
+    @app.get("/accel")
+    def accel():
+        response = jsonify(BIG)
+        response.headers["X-Accel-Redirect"] = "/_uploads/x.json"
+        return response
+
+    @app.get("/image")
+    def image():
+        return Response(b"\xff\xd8\xff" * 1000, mimetype="image/jpeg")
+
+    @app.get("/stream")
+    def stream():
+        return Response((f"line {i}\n" * 50 for i in range(20)), mimetype="text/plain")
+
+    return app.test_client()
+
+
+def fetch(client, path, accept):
+    headers = {"Accept-Encoding": accept} if accept is not None else {}
+    return client.get(path, headers=headers)
+
+
+def decode(response):
+    data = response.get_data()
+    encoding = response.headers.get("Content-Encoding")
+    if encoding == "gzip":
+        return gzip.decompress(data)
+    if encoding == "br":
+        return compression.brotli.decompress(data)
+    return data
+
+
+@pytest.mark.parametrize("accept, expected", [
+    ("gzip", "gzip"),
+    ("gzip, deflate, br", "br"),
+    ("br;q=0.5, gzip", "gzip"),
+    ("gzip;q=0, br;q=0", None),
+    ("identity", None),
+    ("*", "br"),
+])
+def test_choose_encoding_honours_q_values(accept, expected):
+    if compression.brotli is None and expected == "br":
+        pytest.skip("brotli is not installed")
+    assert choose_encoding(parse_accept_header(accept, Accept), ["br", "gzip"]) == expected
+
+
+def test_available_encodings_keeps_configured_order():
+    assert available_encodings({"COMPRESSION_ALGORITHMS": "gzip, br"})[0] == "gzip"
+    assert available_encodings({"COMPRESSION_ALGORITHMS": "zstd,gzip"}) == ["gzip"]
+
+
+def test_gzip_response(client):
+    response = fetch(client, "/big", "gzip")
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.vary
+    assert int(response.headers["Content-Length"]) == len(response.get_data())
+    assert json.loads(decode(response)) == BIG
+
+
+@needs_brotli
+def test_brotli_preferred_when_accepted(client):
+    response = fetch(client, "/big", "gzip, br")
+    assert response.headers["Content-Encoding"] == "br"
+    assert json.loads(decode(response)) == BIG
+
+
+def test_identity_without_accept_encoding_still_varies(client):
+    response = fetch(client, "/big", None)
+    assert "Content-Encoding" not in response.headers
+    assert "Accept-Encoding" in response.vary
+    assert response.get_json() == BIG
+
+
+def test_small_bodies_are_not_compressed(client):
+    response = fetch(client, "/small", "gzip")
+    assert "Content-Encoding" not in response.headers
+    assert response.get_json() == {"ok": True}
+
+
+def test_strong_etag_becomes_weak(client):
+    response = fetch(client, "/etag", "gzip")
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["ETag"] == 'W/"v1"'
+    assert fetch(client, "/etag", None).headers["ETag"] == '"v1"'
+
+
+@pytest.mark.parametrize("path", ["/partial", "/no-transform", "/accel", "/image"])
+def test_excluded_responses_are_left_alone(client, path):
+    response = fetch(client, path, "gzip, br")
+    assert "Content-Encoding" not in response.headers
+
+
+def test_streamed_body_is_compressed_per_chunk(client):
+    response = fetch(client, "/stream", "gzip")
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in response.headers
+    assert decode(response) == b"".join(f"line {i}\n".encode() * 50 for i in range(20))
+
+
+def test_streamed_chunks_are_flushed_as_they_come():
+    chunks = [b"a" * 2000, b"b" * 2000]
+    out = list(compression._stream(iter(chunks), compression.GzipCompressor(6), "gzip"))
+    # One piece per input chunk plus the trailer; each is decodable so far
+    assert len(out) == 3
+    assert gzip.decompress(b"".join(out)) == b"".join(chunks)
+    # The first piece alone already decodes to the first chunk
+    assert zlib.decompressobj(31).decompress(out[0]) == chunks[0]
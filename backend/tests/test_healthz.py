@@ -0,0 +1,34 @@
+import pytest
+
+
+@pytest.fixture
+def admin_client(db, user, auth_client):
+    user.role = "admin"
+    db.session.commit()
+    return auth_client
+
+
+@pytest.mark.parametrize("limit", ["abc", "1.5", ""])
+def test_slow_queries_rejects_bad_limit(admin_client, limit):
+    response = admin_client.get(f"/healthz/slow-queries?limit={limit}")
+    assert response.status_code == 400
+    assert "limit" in response.get_json()["error"]
+
+
+@pytest.mark.parametrize("limit, expected", [("0", 1), ("-5", 1), ("7", 7), ("1000", 100), (None, 20)])
+def test_slow_queries_clamps_limit(app, admin_client, monkeypatch, limit, expected):
+    seen = []
+
+    class SlowLog:
+        def top(self, limit, sort):
+            seen.append(limit)
+            return []
+
+    monkeypatch.setitem(app.extensions, "slow_queries", SlowLog())
+    query = "" if limit is None else f"?limit={limit}"
+    assert admin_client.get(f"/healthz/slow-queries{query}").status_code == 200
+    assert seen == [expected]
+
+
+def test_slow_queries_is_admin_only(auth_client):
+    assert auth_client.get("/healthz/slow-queries").status_code == 403
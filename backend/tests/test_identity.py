@@ -0,0 +1,48 @@
+import dataclasses
+import time
+
+from sqlalchemy import text
+
+from app.identity import UserSnapshot, identity_cache
+
+
+def test_snapshot_is_cached(db, user):
+    identity_cache.invalidate(user.id)
+    first = identity_cache.get(user.id)
+    assert isinstance(first, UserSnapshot) and first.name == "Test User"
+
+    # Plain SQL skips the mapper events, like a write from another worker
+    db.session.execute(text("UPDATE users SET name = 'Renamed' WHERE id = :id"), {"id": user.id})
+    db.session.commit()
+    assert identity_cache.get(user.id) is first
+
+
+def test_orm_update_invalidates_after_commit(db, user):
+    identity_cache.get(user.id)
+    user.name = "New Name"
+    db.session.commit()
+    assert identity_cache.get(user.id).name == "New Name"
+
+
+def test_snapshot_recached_before_commit_is_dropped(db, user):
+    identity_cache.get(user.id)
+    user.bio = "updated"
+    db.session.flush()
+    # Another request caches the old row between flush and commit
+    stale = dataclasses.replace(UserSnapshot.from_user(user), bio=None)
+    identity_cache._entries[user.id] = (time.monotonic() + 60, stale)
+    db.session.commit()
+    assert identity_cache.get(user.id).bio == "updated"
+
+
+def test_deleted_user_is_dropped(db, user):
+    identity_cache.get(user.id)
+    db.session.delete(user)
+    db.session.commit()
+    assert identity_cache.get(user.id) is None
+
+
+def test_current_user_sees_profile_update(auth_client):
+    assert auth_client.get("/auth/me").get_json()["user"]["bio"] in (None, "")
+    assert auth_client.patch("/users/me", json={"bio": "hello"}).status_code == 200
+    assert auth_client.get("/auth/me").get_json()["user"]["bio"] == "hello"
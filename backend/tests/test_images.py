@@ -0,0 +1,142 @@
+import hashlib
+import io
+import os
+
+from PIL import Image
+
+from app.images import strip_metadata
+
+GPS_IFD = 0x8825
+MAKE = 0x010F
+ORIENTATION = 0x0112
+
+
+def camera_exif(orientation=None):
+    exif = Image.Exif()
+    exif[MAKE] = "Phone Maker"
+    exif[0x0132] = "2026:01:01 08:30:00"
+    exif.get_ifd(GPS_IFD).update({1: "N", 2: (20.0, 15.0, 30.0), 3: "E", 4: (85.0, 50.0, 10.0)})
+    if orientation:
+        exif[ORIENTATION] = orientation
+    return exif
+
+
+def write_image(tmp_path, fmt, name, **save_args):
+    im = Image.new("RGB", (40, 24))
+    for x in range(40):
+        for y in range(24):
+            im.putpixel((x, y), (x * 6, y * 10, (x * y) % 255))
+    path = os.path.join(tmp_path, name)
+    im.save(path, fmt, **save_args)
+    return path
+
+
+def pixels(path):
+    with Image.open(path) as im:
+        return im.convert("RGB").tobytes()
+
+
+def metadata(path):
+    with Image.open(path) as im:
+        exif = im.getexif()
+        return dict(exif), dict(exif.get_ifd(GPS_IFD)), dict(im.info)
+
+
+def test_jpeg_loses_exif_but_keeps_pixels(tmp_path):
+    path = write_image(tmp_path, "JPEG", "a.jpg", exif=camera_exif(), comment=b"shot at home")
+    assert metadata(path)[1]
+    before = pixels(path)
+    sha256, size = strip_metadata(path, "image/jpeg")
+
+    data = open(path, "rb").read()
+    assert sha256 == hashlib.sha256(data).hexdigest() and size == len(data)
+    assert b"Phone Maker" not in data and b"shot at home" not in data
+    exif, gps, _ = metadata(path)
+    assert exif == {} and gps == {}
+    assert pixels(path) == before
+    # Already clean: nothing to do, so equal uploads keep one content address
+    assert strip_metadata(path, "image/jpeg") is None
+
+
+def test_jpeg_keeps_only_orientation(tmp_path):
+    path = write_image(tmp_path, "JPEG", "rotated.jpg", exif=camera_exif(orientation=6))
+    strip_metadata(path, "image/jpeg")
+    exif, gps, _ = metadata(path)
+    assert exif == {ORIENTATION: 6}
+    assert gps == {}
+    with Image.open(path) as im:
+        assert im.size == (40, 24)
+
+
+def test_jpeg_drops_data_after_end_of_image(tmp_path):
+    path = write_image(tmp_path, "JPEG", "mpf.jpg")
+    preview = io.BytesIO()
+    Image.new("RGB", (8, 8)).save(preview, "JPEG", exif=camera_exif())
+    with open(path, "ab") as f:
+        f.write(preview.getvalue())
+    strip_metadata(path, "image/jpeg")
+    assert b"Phone Maker" not in open(path, "rb").read()
+
+
+def test_progressive_jpeg(tmp_path):
+    path = write_image(tmp_path, "JPEG", "p.jpg", exif=camera_exif(), progressive=True)
+    before = pixels(path)
+    strip_metadata(path, "image/jpeg")
+    assert metadata(path)[0] == {}
+    assert pixels(path) == before
+
+
+def test_png_loses_text_and_exif(tmp_path):
+    from PIL.PngImagePlugin import PngInfo
+
+    info = PngInfo()
+    info.add_text("Location", "Hostel 4, room 12")
+    path = write_image(tmp_path, "PNG", "a.png", pnginfo=info, exif=camera_exif())
+    assert metadata(path)[1] and "Location" in metadata(path)[2]
+    before = pixels(path)
+    strip_metadata(path, "image/png")
+    exif, gps, info = metadata(path)
+    assert exif == {} and gps == {} and "Location" not in info
+    assert pixels(path) == before
+
+
+def test_webp_loses_exif_and_xmp(tmp_path):
+    path = write_image(tmp_path, "WEBP", "a.webp", exif=camera_exif(), xmp=b"<x:xmpmeta>gps</x:xmpmeta>",
+                       lossless=True)
+    assert b"Phone Maker" in open(path, "rb").read() and b"xmpmeta" in open(path, "rb").read()
+    before = pixels(path)
+    strip_metadata(path, "image/webp")
+    data = open(path, "rb").read()
+    assert b"Phone Maker" not in data and b"xmpmeta" not in data
+    assert metadata(path)[0] == {}
+    assert pixels(path) == before
+
+
+def test_unparseable_image_raises(tmp_path):
+    path = os.path.join(tmp_path, "bad.jpg")
+    with open(path, "wb") as f:
+        f.write(b"\xff\xd8\xff\xe0garbage")
+    try:
+        strip_metadata(path, "image/jpeg")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("expected ValueError")
+
+
+def test_upload_stores_stripped_original(app, auth_client, tmp_path):
+    post_id = auth_client.post("/posts", json={"title": "Photos"}).get_json()["id"]
+    path = write_image(tmp_path, "JPEG", "upload.jpg", exif=camera_exif(orientation=3))
+    with open(path, "rb") as f:
+        response = auth_client.post(f"/media/upload?post_id={post_id}",
+                                    data={"file": (f, "upload.jpg")}, content_type="multipart/form-data")
+    assert response.status_code == 201, response.get_data(as_text=True)
+    body = response.get_json()
+
+    stored = auth_client.get(body["url"])
+    data = stored.get_data()
+    stored.close()
+    assert hashlib.sha256(data).hexdigest() == body["sha256"]
+    assert b"Phone Maker" not in data
+    with Image.open(io.BytesIO(data)) as im:
+        assert dict(im.getexif()) == {ORIENTATION: 3}
@@ -0,0 +1,143 @@
+import io
+import os
+
+import pytest
+
+from app.models.post import Media
+from app.storage import get_storage
+from app.uploads import TEMP_PREFIX
+
+
+def pdf(size=2048, seed=b""):
+    body = b"%PDF-1.4\n" + seed
+    return body + b"x" * (size - len(body))
+
+
+def files(*parts):
+    return [(io.BytesIO(data), name) for name, data in parts]
+
+
+@pytest.fixture
+def post_id(auth_client):
+    return auth_client.post("/posts", json={"title": "Uploads"}).get_json()["id"]
+
+
+@pytest.fixture
+def upload_folder(app):
+    return app.config["UPLOAD_FOLDER"]
+
+
+def temp_files(folder):
+    return [name for name in os.listdir(folder) if name.startswith(TEMP_PREFIX) or name.endswith(".src")]
+
+
+def upload(client, post_id, data, name="doc.pdf"):
+    return client.post(f"/media/upload?post_id={post_id}", data={"file": (io.BytesIO(data), name)},
+                       content_type="multipart/form-data")
+
+
+def upload_batch(client, post_id, *parts):
+    return client.post(f"/media/upload/batch?post_id={post_id}", data={"files": files(*parts)},
+                       content_type="multipart/form-data")
+
+
+def media_count(db, post_id):
+    db.session.expire_all()
+    return Media.query.filter_by(post_id=post_id).count()
+
+
+def test_upload_stores_blob(db, auth_client, post_id, upload_folder):
+    response = upload(auth_client, post_id, pdf(seed=b"single"))
+    assert response.status_code == 201
+    body = response.get_json()
+    assert body["type"] == "document"
+    assert get_storage().exists(body["url"].rsplit("/", 1)[1])
+    assert media_count(db, post_id) == 1
+    assert temp_files(upload_folder) == []
+
+
+def test_upload_over_size_limit(app, db, auth_client, post_id, upload_folder, monkeypatch):
+    monkeypatch.setitem(app.config, "MAX_UPLOAD_BYTES", 1024)
+    response = upload(auth_client, post_id, pdf(4096))
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "File too large"
+    assert media_count(db, post_id) == 0
+    assert temp_files(upload_folder) == []
+
+
+def test_upload_rejects_unsniffable_type(db, auth_client, post_id, upload_folder):
+    # The extension and part Content-Type are ignored; the bytes decide
+    response = upload(auth_client, post_id, b"MZ\x90\x00" + b"\x00" * 2000, name="photo.jpg")
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Unsupported file type"
+    assert media_count(db, post_id) == 0
+    assert temp_files(upload_folder) == []
+
+
+def test_upload_storage_failure_removes_row(db, auth_client, post_id, upload_folder, monkeypatch):
+    storage = get_storage()
+
+    def fail(key, path, content_type):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(storage, "put_file", fail)
+    with pytest.raises(OSError):
+        upload(auth_client, post_id, pdf(seed=b"disk full"))
+    assert media_count(db, post_id) == 0
+    assert temp_files(upload_folder) == []
+
+
+def test_batch_partial_failure_is_207(db, auth_client, post_id, upload_folder, monkeypatch):
+    monkeypatch.setitem(auth_client.application.config, "MAX_UPLOAD_BYTES", 4096)
+    response = upload_batch(auth_client, post_id,
+                            ("a.pdf", pdf(seed=b"a")),
+                            ("big.pdf", pdf(8192)),
+                            ("bad.bin", b"\x00" * 100),
+                            ("b.pdf", pdf(seed=b"b")))
+    assert response.status_code == 207
+    results = response.get_json()["results"]
+    assert [r["filename"] for r in results] == ["a.pdf", "big.pdf", "bad.bin", "b.pdf"]
+    assert [r["ok"] for r in results] == [True, False, False, True]
+    assert results[1]["error"] == "File too large"
+    assert results[2]["error"] == "Unsupported file type"
+    assert media_count(db, post_id) == 2
+    assert temp_files(upload_folder) == []
+
+
+def test_batch_too_many_files(app, db, auth_client, post_id, upload_folder, monkeypatch):
+    monkeypatch.setitem(app.config, "MAX_BATCH_FILES", 2)
+    response = upload_batch(auth_client, post_id, *[(f"{i}.pdf", pdf(seed=b"%d" % i)) for i in range(4)])
+    assert response.status_code == 207
+    results = response.get_json()["results"]
+    assert [r["ok"] for r in results] == [True, True, False, False]
+    assert results[3]["error"] == "Too many files (max 2)"
+    assert media_count(db, post_id) == 2
+    assert temp_files(upload_folder) == []
+
+
+def test_batch_all_invalid_is_400(db, auth_client, post_id, upload_folder):
+    response = upload_batch(auth_client, post_id, ("a.bin", b"\x00" * 64), ("b.bin", b"\x01" * 64))
+    assert response.status_code == 400
+    assert media_count(db, post_id) == 0
+    assert temp_files(upload_folder) == []
+
+
+def test_batch_storage_failure_reports_the_file(db, auth_client, post_id, upload_folder, monkeypatch):
+    storage = get_storage()
+    put_file = storage.put_file
+    failing = pdf(seed=b"unlucky")
+
+    def flaky(key, path, content_type):
+        with open(path, "rb") as f:
+            if f.read() == failing:
+                raise OSError("disk full")
+        put_file(key, path, content_type)
+
+    monkeypatch.setattr(storage, "put_file", flaky)
+    response = upload_batch(auth_client, post_id, ("ok.pdf", pdf(seed=b"lucky")), ("fail.pdf", failing))
+    assert response.status_code == 207
+    results = response.get_json()["results"]
+    assert [r["ok"] for r in results] == [True, False]
+    assert results[1]["error"] == "Could not store file"
+    assert [m.url for m in Media.query.filter_by(post_id=post_id)] == [results[0]["url"]]
+    assert temp_files(upload_folder) == []
@@ -0,0 +1,109 @@
+import os
+import threading
+import time
+import uuid
+
+from app.media_store import _blob_keys, collect_garbage, lock_blobs, release
+from app.models.post import Media, Post
+from app.storage import get_storage
+
+
+def put_blob(storage, tmp_path, key, age=0):
+    path = os.path.join(tmp_path, uuid.uuid4().hex)
+    with open(path, "wb") as f:
+        f.write(key.encode())
+    storage.put_file(key, path, "image/jpeg")
+    local = storage.local_path(key)
+    if age:
+        past = time.time() - age
+        os.utime(local, (past, past))
+    return storage.url(key)
+
+
+def blob_with_derivatives(storage, tmp_path, age=0):
+    key = f"{uuid.uuid4().hex}.jpg"
+    for k in _blob_keys(key):
+        put_blob(storage, tmp_path, k, age)
+    return key, storage.url(key)
+
+
+def add_media(db, user, url):
+    post = Post(user_id=user.id, title="Blob", content_md="", content_html="")
+    db.session.add(post)
+    db.session.flush()
+    db.session.add(Media(post_id=post.id, type="image", url=url, mime="image/jpeg"))
+    db.session.commit()
+    return post
+
+
+def test_release_deletes_unreferenced_blob_and_derivatives(db, user, tmp_path):
+    storage = get_storage()
+    key, url = blob_with_derivatives(storage, tmp_path)
+    assert release([url], storage) == len(_blob_keys(key))
+    assert not any(storage.exists(k) for k in _blob_keys(key))
+
+
+def test_release_keeps_blob_with_another_media_row(db, user, tmp_path):
+    storage = get_storage()
+    key, url = blob_with_derivatives(storage, tmp_path)
+    add_media(db, user, url)
+    assert release([url], storage) == 0
+    assert all(storage.exists(k) for k in _blob_keys(key))
+
+
+def test_profile_picture_keeps_post_image(db, user, auth_client, tmp_path):
+    storage = get_storage()
+    key, url = blob_with_derivatives(storage, tmp_path)
+    post = add_media(db, user, url)
+    assert auth_client.patch("/users/me", json={"profile_pic": url}).status_code == 200
+
+    assert auth_client.delete(f"/posts/{post.id}").status_code == 200
+    assert storage.exists(key)
+    assert collect_garbage(storage, str(tmp_path), grace_seconds=0)["blobs"] == 0
+    assert storage.exists(key)
+
+
+def test_profile_picture_of_a_derivative_keeps_the_family(db, user, tmp_path):
+    storage = get_storage()
+    key, url = blob_with_derivatives(storage, tmp_path)
+    user.profile_pic = storage.url(_blob_keys(key)[1])
+    db.session.commit()
+    assert release([url], storage) == 0
+    assert collect_garbage(storage, str(tmp_path), grace_seconds=0)["blobs"] == 0
+    assert all(storage.exists(k) for k in _blob_keys(key))
+
+
+def test_collect_garbage_respects_grace_period(db, user, tmp_path):
+    storage = get_storage()
+    old_key, _ = blob_with_derivatives(storage, tmp_path, age=7200)
+    new_key, _ = blob_with_derivatives(storage, tmp_path)
+    collect_garbage(storage, str(tmp_path), grace_seconds=3600)
+    assert not storage.exists(old_key)
+    assert storage.exists(new_key)
+
+
+def test_lock_blocks_a_concurrent_reference(app, db, user, tmp_path):
+    storage = get_storage()
+    key, url = blob_with_derivatives(storage, tmp_path)
+    post = add_media(db, user, f"/uploads/{uuid.uuid4().hex}.jpg")
+    committed = threading.Event()
+
+    def upload():
+        with app.app_context():
+            db.session.add(Media(post_id=post.id, type="image", url=url, mime="image/jpeg"))
+            lock_blobs([key])
+            db.session.commit()
+            committed.set()
+            db.session.remove()
+
+    assert lock_blobs([key])
+    thread = threading.Thread(target=upload)
+    thread.start()
+    # The upload cannot commit its row while release holds the lock...
+    assert not committed.wait(0.5)
+    db.session.rollback()
+    # ...and once it has, release sees the reference
+    assert committed.wait(5)
+    thread.join()
+    assert release([url], storage) == 0
+    assert storage.exists(key)
@@ -0,0 +1,83 @@
+import contextlib
+import os
+import statistics
+import time
+
+import pytest
+
+import seed_large
+from app import create_app
+from app.config import Config
+from app.extensions import db
+
+from budget_cases import CASES, fill, pick_ids
+
+# Latency budgets in CASES are multiplied by this; 0 skips the latency check
+LATENCY_FACTOR = float(os.getenv("QUERY_BUDGET_LATENCY_FACTOR", "2"))
+# Timed calls per case, after one warmup call
+REPEAT = 5
+
+# Seeded twice: the second fixture grows the database 4x
+FIXTURES = [
+    ["--users", "200", "--posts", "1000", "--seed", "1"],
+    ["--users", "600", "--posts", "3000", "--seed", "2"],
+]
+
+
+def run_cases(app, ids):
+    """(path, max queries, status, p50 ms) per case."""
+    client = app.test_client()
+    response = client.post("/auth/login", json={"email": f"seed{ids['me']}@nitrkl.ac.in", "password": "password"})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    results = []
+    # Routes that print (feedback) would drown the report
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for _, method, path, _, _, body in CASES:
+            path, body = fill(path, ids), fill(body, ids)
+            client.open(path, method=method, json=body)
+            queries, times = [], []
+            for _ in range(REPEAT):
+                start = time.perf_counter()
+                response = client.open(path, method=method, json=body)
+                times.append(time.perf_counter() - start)
+                queries.append(int(response.headers.get("X-Query-Count", -1)))
+            results.append((path, max(queries), response.status_code, statistics.median(times) * 1000))
+    return results
+
+
+@pytest.fixture(scope="module")
+def budget_runs(tmp_path_factory):
+    """Every case run against a small fixture DB and again after growing it."""
+    path = tmp_path_factory.mktemp("budgets") / "budgets.db"
+    with pytest.MonkeyPatch.context() as mp:
+        # Its own database, so the seeded rows stay out of the other tests
+        mp.setattr(Config, "SQLALCHEMY_DATABASE_URI", f"sqlite:///{path}")
+        mp.setattr(Config, "QUERY_PROFILER_HEADERS", "true")
+        app = create_app()
+    runs = []
+    with app.app_context():
+        for fixture in FIXTURES:
+            seed_large.seed(db.engine, seed_large.parse_args(fixture + ["--end-date", "2026-01-01"]))
+            db.session.remove()
+            ids = pick_ids(db)
+            db.session.remove()
+            runs.append(run_cases(app, ids))
+        db.session.remove()
+        db.engine.dispose()
+    return list(zip(*runs))
+
+
+@pytest.mark.parametrize("index, case", list(enumerate(CASES)),
+                         ids=[f"{c[1]} {c[2]}" for c in CASES])
+def test_query_budget(budget_runs, index, case):
+    endpoint, method, _, max_queries, max_ms, _ = case
+    small, large = budget_runs[index]
+    path, queries, status, ms = large
+    assert status < 400, f"{endpoint}: {method} {path} returned {status}"
+    assert 0 <= queries <= max_queries, f"{endpoint}: {queries} queries, budget {max_queries}"
+    if method == "GET":
+        # A per-row lazy load or a query per card shows up as growth
+        assert queries == small[1], f"{endpoint}: queries grow with data ({small[1]} -> {queries})"
+    if LATENCY_FACTOR:
+        budget_ms = max_ms * LATENCY_FACTOR
+        assert ms <= budget_ms, f"{endpoint}: p50 {ms:.1f} ms, budget {budget_ms:.0f} ms"
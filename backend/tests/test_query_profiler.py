@@ -0,0 +1,16 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+
+def test_failed_statement_drops_its_start_time(db):
+    conn = db.session.connection()
+    for _ in range(3):
+        with pytest.raises(OperationalError):
+            with conn.begin_nested():
+                conn.execute(text("SELECT * FROM no_such_table"))
+    assert conn.info.get("_query_start", []) == []
+
+    conn.execute(text("SELECT 1"))
+    assert conn.info["_query_start"] == []
+
@@ -0,0 +1,36 @@
+from app.rate_limits import SQLiteStorage
+
+
+def count_events(storage):
+    return storage._conn().execute("SELECT count(*) FROM events").fetchone()[0]
+
+
+def test_prune_removes_expired_entries_of_idle_keys(tmp_path, monkeypatch):
+    storage = SQLiteStorage(f"sqlite:///{tmp_path}/limits.db", max_window=60)
+    monkeypatch.setattr(SQLiteStorage, "PRUNE_EVERY", 10)
+    clock = [1000.0]
+    monkeypatch.setattr("app.rate_limits.time.time", lambda: clock[0])
+
+    for i in range(10):
+        assert storage.acquire_entry(f"ip:{i}", 5, 60)
+    assert count_events(storage) == 10
+
+    # None of these keys is checked again, but the 11th check prunes them all
+    clock[0] += 61
+    assert storage.acquire_entry("ip:other", 5, 60)
+    assert count_events(storage) == 1
+
+
+def test_prune_keeps_entries_inside_the_longest_window(tmp_path, monkeypatch):
+    storage = SQLiteStorage(f"sqlite:///{tmp_path}/limits.db", max_window=60)
+    clock = [1000.0]
+    monkeypatch.setattr("app.rate_limits.time.time", lambda: clock[0])
+
+    assert storage.acquire_entry("user:1", 60, 3600)
+    assert storage.acquire_entry("user:2", 10, 60)
+    # The hour-long window seen for user:1 protects every key
+    clock[0] += 120
+    assert storage.prune_events() == 0
+    assert storage.get_moving_window("user:1", 60, 3600)[1] == 1
+    clock[0] += 3600
+    assert storage.prune_events() == 2
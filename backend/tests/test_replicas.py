@@ -0,0 +1,97 @@
+import shutil
+import time
+
+import pytest
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.models.user import User
+from app.replicas import STICKY_KEY, primary, use_primary
+
+
+@pytest.fixture(scope="module")
+def replica_app(tmp_path_factory):
+    """An app whose replica is a copy of the primary taken before any users."""
+    folder = tmp_path_factory.mktemp("replicas")
+    primary_path, replica_path = folder / "primary.db", folder / "replica.db"
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(Config, "SQLALCHEMY_DATABASE_URI", f"sqlite:///{primary_path}")
+        mp.setattr(Config, "DATABASE_REPLICA_URLS", f"sqlite:///{replica_path}")
+        mp.setattr(Config, "REPLICA_HEALTH_INTERVAL", 3600)
+        app = create_app()
+    app.config["TESTING"] = True
+    with app.app_context():
+        db.engine.dispose()
+        shutil.copyfile(primary_path, replica_path)
+        db.session.add(User(email="primary.only@nitrkl.ac.in", name="Primary Only", password_hash="x"))
+        db.session.commit()
+        db.session.remove()
+
+    def count():
+        return {"users": User.query.count()}
+
+    @use_primary
+    def count_primary():
+        return count()
+
+    def count_in_block():
+        with primary():
+            return count()
+
+    def write():
+        db.session.add(User(email=f"writer{time.time_ns()}@nitrkl.ac.in", name="Writer", password_hash="x"))
+        db.session.commit()
+        return count()
+
+    app.add_url_rule("/_test/count", view_func=count)
+    app.add_url_rule("/_test/count-primary", view_func=count_primary)
+    app.add_url_rule("/_test/count-in-block", view_func=count_in_block)
+    app.add_url_rule("/_test/write", view_func=write, methods=["POST"])
+
+    replicas = app.extensions["db_replicas"]
+    replicas.check()
+    assert all(replicas.healthy.values())
+    return app
+
+
+def users(client, path="/_test/count"):
+    return client.get(path).get_json()["users"]
+
+
+def test_get_reads_from_the_replica(replica_app):
+    client = replica_app.test_client()
+    assert users(client) == 0
+
+
+def test_use_primary_and_primary_block(replica_app):
+    client = replica_app.test_client()
+    assert users(client, "/_test/count-primary") == 1
+    assert users(client, "/_test/count-in-block") == 1
+
+
+def test_writes_stick_the_client_to_the_primary(replica_app, monkeypatch):
+    client = replica_app.test_client()
+    written = client.post("/_test/write").get_json()["users"]
+    assert written >= 2
+    # Read-your-writes: the next GET sees the new row
+    assert users(client) == written
+    with client.session_transaction() as session:
+        assert session[STICKY_KEY] > time.time()
+
+    # Another client, and this one once the window has passed, read the replica
+    assert users(replica_app.test_client()) == 0
+    later = time.time() + replica_app.config["REPLICA_STICKY_SECONDS"] + 1
+    monkeypatch.setattr("app.replicas.time.time", lambda: later)
+    assert users(client) == 0
+
+
+def test_unhealthy_replica_falls_back_to_primary(replica_app):
+    replicas = replica_app.extensions["db_replicas"]
+    client = replica_app.test_client()
+    replicas.healthy = {engine: False for engine in replicas.engines}
+    try:
+        assert users(client) >= 1
+    finally:
+        replicas.check()
+    assert users(client) == 0
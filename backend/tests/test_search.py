@@ -0,0 +1,120 @@
+import threading
+
+from sqlalchemy import text
+
+from app.models.user import User
+from app.search import UserSearchIndex, user_index
+
+
+def make_index(*users):
+    index = UserSearchIndex()
+    for user_id, name in enumerate(users, start=1):
+        index.add(user_id, name, f"{name.split()[0].lower()}{user_id}@nitrkl.ac.in")
+    return index
+
+
+def test_prefix_ranks_shorter_tokens_first():
+    # Lexicographically "anastasia" and "andrea" come before "anu"
+    index = make_index("Anastasia Rao", "Andrea Iyer", "Anastasia Pillai", "Anu Das", "Ankit Shah")
+    assert index.search("an", limit=2) == [4, 5]
+
+
+def test_prefix_exact_token_beats_longer_prefix_match():
+    index = make_index("Ankita Roy", "Ankit Shah")
+    assert index.search("ankit") == [2, 1]
+
+
+def test_prefix_keeps_ties_at_the_cutoff():
+    index = make_index("Anu Das", "Ana Paul", "Ani Sen", "Anastasia Rao")
+    assert index.search("an", limit=1) == [1]
+    assert sorted(index.search("an", limit=3)) == [1, 2, 3]
+
+
+def test_trigram_fallback_tolerates_typos():
+    index = make_index("Priyanka Mohanty", "Sanskruti Das", "Rahul Verma")
+    assert index.search("priyanak") == [1]
+    assert index.search("sanskriti") == [2]
+    assert index.search("zzzzzz") == []
+
+
+def test_prefix_matches_rank_above_fuzzy_matches():
+    index = make_index("Rahul Verma", "Rahel Singh")
+    assert index.search("rahul") == [1, 2]
+
+
+def test_multi_term_intersects_all_candidates():
+    # 80 users share the first term; the one matching both sorts last
+    names = [f"Amit Kumar{i}" for i in range(80)] + ["Amit Zaveri"]
+    index = make_index(*names)
+    assert index.search("amit zav", limit=1) == [81]
+    assert index.search("zav amit", limit=1) == [81]
+    assert index.search("amit nobody") == []
+
+
+def test_multi_term_with_typo():
+    index = make_index("Sneha Patnaik", "Sneha Mishra")
+    assert index.search("sneha patniak") == [1]
+
+
+def test_remove_drops_tokens():
+    index = make_index("Anu Das", "Ankit Shah")
+    index.remove(1)
+    assert index.search("an") == [2]
+    assert len(index) == 1
+
+
+def test_rebuild_sees_changes_made_by_other_workers(app, db):
+    app.config["USER_SEARCH_REFRESH_SECONDS"] = 0
+    users = [User(email=f"search{i}@nitrkl.ac.in", name=name, password_hash="x")
+             for i, name in enumerate(["Zorawar Gill", "Zubin Mehta"])]
+    db.session.add_all(users)
+    db.session.commit()
+    user_index.ensure_fresh()
+    assert user_index.search("zorawar") == [users[0].id]
+
+    # Plain SQL skips the mapper events, like a write from another process
+    db.session.execute(text("UPDATE users SET name = 'Yashvardhan Gill' WHERE id = :id"), {"id": users[0].id})
+    db.session.execute(text("DELETE FROM users WHERE id = :id"), {"id": users[1].id})
+    db.session.commit()
+    assert user_index.search("zorawar") == [users[0].id]
+
+    # The stale index still answers while the rebuild runs in the background
+    user_index.ensure_fresh()
+    user_index._rebuild_thread.join(5)
+    assert user_index.search("zorawar") == []
+    assert user_index.search("yashvardhan") == [users[0].id]
+    assert user_index.search("zubin") == []
+
+
+def test_search_endpoint_returns_ranked_users(app, db, client):
+    app.config["USER_SEARCH_REFRESH_SECONDS"] = 0
+    db.session.add_all([
+        User(email="xavier.long@nitrkl.ac.in", name="Xavierandrew Long", password_hash="x"),
+        User(email="xavi@nitrkl.ac.in", name="Xavi Bose", password_hash="x"),
+    ])
+    db.session.commit()
+    response = client.get("/users?search=xavi")
+    assert response.status_code == 200
+    assert [u["name"] for u in response.get_json()["users"]] == ["Xavi Bose", "Xavierandrew Long"]
+    user_index._rebuild_thread.join(5)
+
+
+def test_stale_index_rebuilds_off_the_request(app, db, client, monkeypatch):
+    app.config["USER_SEARCH_REFRESH_SECONDS"] = 0
+    user_index.ensure_fresh()
+    if user_index._rebuild_thread is not None:
+        user_index._rebuild_thread.join(5)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_rebuild():
+        started.set()
+        release.wait(5)
+
+    monkeypatch.setattr(user_index, "rebuild", slow_rebuild)
+    assert client.get("/users?search=anyone").status_code == 200
+    assert started.wait(5)
+    # A rebuild is already running, so this request neither waits nor starts another
+    assert client.get("/users?search=anyone").status_code == 200
+    release.set()
+    user_index._rebuild_thread.join(5)
+    assert not user_index._rebuild_thread.is_alive()
@@ -0,0 +1,77 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.serialization import FastJSONProvider, MessageItem, as_dict, orjson
+
+DATETIMES = [
+    datetime(2026, 1, 1, 8, 30),
+    datetime(2026, 1, 1, 8, 30, 0, 123456),
+    datetime(2026, 1, 1, 8, 30, tzinfo=timezone.utc),
+    datetime(2026, 1, 1, 8, 30, 0, 5, tzinfo=timezone(timedelta(hours=5, minutes=30))),
+    datetime(2026, 1, 1, 8, 30, tzinfo=timezone(timedelta(hours=-3))),
+]
+
+
+@pytest.mark.skipif(orjson is None, reason="orjson is not installed")
+@pytest.mark.parametrize("value", DATETIMES, ids=str)
+def test_backends_write_datetimes_alike(app, value):
+    fast = FastJSONProvider(app, "orjson")
+    stdlib = FastJSONProvider(app, "stdlib")
+    obj = {"at": value, "items": [MessageItem(1, 2, 3, "hi", False, value)]}
+    assert fast.dumps(obj) == stdlib.dumps(obj)
+
+
+def test_naive_datetimes_are_utc_with_z(app):
+    out = json.loads(app.json.dumps({"at": datetime(2026, 1, 1, 8, 30)}))
+    assert out["at"] == "2026-01-01T08:30:00Z"
+
+
+def test_as_dict_formats_datetimes_for_emits():
+    aware = datetime(2026, 1, 1, 14, 0, tzinfo=timezone(timedelta(hours=5, minutes=30)))
+    assert as_dict(MessageItem(1, 2, 3, "hi", False, aware)) == {
+        "id": 1, "sender_id": 2, "recipient_id": 3, "content": "hi", "is_read": False,
+        "created_at": "2026-01-01T08:30:00Z",
+    }
+
+
+def test_send_message_returns_message_item(db, user, auth_client):
+    from app.models.user import User
+
+    peer = User(email="peer.message@nitrkl.ac.in", name="Peer", password_hash="x")
+    db.session.add(peer)
+    db.session.commit()
+    response = auth_client.post("/messages", json={"recipient_id": peer.id, "content": "hello"})
+    assert response.status_code == 201
+    message = response.get_json()["message"]
+    assert list(message) == ["id", "sender_id", "recipient_id", "content", "is_read", "created_at"]
+    assert message["created_at"].endswith("Z")
+    assert (message["sender_id"], message["recipient_id"], message["content"]) == (user.id, peer.id, "hello")
+
+
+@pytest.mark.parametrize("depth", [130, 300])
+def test_deep_reply_chain_is_served(db, user, client, depth):
+    from datetime import timedelta as td
+
+    from app.models.comment import Comment
+    from app.models.post import Post
+
+    post = Post(user_id=user.id, title="Thread", content_md="", content_html="")
+    db.session.add(post)
+    db.session.flush()
+    parent, start = None, datetime(2026, 1, 1)
+    for i in range(depth):
+        comment = Comment(post_id=post.id, parent_id=parent, user_id=user.id, content=f"reply {i}",
+                          depth=i, created_at=start + td(seconds=i))
+        db.session.add(comment)
+        db.session.flush()
+        parent = comment.id
+    db.session.commit()
+
+    response = client.get(f"/comments/post/{post.id}")
+    assert response.status_code == 200
+    node, levels = response.get_json()["comments"][0], 1
+    while node["replies"]:
+        node, levels = node["replies"][0], levels + 1
+    assert (levels, node["content"]) == (depth, f"reply {depth - 1}")
@@ -0,0 +1,165 @@
+import base64
+import hashlib
+import logging
+import os
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+
+import pytest
+
+from app.storage import S3Storage
+
+moto_server = pytest.importorskip("moto.server")
+
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+MiB = 1024 * 1024
+
+
+@pytest.fixture(scope="module")
+def s3_endpoint():
+    """A local moto S3 server, standing in for MinIO or S3."""
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = moto_server.ThreadedMotoServer(port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    yield f"http://{host}:{port}"
+    server.stop()
+
+
+@pytest.fixture
+def storage(s3_endpoint):
+    storage = S3Storage(f"media-{uuid.uuid4().hex[:12]}", endpoint_url=s3_endpoint, region="us-east-1",
+                        access_key="test", secret_key="test", multipart_threshold=5 * MiB)
+    storage.client.create_bucket(Bucket=storage.bucket)
+    return storage
+
+
+def count_calls(storage, operation):
+    calls = []
+    storage.client.meta.events.register(f"provide-client-params.s3.{operation}", lambda **kw: calls.append(kw["params"]))
+    return calls
+
+
+def write_file(tmp_path, data):
+    path = os.path.join(tmp_path, uuid.uuid4().hex)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def http_put(upload, body):
+    request = urllib.request.Request(upload["url"], data=body, method=upload["method"], headers=upload["headers"])
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def test_put_file_small_is_one_put(storage, tmp_path):
+    creates = count_calls(storage, "CreateMultipartUpload")
+    path = write_file(tmp_path, b"jpeg bytes")
+    storage.put_file("small.jpg", path, "image/jpeg")
+
+    assert not os.path.exists(path)
+    assert creates == []
+    head = storage.client.head_object(Bucket=storage.bucket, Key="small.jpg")
+    assert (head["ContentType"], head["CacheControl"]) == ("image/jpeg", CACHE_CONTROL)
+    assert storage.stat("small.jpg") == (10, "image/jpeg")
+    assert storage.read_head("small.jpg", 4) == b"jpeg"
+
+
+def test_put_file_above_threshold_is_multipart(storage, tmp_path):
+    creates = count_calls(storage, "CreateMultipartUpload")
+    parts = count_calls(storage, "UploadPart")
+    data = os.urandom(11 * MiB)
+    path = write_file(tmp_path, data)
+    storage.put_file("large.mp4", path, "video/mp4")
+
+    assert not os.path.exists(path)
+    assert len(creates) == 1 and len(parts) == 3
+    head = storage.client.head_object(Bucket=storage.bucket, Key="large.mp4")
+    assert head["ETag"].strip('"').endswith("-3")
+    assert (head["ContentType"], head["CacheControl"]) == ("video/mp4", CACHE_CONTROL)
+    assert storage.verify_sha256("large.mp4", hashlib.sha256(data).hexdigest())
+
+    dest = os.path.join(tmp_path, "fetched")
+    storage.fetch("large.mp4", dest)
+    with open(dest, "rb") as f:
+        assert f.read() == data
+
+
+def test_presign_signs_checksum_and_if_none_match(storage):
+    data = b"\xff\xd8\xff" + os.urandom(1000)
+    sha = hashlib.sha256(data)
+    upload = storage.presign_upload("blob.jpg", "image/jpeg", len(data), base64.b64encode(sha.digest()).decode(), 60)
+
+    query = urllib.parse.parse_qs(urllib.parse.urlsplit(upload["url"]).query)
+    signed = query["X-Amz-SignedHeaders"][0].split(";")
+    for header in ("content-length", "content-type", "if-none-match", "x-amz-checksum-sha256"):
+        assert header in signed
+    assert upload["headers"]["If-None-Match"] == "*"
+    assert upload["headers"]["x-amz-checksum-sha256"] == base64.b64encode(sha.digest()).decode()
+
+    assert http_put(upload, data) == 200
+    assert storage.verify_sha256("blob.jpg", sha.hexdigest())
+    head = storage.client.head_object(Bucket=storage.bucket, Key="blob.jpg")
+    assert (head["ContentType"], head["CacheControl"]) == ("image/jpeg", CACHE_CONTROL)
+
+    # If-None-Match: * keeps a second PUT from replacing the blob
+    assert http_put(upload, b"\xff\xd8\xff" + os.urandom(1000)) == 412
+    assert storage.verify_sha256("blob.jpg", sha.hexdigest())
+
+
+def test_presign_tampered_body_fails_verification(storage):
+    data = os.urandom(512)
+    sha = hashlib.sha256(data)
+    upload = storage.presign_upload("tampered.png", "image/png", len(data), base64.b64encode(sha.digest()).decode(), 60)
+    # S3 itself rejects the mismatched checksum; moto stores the body, so
+    # this checks the hash that /media/presign/complete relies on
+    if http_put(upload, os.urandom(512)) == 200:
+        assert not storage.verify_sha256("tampered.png", sha.hexdigest())
+    else:
+        assert not storage.exists("tampered.png")
+
+
+def test_delete_many_batches_1000_keys_per_call(storage):
+    keys = [f"{i:05d}.jpg" for i in range(2001)]
+    # One stored object per batch; S3 reports missing keys as deleted too
+    for key in keys[::1000]:
+        storage.client.put_object(Bucket=storage.bucket, Key=key, Body=b"x")
+    deletes = count_calls(storage, "DeleteObjects")
+
+    assert storage.delete_many(keys) == 2001
+    assert [len(call["Delete"]["Objects"]) for call in deletes] == [1000, 1000, 1]
+    assert list(storage.list()) == []
+
+
+def test_list_and_urls(storage):
+    storage.client.put_object(Bucket=storage.bucket, Key="a.jpg", Body=b"abc")
+    [(key, size, mtime)] = storage.list()
+    assert (key, size) == ("a.jpg", 3) and mtime > 0
+    url = storage.url("a.jpg")
+    assert url.endswith(f"/{storage.bucket}/a.jpg")
+    assert storage.key_for_url(url) == "a.jpg"
+    assert storage.key_for_url("/uploads/a.jpg") is None
+    assert storage.stat("missing.jpg") is None
+
+
+def test_collect_garbage_sweeps_the_bucket(db, user, storage, tmp_path):
+    from app.media_store import collect_garbage
+    from app.models.post import Media, Post
+
+    kept, orphan = f"{uuid.uuid4().hex}.jpg", f"{uuid.uuid4().hex}.jpg"
+    for key in (kept, orphan, orphan.replace(".jpg", "_thumb.webp")):
+        storage.client.put_object(Bucket=storage.bucket, Key=key, Body=b"x")
+    post = Post(user_id=user.id, title="S3", content_md="", content_html="")
+    db.session.add(post)
+    db.session.flush()
+    db.session.add(Media(post_id=post.id, type="image", url=storage.url(kept), mime="image/jpeg"))
+    db.session.commit()
+
+    assert collect_garbage(storage, str(tmp_path), grace_seconds=0)["blobs"] == 2
+    assert [key for key, _, _ in storage.list()] == [kept]
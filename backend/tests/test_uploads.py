@@ -0,0 +1,85 @@
+import hashlib
+import os
+import uuid
+
+import pytest
+
+BODY = b"%PDF-1.4\n" + bytes(range(256)) * 8
+
+
+@pytest.fixture
+def blob(app):
+    """A content-addressed file in UPLOAD_FOLDER, as (name, sha256)."""
+    sha = hashlib.sha256(BODY + uuid.uuid4().bytes).hexdigest()
+    name = f"{sha}.pdf"
+    with open(os.path.join(app.config["UPLOAD_FOLDER"], name), "wb") as f:
+        f.write(BODY)
+    return name, sha
+
+
+def get(client, path, **headers):
+    response = client.get(path, headers=headers)
+    response.get_data()
+    response.close()
+    return response
+
+
+def test_content_addressed_file_is_immutable(client, blob):
+    name, sha = blob
+    response = get(client, f"/uploads/{name}")
+    assert response.status_code == 200
+    assert response.get_data() == BODY
+    assert response.headers["ETag"] == f'"{sha}"'
+    assert response.cache_control.public and response.cache_control.immutable
+    assert response.cache_control.max_age == 365 * 24 * 3600
+    assert response.headers["Accept-Ranges"] == "bytes"
+
+
+def test_derivative_etag_names_the_variant(app, client):
+    sha = hashlib.sha256(uuid.uuid4().bytes).hexdigest()
+    with open(os.path.join(app.config["UPLOAD_FOLDER"], f"{sha}_thumb.webp"), "wb") as f:
+        f.write(b"RIFF\x00\x00\x00\x00WEBP")
+    assert get(client, f"/uploads/{sha}_thumb.webp").headers["ETag"] == f'"{sha}-thumb"'
+
+
+def test_if_none_match_is_304(client, blob):
+    name, sha = blob
+    response = get(client, f"/uploads/{name}", **{"If-None-Match": f'"{sha}"'})
+    assert response.status_code == 304
+    assert response.get_data() == b""
+    assert response.headers["ETag"] == f'"{sha}"'
+    assert get(client, f"/uploads/{name}", **{"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_range_is_206(client, blob):
+    name, _ = blob
+    response = get(client, f"/uploads/{name}", Range="bytes=9-18")
+    assert response.status_code == 206
+    assert response.get_data() == BODY[9:19]
+    assert response.headers["Content-Range"] == f"bytes 9-18/{len(BODY)}"
+
+
+def test_other_files_get_a_short_max_age(app, client):
+    name = f"legacy-{uuid.uuid4().hex}.pdf"
+    with open(os.path.join(app.config["UPLOAD_FOLDER"], name), "wb") as f:
+        f.write(BODY)
+    response = get(client, f"/uploads/{name}")
+    assert response.status_code == 200
+    assert response.cache_control.max_age == app.config["UPLOADS_MAX_AGE"]
+    assert not response.cache_control.immutable
+    assert response.headers["ETag"]
+
+
+def test_accel_redirect_hands_off_to_nginx(app, client, blob, monkeypatch):
+    monkeypatch.setitem(app.config, "UPLOADS_ACCEL_REDIRECT", "/_uploads/")
+    name, sha = blob
+    response = get(client, f"/uploads/{name}")
+    assert response.status_code == 200
+    assert response.headers["X-Accel-Redirect"] == f"/_uploads/{name}"
+    assert response.get_data() == b""
+    assert response.mimetype == "application/pdf"
+    assert response.headers["ETag"] == f'"{sha}"'
+    assert response.cache_control.immutable
+
+    assert get(client, "/uploads/missing.pdf").status_code == 404
+    assert get(client, "/uploads/../conftest.py").status_code == 404
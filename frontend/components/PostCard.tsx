@@ -15,6 +15,9 @@ type Post = {
   edited_at?: string;
   cover_url?: string;
   coverUrl?: string;
+  cover_width?: number | null;
+  cover_height?: number | null;
+  cover_placeholder?: string | null;
   media?: { url: string }[];
   content?: string;
   body?: string;
@@ -36,13 +39,25 @@ export default function PostCard({ post }: { post: Post }) {
           {coverUrl ? (
             <>
               {/* Image Section */}
-              <div className="relative w-full overflow-hidden rounded-t-[1rem]">
+              <div
+                className="relative w-full overflow-hidden rounded-t-[1rem]"
+                style={post.cover_width && post.cover_height ? { aspectRatio: `${post.cover_width} / ${post.cover_height}` } : undefined}
+              >
                 {!imageLoaded && (
-                  <div className="absolute inset-0 bg-[#5E558A33] animate-pulse" />
+                  post.cover_placeholder ? (
+                    <div
+                      className="absolute inset-0 bg-cover bg-center scale-110 blur-md"
+                      style={{ backgroundImage: `url(${post.cover_placeholder})` }}
+                    />
+                  ) : (
+                    <div className="absolute inset-0 bg-[#5E558A33] animate-pulse" />
+                  )
                 )}
                 <img
                   src={coverUrl}
                   alt={post.title || "Post image"}
+                  width={post.cover_width || undefined}
+                  height={post.cover_height || undefined}
                   loading="lazy"
                   onLoad={() => setImageLoaded(true)}
                   onError={() => setImageLoaded(true)}